@@ -27,7 +27,7 @@
 '''
 
 # Deklarasi library yang digunakan
-from flask import Flask, render_template, redirect, url_for, request, flash, session, send_file
+from flask import Flask, render_template, redirect, url_for, request, flash, session, send_file, jsonify, Response
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 import dash
 import dash_bootstrap_components as dbc
@@ -43,7 +43,7 @@ import numpy as np
 from scipy import interpolate
 from datetime import datetime, timedelta
 from dash import dcc, html
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
 from pages.mcs_dashboard_all import main_dashboard_layout, main_dashboard_path
 from pages.co2 import co2_layout
 from pages.th_in import th_in_layout
@@ -64,17 +64,39 @@ from engineer_pages.rainfall_eng import engineer_rainfall_layout
 from engineer_pages.alarm_eng import engineer_alarm_layout  
 from engineer_pages.gps_eng import engineer_gps_layout  
 from engineer_pages.epsac_eng import engineer_eps_ac_layout
+import logging
 import os
 import time
+import atexit
 from werkzeug.security import generate_password_hash, check_password_hash
 from dotenv import load_dotenv
 import gspread                               
-from oauth2client.service_account import ServiceAccountCredentials 
-import io                                    
+from ingest import IngestStores, record_cycle
+from ingest_pipeline import IngestPipeline
+from sensor_registry import STORE_CODES, TABLE_DATA_CODES, PREDICTION_CODES, CYCLE_GROUPS, SUBSCRIPTION_TOPIC, TOPIC_PREFIX, SENSOR_CONFIG
+from sensor_store import SensorStore, PredictionStore, format_time_labels, local_datetime
+from compressed_store import ChunkedSensorStore
+from snapshot import SnapshotPublisher
+from live_push import LiveUpdates
+from trend_graph import trend_patch, blank_trend_patch
+from sites import SiteShards, dispatch_site_message
+from mqtt_capture import CaptureWriter
+from history_store import HistoryStore, parse_retention
+from history_archive import HistoryArchive
+from history_export import HistoryExporter
+from warm_start import save_all, restore_all
+from sheet_mirror import SheetClient, SheetMirror
+from sheet_export import SheetExporter, EXPORT_FORMATS
 
 # Load environment variables
 load_dotenv()
 
+# NEW: Modules that log instead of printing (sites, ingest) log at LOG_LEVEL;
+# LOG_LEVEL=DEBUG also shows every ingested value. Libraries stay at WARNING.
+logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+for _logger in ('sites', 'ingest'):
+    logging.getLogger(_logger).setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+
 # Initialize Flask app
 server = Flask(__name__)
 
@@ -162,43 +184,78 @@ def login():
 def dashboard():
     return render_template('dashboard.html', user=current_user.id)
 
-# NEW FLASK ROUTE FOR DOWNLOADING THE SPREADSHEET
+def parse_download_time(value, end=False):
+    """?start= / ?end= value to a datetime64 (None when absent); a date-only end includes that day"""
+    if not value:
+        return None
+    timestamp = pd.Timestamp(value)
+    if end and len(value.strip()) == 10:
+        timestamp += pd.Timedelta(days=1)
+    return timestamp.to_datetime64()
+
+def local_epoch(value):
+    """parse_download_time() value (naive Asia/Jakarta time) as epoch seconds"""
+    return pd.Timestamp(value).tz_localize('Asia/Jakarta').timestamp()
+
+# NEW FLASK ROUTE FOR DOWNLOADING THE SPREADSHEET, e.g.
+# /download?format=csv&start=2026-10-01&end=2026-10-17&columns=Temp In,Humid In
+# (format xlsx, csv or parquet, default xlsx; all rows and columns by default).
+# With source=history (login required, start required) the cycles of one site
+# are exported from the history instead: archived days straight off the Parquet
+# archive, the rest from the SQLite database; columns are sensor codes, e.g.
+# /download?source=history&site=default&format=csv&start=2026-01-01&columns=kodeData0211
 @server.route('/download')
 def download_spreadsheet():
+    fmt = request.args.get('format', 'xlsx').lower()
+    columns = [c.strip() for c in request.args.get('columns', '').split(',') if c.strip()] or None
     try:
-        # 1. Authenticate with Google Sheets using the service account
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-        client = gspread.authorize(creds)
-
-        # 2. Open the spreadsheet and get all data from the first sheet
-        #    Replace "microclimate_database" with the exact name of your Google Sheet file
-        sheet = client.open("microclimate_database").sheet1
-        data = sheet.get_all_records()  # This gets data as a list of dictionaries
-
-        # 3. Convert data to a Pandas DataFrame
-        df = pd.DataFrame(data)
-
-        # 4. Create an in-memory Excel file from the DataFrame
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='SensorData')
-        output.seek(0) # Move the cursor to the beginning of the stream
-
-        # 5. Send the file to the user's browser for download
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'microclimate_data_{datetime.now().strftime("%Y-%m-%d")}.xlsx'
-        )
+        start = parse_download_time(request.args.get('start'))
+        end = parse_download_time(request.args.get('end'), end=True)
+    except ValueError:
+        return "Error: start and end must be dates (YYYY-MM-DD) or date times.", 400
+    source = request.args.get('source', 'sheet')
+    if source == 'history':
+        if not current_user.is_authenticated:
+            return login_manager.unauthorized()
+        if history_exporter is None:
+            return "Error: history database disabled.", 404
+        if start is None:
+            return "Error: start is required for source=history.", 400
 
+    try:
+        if source == 'history':
+            # Cycles of one site, streamed day by day / chunk by chunk (not cached)
+            site = request.args.get('site') or MCS_DEFAULT_SITE
+            kind, result = history_exporter.export(
+                fmt, site, local_epoch(start), time.time() if end is None else local_epoch(end), columns)
+        else:
+            # 1. Rows of the spreadsheet from the shared in-memory mirror, kept
+            #    up to date by its background thread from now on (synced now if
+            #    the mirror has not synced yet)
+            sheet_mirror.start()
+            if not sheet_mirror.synced:
+                sheet_mirror.sync()
+
+            # 2. Cached file for this data version, range and format (built if missing)
+            kind, result = sheet_exporter.export(fmt, start, end, columns)
+    except KeyError as e:
+        return f"Error: unknown column {e}.", 400
+    except ValueError as e:
+        return f"Error: {e}.", 400
     except gspread.exceptions.SpreadsheetNotFound:
         return "Error: Spreadsheet not found. Check the name or sharing permissions.", 404
     except Exception as e:
         print(f"An error occurred during file download: {e}")
         return "An internal error occurred. Please check the server logs.", 500
 
+    # 3. Send the file to the user's browser for download (CSV streamed in chunks)
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    download_name = f'microclimate_data_{datetime.now().strftime("%Y-%m-%d")}{extension}'
+    if kind == 'file':
+        return send_file(result, mimetype=mimetype, as_attachment=True, download_name=download_name)
+    return Response(result, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
+
 @server.route('/logout')
 @login_required
 def logout():
@@ -217,7 +274,7 @@ def restrict_dash_pages():
 # NEW: Connection monitoring variables
 connection_status = {
     'connected': False,
-    'last_message_time': None,
+    'last_message_time': None,  # time.monotonic() of the last MQTT message
     'connection_timeout': 80  # seconds - consider disconnected if no message for 60 seconds
 }
 
@@ -265,71 +322,23 @@ DEFAULT_ALARM_VALUES = {
     'berita0913': 'N/A',
 }
 
-# Default values for predicitons
-DEFAULT_PREDICTION_VALUES = {
-    'kodeData0213': "-",
-    'kodeData0214': "-",
-    'kodeData0215': "-",
-    'kodeData0216': "-",
-    'kodeData0217': "-",
-    'kodeData0218': "-",
-    'kodeData0219': "-",
-    'kodeData0220': "-",
-    'kodeData0221': "-",
-    'kodeData0222': "-",
-    'kodeData0713': "-",
-    'kodeData0714': "-",
-    'kodeData0715': "-",
-    'kodeData0716': "-",
-    'kodeData0717': "-",
-    'kodeData0718': "-",
-    'kodeData0719': "-",
-    'kodeData0720': "-",
-    'kodeData0721': "-",
-    'kodeData0722': "-",
-    'kodeData0312': "-",
-    'kodeData0313': "-",
-    'kodeData0314': "-",
-    'kodeData0315': "-",
-    'kodeData0316': "-",
-    'kodeData0412': "-",
-    'kodeData0413': "-",
-    'kodeData0414': "-",
-    'kodeData0415': "-",
-    'kodeData0416': "-",
-    'kodeData0512': "-",
-    'kodeData0513': "-",
-    'kodeData0514': "-",
-    'kodeData0515': "-",
-    'kodeData0516': "-",
-    'kodeData0612': "-",
-    'kodeData0613': "-",
-    'kodeData0614': "-",
-    'kodeData0615': "-",
-    'kodeData0616': "-",
-}
+# NEW: Depth of the in-memory sensor history, in hours of 1 Hz data
+SENSOR_HISTORY_HOURS = float(os.getenv('SENSOR_HISTORY_HOURS', '1'))
 
-# data storage
-data = {
-    'waktu': [],      # Time values
-    'kodeData0000': [],  # Cycle start signal
-    'kodeData0211': [],       # Temperature values 
-    'kodeData0212': [], # Humidity values
-    'kodeData0711': [],   # Outdoor temperature values
-    'kodeData0712': [], # Outdoor humidity values
-    'kodeData0311': [],        # CO2 values
-    'kodeData0411': [],  # Wind speed values
-    'kodeData0511': [],    # Rainfall values
-    'kodeData0611': [],    # PAR values
-    'kodeData1011': [],   # Latitude values
-    'kodeData1012': [],    # Longitude values
-    'kodeData0911': [], # Voltage AC values
-    'kodeData0912': [], # Current AC values
-    'kodeData0913': [], # Power AC values
-}
+# Number of most recent rows shown in the trend graphs and real-time table
+TREND_WINDOW = 10
 
-# Alarm data storage
-alarm_data = {
+# Sensor data storage: one preallocated ring buffer column per kodeData code, per site
+SENSOR_STORE_DEPTH = max(TREND_WINDOW, int(SENSOR_HISTORY_HOURS * 3600))
+
+# NEW: SENSOR_STORE_COMPRESSION=gorilla keeps full chunks of SENSOR_CHUNK_SIZE rows
+# compressed (delta-of-delta timestamps, XOR floats) for long live windows, e.g.
+# SENSOR_HISTORY_HOURS=24; the default keeps the plain ring buffer
+SENSOR_STORE_COMPRESSION = os.getenv('SENSOR_STORE_COMPRESSION', 'none')
+SENSOR_CHUNK_SIZE = int(os.getenv('SENSOR_CHUNK_SIZE', '1024'))
+
+# Alarm data storage (initial values of every site)
+INITIAL_ALARM_DATA = {
     'kodeAlarm0211': 5,
     'kodeAlarm0212': 5,
     'kodeAlarm0711': 5,
@@ -354,49 +363,110 @@ alarm_data = {
     'berita0913': 'N/A',
 }
 
-# Prediction data storage
-prediction_data = {
-    'kodeData0213': [],
-    'kodeData0214': [],
-    'kodeData0215': [],
-    'kodeData0216': [],
-    'kodeData0217': [],
-    'kodeData0218': [],
-    'kodeData0219': [],
-    'kodeData0220': [],
-    'kodeData0221': [],
-    'kodeData0222': [],
-    'kodeData0713': [],
-    'kodeData0714': [],
-    'kodeData0715': [],
-    'kodeData0716': [],
-    'kodeData0717': [],
-    'kodeData0718': [],
-    'kodeData0719': [],
-    'kodeData0720': [],
-    'kodeData0721': [],
-    'kodeData0722': [],
-    'kodeData0312': [],
-    'kodeData0313': [],
-    'kodeData0314': [],
-    'kodeData0315': [],
-    'kodeData0316': [],
-    'kodeData0412': [],
-    'kodeData0413': [],
-    'kodeData0414': [],
-    'kodeData0415': [],
-    'kodeData0416': [],
-    'kodeData0512': [],
-    'kodeData0513': [],
-    'kodeData0514': [],
-    'kodeData0515': [],
-    'kodeData0516': [],
-    'kodeData0612': [],
-    'kodeData0613': [],
-    'kodeData0614': [],
-    'kodeData0615': [],
-    'kodeData0616': [],
-}
+# NEW: Number of past prediction sets kept (one set per measurement cycle)
+PREDICTION_HISTORY_SETS = int(os.getenv('PREDICTION_HISTORY_SETS', '1440'))
+
+# NEW: Multi-site ingest - each greenhouse publishes under mcs/<site>/<code>,
+# legacy mcs/<code> topics belong to MCS_DEFAULT_SITE. MCS_SITES lists sites
+# shown before they first publish, MCS_MAX_SITES bounds the number of shards.
+# The "sites" list of sensors.json, when not empty, is the set of sites accepted
+MCS_DEFAULT_SITE = os.getenv('MCS_DEFAULT_SITE', 'default')
+MCS_SITES = [site.strip() for site in os.getenv('MCS_SITES', '').split(',') if site.strip()]
+MCS_MAX_SITES = int(os.getenv('MCS_MAX_SITES', '50'))
+
+# NEW: Persistent history - every completed cycle of every site is written to a
+# local SQLite database (WAL mode) that feeds the historical tables; set
+# HISTORY_DB_FILE to an empty string to disable it
+HISTORY_DB_FILE = os.getenv('HISTORY_DB_FILE', 'mcs_history.db')
+HISTORY_BATCH_SIZE = int(os.getenv('HISTORY_BATCH_SIZE', '60'))
+HISTORY_FLUSH_SECONDS = float(os.getenv('HISTORY_FLUSH_SECONDS', '5'))
+# Cycles kept in memory while the database can't be written (oldest dropped beyond)
+HISTORY_MAX_PENDING = int(os.getenv('HISTORY_MAX_PENDING', '10000'))
+history_store = HistoryStore(HISTORY_DB_FILE, STORE_CODES, batch_size=HISTORY_BATCH_SIZE,
+                             flush_interval=HISTORY_FLUSH_SECONDS,
+                             max_pending=HISTORY_MAX_PENDING) if HISTORY_DB_FILE else None
+
+# NEW: History maintenance, every HISTORY_MAINTENANCE_SECONDS:
+# - finished days are sealed into HISTORY_ARCHIVE_DIR/site=<site>/<date>.parquet
+#   (needs pyarrow; set HISTORY_ARCHIVE_DIR to an empty string to disable it)
+# - rows older than HISTORY_RETENTION are deleted per tier (raw cycles, 1m/1h/1d
+#   rollups; tiers not listed are kept forever, an empty string keeps everything)
+HISTORY_MAINTENANCE_SECONDS = float(os.getenv('HISTORY_MAINTENANCE_SECONDS', '3600'))
+HISTORY_ARCHIVE_DIR = os.getenv('HISTORY_ARCHIVE_DIR', 'archive')
+history_archive = HistoryArchive(HISTORY_ARCHIVE_DIR, STORE_CODES) \
+    if history_store is not None and HISTORY_ARCHIVE_DIR else None
+# /download?source=history reads the archive, or only the database without one
+history_exporter = HistoryExporter(history_store, history_archive) if history_store is not None else None
+HISTORY_RETENTION_DEFAULT = 'raw=7d,1m=90d'
+try:
+    HISTORY_RETENTION = parse_retention(os.getenv('HISTORY_RETENTION', HISTORY_RETENTION_DEFAULT))
+except ValueError as e:
+    print(f"Warning: invalid HISTORY_RETENTION ({e}), using {HISTORY_RETENTION_DEFAULT}")
+    HISTORY_RETENTION = parse_retention(HISTORY_RETENTION_DEFAULT)
+
+# NEW: Server push - every published snapshot is sent once to the browsers of its
+# site over Server-Sent Events (/live); while a page's stream is open its
+# dcc.Interval only ticks every LIVE_SLOW_INTERVAL_MS (historical table refresh)
+LIVE_PUSH = os.getenv('LIVE_PUSH', '1') == '1'
+LIVE_MAX_CLIENTS = int(os.getenv('LIVE_MAX_CLIENTS', '50'))
+LIVE_MAX_PER_CLIENT = int(os.getenv('LIVE_MAX_PER_CLIENT', '4'))
+LIVE_KEEPALIVE_SECONDS = float(os.getenv('LIVE_KEEPALIVE_SECONDS', '15'))
+LIVE_SLOW_INTERVAL_MS = int(os.getenv('LIVE_SLOW_INTERVAL_MS', '30000'))
+live_updates = LiveUpdates(max_clients=LIVE_MAX_CLIENTS, max_per_client=LIVE_MAX_PER_CLIENT,
+                           keepalive=LIVE_KEEPALIVE_SECONDS) if LIVE_PUSH else None
+
+def new_site_stores(site):
+    """Fresh fixed-size stores for one site"""
+    if SENSOR_STORE_COMPRESSION == 'gorilla':
+        sensor_store = ChunkedSensorStore(STORE_CODES, depth=SENSOR_STORE_DEPTH, chunk_size=SENSOR_CHUNK_SIZE)
+    else:
+        sensor_store = SensorStore(STORE_CODES, depth=SENSOR_STORE_DEPTH)
+    alarm_data = dict(INITIAL_ALARM_DATA)
+
+    # Prediction data storage: latest value per horizon + bounded history of sets
+    prediction_store = PredictionStore(PREDICTION_CODES, history=PREDICTION_HISTORY_SETS)
+
+    # Immutable snapshots published once per completed cycle for the Dash callbacks
+    on_publish = None if live_updates is None else (lambda snapshot: live_updates.notify(site, snapshot))
+    snapshots = SnapshotPublisher(sensor_store, alarm_data, prediction_store, CYCLE_GROUPS,
+                                  on_publish=on_publish)
+    history = history_store.for_site(site) if history_store is not None else None
+    return IngestStores(sensor_store, alarm_data, prediction_store, snapshots, history)
+
+# Per-site stores updated by the MQTT ingest handlers
+site_shards = SiteShards(new_site_stores, TOPIC_PREFIX, MCS_DEFAULT_SITE,
+                         max_sites=MCS_MAX_SITES, sites=MCS_SITES, allowed=SENSOR_CONFIG.sites)
+
+# NEW: MQTT ingest mode - 'queue' keeps on_message to a non-blocking enqueue and
+# applies messages in batches on a processor thread, 'inline' applies them
+# directly inside paho's network loop
+MQTT_INGEST_MODE = os.getenv('MQTT_INGEST_MODE', 'queue')
+MQTT_QUEUE_SIZE = int(os.getenv('MQTT_QUEUE_SIZE', '10000'))
+MQTT_BATCH_SIZE = int(os.getenv('MQTT_BATCH_SIZE', '256'))
+
+ingest_pipeline = IngestPipeline(site_shards, maxsize=MQTT_QUEUE_SIZE, batch_size=MQTT_BATCH_SIZE,
+                                 dispatch=dispatch_site_message)
+
+# NEW: Warm start - the in-memory state of every site is saved to WARM_START_DIR
+# every WARM_START_SAVE_SECONDS and on shutdown, and reloaded at startup when the
+# site's last message is at most WARM_START_MAX_AGE_SECONDS old (defaults to the
+# live window); set WARM_START_DIR to an empty string to disable it
+WARM_START_DIR = os.getenv('WARM_START_DIR', 'warm_start')
+WARM_START_SAVE_SECONDS = float(os.getenv('WARM_START_SAVE_SECONDS', '60'))
+WARM_START_MAX_AGE_SECONDS = float(os.getenv('WARM_START_MAX_AGE_SECONDS', str(SENSOR_HISTORY_HOURS * 3600)))
+
+def save_warm_start_on_exit():
+    """Record each site's last cycle, then save the state for the next start"""
+    for shard in site_shards:
+        record_cycle(shard.stores)
+    save_all(WARM_START_DIR, site_shards)
+
+if WARM_START_DIR:
+    restored_sites = restore_all(WARM_START_DIR, site_shards, WARM_START_MAX_AGE_SECONDS)
+    if restored_sites:
+        print(f"Warm start: restored {', '.join(restored_sites)} from {WARM_START_DIR}")
+    # Runs before the history database is closed (atexit is last-in, first-out)
+    atexit.register(save_warm_start_on_exit)
 
 # Helper function for safe numeric conversion
 def safe_float_convert(value, default_display="N/A"):
@@ -417,8 +487,10 @@ def safe_float_convert(value, default_display="N/A"):
             # Try to convert string to float
             return f"{float(value):.1f}"
         
-        # Handle numeric values (int, float)
+        # Handle numeric values (int, float), NaN marks a missing reading
         if isinstance(value, (int, float)):
+            if value != value:
+                return default_display
             return f"{float(value):.1f}"
         
         # If it's any other type, return default
@@ -482,91 +554,17 @@ def create_secure_ssl_context():
 # Create SSL context
 ssl_context = create_secure_ssl_context()
 
-# MQTT topics
-TOPIC_CYCLE_START = "mcs/kodeData0000"  # Topic for cycle start signal
-
-# TOPIC FOR DATA
-TOPIC_SUHU = "mcs/kodeData0211"
-TOPIC_KELEMBABAN = "mcs/kodeData0212"
-TOPIC_SUHU_OUT = "mcs/kodeData0711"
-TOPIC_KELEMBABAN_OUT = "mcs/kodeData0712"
-TOPIC_CO2 = "mcs/kodeData0311"
-TOPIC_WINDSPEED = "mcs/kodeData0411"
-TOPIC_RAINFALL = "mcs/kodeData0511"
-TOPIC_PAR = "mcs/kodeData0611"
-TOPIC_LAT = "mcs/kodeData1011"
-TOPIC_LON = "mcs/kodeData1012"
-TOPIC_VOLTAGE_AC = "mcs/kodeData0911"
-TOPIC_CURRENT_AC = "mcs/kodeData0912"
-TOPIC_POWER_AC = "mcs/kodeData0913"
-
-# TOPIC FOR ALARM
-TOPIC_ALARM_SUHU_IN = "mcs/kodeAlarm0211"
-TOPIC_ALARM_KELEMBABAN_IN = "mcs/kodeAlarm0212"
-TOPIC_ALARM_SUHU_OUT = "mcs/kodeAlarm0711"
-TOPIC_ALARM_KELEMBABAN_OUT = "mcs/kodeAlarm0712"
-TOPIC_ALARM_CO2 = "mcs/kodeAlarm0311"
-TOPIC_ALARM_WINDSPEED = "mcs/kodeAlarm0411"
-TOPIC_ALARM_RAINFALL = "mcs/kodeAlarm0511"
-TOPIC_ALARM_PAR = "mcs/kodeAlarm0611"
-TOPIC_ALARM_VOLTAGE_AC = "mcs/kodeAlarm0911"
-TOPIC_ALARM_CURRENT_AC = "mcs/kodeAlarm0912"
-TOPIC_ALARM_POWER_AC = "mcs/kodeAlarm0913"
-
-# TOPIC FOR BERITA
-TOPIC_BERITA_SUHU_IN = "mcs/berita0211"
-TOPIC_BERITA_KELEMBABAN_IN = "mcs/berita0212"
-TOPIC_BERITA_SUHU_OUT = "mcs/berita0711"
-TOPIC_BERITA_KELEMBABAN_OUT = "mcs/berita0712"
-TOPIC_BERITA_CO2 = "mcs/berita0311"
-TOPIC_BERITA_WINDSPEED = "mcs/berita0411"
-TOPIC_BERITA_RAINFALL = "mcs/berita0511"
-TOPIC_BERITA_PAR = "mcs/berita0611"
-TOPIC_BERITA_VOLTAGE_AC = "mcs/berita0911"
-TOPIC_BERITA_CURRENT_AC = "mcs/berita0912"
-TOPIC_BERITA_POWER_AC = "mcs/berita0913"
-
-# TOPIC FOR PREDICTION
-TOPIC_SUHU_PREDICT1 = "mcs/kodeData0213"
-TOPIC_SUHU_PREDICT2 = "mcs/kodeData0214"
-TOPIC_SUHU_PREDICT3 = "mcs/kodeData0215"
-TOPIC_SUHU_PREDICT4 = "mcs/kodeData0216"
-TOPIC_SUHU_PREDICT5 = "mcs/kodeData0217"
-TOPIC_HUMIDITY_PREDICT1 = "mcs/kodeData0218"
-TOPIC_HUMIDITY_PREDICT2 = "mcs/kodeData0219"
-TOPIC_HUMIDITY_PREDICT3 = "mcs/kodeData0220"
-TOPIC_HUMIDITY_PREDICT4 = "mcs/kodeData0221"
-TOPIC_HUMIDITY_PREDICT5 = "mcs/kodeData0222"
-TOPIC_SUHUOUT_PREDICT1 = "mcs/kodeData0713"
-TOPIC_SUHUOUT_PREDICT2 = "mcs/kodeData0714"
-TOPIC_SUHUOUT_PREDICT3 = "mcs/kodeData0715"
-TOPIC_SUHUOUT_PREDICT4 = "mcs/kodeData0716"
-TOPIC_SUHUOUT_PREDICT5 = "mcs/kodeData0717"
-TOPIC_HUMIDITYOUT_PREDICT1 = "mcs/kodeData0718"
-TOPIC_HUMIDITYOUT_PREDICT2 = "mcs/kodeData0719"
-TOPIC_HUMIDITYOUT_PREDICT3 = "mcs/kodeData0720"
-TOPIC_HUMIDITYOUT_PREDICT4 = "mcs/kodeData0721"
-TOPIC_HUMIDITYOUT_PREDICT5 = "mcs/kodeData0722"
-TOPIC_CO2_PREDICT1 = "mcs/kodeData0312"
-TOPIC_CO2_PREDICT2 = "mcs/kodeData0313"
-TOPIC_CO2_PREDICT3 = "mcs/kodeData0314"
-TOPIC_CO2_PREDICT4 = "mcs/kodeData0315"
-TOPIC_CO2_PREDICT5 = "mcs/kodeData0316"
-TOPIC_WINDSPEED_PREDICT1 = "mcs/kodeData0412"
-TOPIC_WINDSPEED_PREDICT2 = "mcs/kodeData0413"
-TOPIC_WINDSPEED_PREDICT3 = "mcs/kodeData0414"
-TOPIC_WINDSPEED_PREDICT4 = "mcs/kodeData0415"
-TOPIC_WINDSPEED_PREDICT5 = "mcs/kodeData0416"
-TOPIC_RAINFALL_PREDICT1 = "mcs/kodeData0512"
-TOPIC_RAINFALL_PREDICT2 = "mcs/kodeData0513"
-TOPIC_RAINFALL_PREDICT3 = "mcs/kodeData0514"
-TOPIC_RAINFALL_PREDICT4 = "mcs/kodeData0515"
-TOPIC_RAINFALL_PREDICT5 = "mcs/kodeData0516"
-TOPIC_PAR_PREDICT1 = "mcs/kodeData0612"
-TOPIC_PAR_PREDICT2 = "mcs/kodeData0613"
-TOPIC_PAR_PREDICT3 = "mcs/kodeData0614"
-TOPIC_PAR_PREDICT4 = "mcs/kodeData0615"
-TOPIC_PAR_PREDICT5 = "mcs/kodeData0616"
+# NEW: MQTT_CONNECT=0 starts the dashboard without connecting to the broker
+# (tools/mqtt_replay.py feeds on_message itself)
+MQTT_CONNECT = os.getenv('MQTT_CONNECT', '1') == '1'
+
+# NEW: Record the raw MQTT stream for offline replay (python -m tools.mqtt_replay)
+MQTT_CAPTURE_FILE = os.getenv('MQTT_CAPTURE_FILE')
+capture_writer = CaptureWriter(MQTT_CAPTURE_FILE) if MQTT_CAPTURE_FILE else None
+
+# MQTT topics: one wildcard subscription, codes are routed through the sensor registry
+# (see sensors.json), so a new sensor only needs a config entry
+MQTT_SUBSCRIPTION = (SUBSCRIPTION_TOPIC, 0)
 
 # NEW: Function to check if data is stale
 def is_data_stale():
@@ -574,75 +572,36 @@ def is_data_stale():
     if connection_status['last_message_time'] is None:
         return True
     
-    time_diff = datetime.now() - connection_status['last_message_time']
-    return time_diff.total_seconds() > connection_status['connection_timeout']
+    time_diff = time.monotonic() - connection_status['last_message_time']
+    return time_diff > connection_status['connection_timeout']
 
 # NEW: Function to reset data to defaults
-def reset_to_default_values():
-    """Reset all sensor data to default values"""
-    global data
-    global alarm_data
-    global prediction_data
-    current_time = datetime.now(tz=pytz.timezone('Asia/Jakarta')).strftime('%H:%M:%S')
-    
-    # Clear existing data and add default values
-    for key in DEFAULT_VALUES:
-        data[key] = [DEFAULT_VALUES[key]]
+def reset_to_default_values(shard):
+    """Reset the sensor data of one site to default values"""
+    stores = shard.stores
+
+    # Keep the last cycle received before the outage
+    record_cycle(stores)
+
+    # Clear existing sensor rows, callbacks fall back to DEFAULT_VALUES
+    stores.sensors.clear()
 
     # Clear existing alarm_data and add default_alarm_values
     for key2 in DEFAULT_ALARM_VALUES:
-        alarm_data[key2] = [DEFAULT_ALARM_VALUES[key2]]
+        stores.alarm_data[key2] = [DEFAULT_ALARM_VALUES[key2]]
 
-    # Clear existing prediction_data and add default_prediction_values
-    for key3 in DEFAULT_PREDICTION_VALUES:
-        prediction_data[key3] = [DEFAULT_PREDICTION_VALUES[key3]] 
-    
-    data['waktu'] = [current_time]
-    print("Data reset to default values due to connection timeout")
+    # Clear existing predictions, graphs show no forecast until new values arrive
+    stores.predictions.clear()
+
+    # Let the callbacks render the cleared state
+    stores.snapshots.publish()
+    print(f"Data of site {shard.name} reset to default values due to connection timeout")
 
 # MQTT Callback
 def on_connect(client, userdata, flags, rc):
     if rc == 0:
         print("Connected to HiveMQ Broker")
-        client.subscribe([(TOPIC_CYCLE_START, 0),
-                          (TOPIC_SUHU, 0), (TOPIC_KELEMBABAN, 0),
-                          (TOPIC_SUHU_OUT, 0), (TOPIC_KELEMBABAN_OUT, 0),
-                          (TOPIC_CO2, 0), (TOPIC_WINDSPEED, 0), 
-                          (TOPIC_RAINFALL, 0), (TOPIC_PAR, 0),
-                          (TOPIC_LAT, 0),  (TOPIC_LON, 0),
-                          (TOPIC_VOLTAGE_AC, 0), (TOPIC_CURRENT_AC, 0), (TOPIC_POWER_AC, 0),
-                          (TOPIC_ALARM_SUHU_IN, 0), (TOPIC_ALARM_KELEMBABAN_IN, 0),
-                          (TOPIC_ALARM_SUHU_OUT, 0), (TOPIC_ALARM_KELEMBABAN_OUT, 0),
-                          (TOPIC_ALARM_CO2, 0), (TOPIC_ALARM_WINDSPEED, 0),
-                          (TOPIC_ALARM_RAINFALL, 0), (TOPIC_ALARM_PAR, 0),
-                          (TOPIC_ALARM_VOLTAGE_AC, 0), (TOPIC_ALARM_CURRENT_AC, 0),
-                          (TOPIC_ALARM_POWER_AC, 0), (TOPIC_BERITA_VOLTAGE_AC, 0),
-                          (TOPIC_BERITA_CURRENT_AC, 0), (TOPIC_BERITA_POWER_AC, 0),
-                          (TOPIC_BERITA_SUHU_IN, 0), (TOPIC_BERITA_KELEMBABAN_IN, 0),
-                          (TOPIC_BERITA_SUHU_OUT, 0), (TOPIC_BERITA_KELEMBABAN_OUT, 0),
-                          (TOPIC_BERITA_CO2, 0), (TOPIC_BERITA_WINDSPEED, 0),
-                          (TOPIC_BERITA_RAINFALL, 0), (TOPIC_BERITA_PAR, 0),
-                          (TOPIC_SUHU_PREDICT1, 0), (TOPIC_SUHU_PREDICT2, 0),
-                          (TOPIC_SUHU_PREDICT3, 0), (TOPIC_SUHU_PREDICT4, 0),
-                          (TOPIC_SUHU_PREDICT5, 0), (TOPIC_HUMIDITY_PREDICT1, 0),
-                          (TOPIC_HUMIDITY_PREDICT2, 0), (TOPIC_HUMIDITY_PREDICT3, 0),
-                          (TOPIC_HUMIDITY_PREDICT4, 0), (TOPIC_HUMIDITY_PREDICT5, 0),
-                          (TOPIC_SUHUOUT_PREDICT1, 0), (TOPIC_SUHUOUT_PREDICT2, 0),
-                          (TOPIC_SUHUOUT_PREDICT3, 0), (TOPIC_SUHUOUT_PREDICT4, 0),
-                          (TOPIC_SUHUOUT_PREDICT5, 0), (TOPIC_HUMIDITYOUT_PREDICT1, 0),
-                          (TOPIC_HUMIDITYOUT_PREDICT2, 0), (TOPIC_HUMIDITYOUT_PREDICT3, 0),
-                          (TOPIC_HUMIDITYOUT_PREDICT4, 0), (TOPIC_HUMIDITYOUT_PREDICT5, 0),
-                          (TOPIC_CO2_PREDICT1, 0), (TOPIC_CO2_PREDICT2, 0),
-                          (TOPIC_CO2_PREDICT3, 0), (TOPIC_CO2_PREDICT4, 0),
-                          (TOPIC_CO2_PREDICT5, 0), (TOPIC_PAR_PREDICT1, 0),
-                          (TOPIC_PAR_PREDICT2, 0), (TOPIC_PAR_PREDICT3, 0),
-                          (TOPIC_PAR_PREDICT4, 0), (TOPIC_PAR_PREDICT5, 0),
-                          (TOPIC_WINDSPEED_PREDICT1, 0), (TOPIC_WINDSPEED_PREDICT2, 0),
-                          (TOPIC_WINDSPEED_PREDICT3, 0), (TOPIC_WINDSPEED_PREDICT4, 0),
-                          (TOPIC_WINDSPEED_PREDICT5, 0), (TOPIC_RAINFALL_PREDICT1, 0),
-                          (TOPIC_RAINFALL_PREDICT2, 0), (TOPIC_RAINFALL_PREDICT3, 0),
-                          (TOPIC_RAINFALL_PREDICT4, 0), (TOPIC_RAINFALL_PREDICT5, 0)                                                           
-                          ])  # Subscribe ke topik suhu & kelembaban
+        client.subscribe(*MQTT_SUBSCRIPTION)  # Subscribe ke semua topik MCS
     else:
         print(f"Failed to connect, return code {rc}")
 
@@ -660,91 +619,22 @@ def on_disconnect(client, userdata, rc):
             print(f"Reconnection failed: {e}")
 
 def on_message(client, userdata, msg):
-    global data, alarm_data, connection_status, prediction_data
+    global connection_status
     try:
         # Update connection status
-        connection_status['last_message_time'] = datetime.now()
+        connection_status['last_message_time'] = time.monotonic()
         connection_status['connected'] = True
-        
-        topic = msg.topic.split('/')[-1]  # Get the last part of the topic
-
-        # Define a consistent history length
-        MAX_HISTORY = 10
-
-        # List of topics that appear in the real-time table
-        table_data_topics = [
-            'kodeData0211', 'kodeData0212', 'kodeData0711', 'kodeData0712',
-            'kodeData0311', 'kodeData0411', 'kodeData0511', 'kodeData0611',
-            'kodeData1011', 'kodeData1012', 'kodeData0911', 'kodeData0912', 
-            'kodeData0913'
-        ]
-
-        # Topics to round to 2 decimal places
-        topics_to_round = [
-            'kodeData0211', 'kodeData0212', 'kodeData0711', 'kodeData0712',
-            'kodeData0311', 'kodeData0411', 'kodeData0511', 'kodeData0611',
-            'kodeData0911', 'kodeData0912', 'kodeData0913'
-        ]
-        
-        # Process regular data topics
-        if topic == 'kodeData0000':
-            raw_payload = float(msg.payload.decode())
-            payload = round(raw_payload, 2) if topic in topics_to_round else raw_payload
-            
-            current_time = datetime.now(tz=pytz.timezone('Asia/Jakarta')).strftime('%H:%M:%S')
-            data['waktu'].append(current_time)
-            data[topic].append(payload) # Use the potentially rounded payload
-
-            for key in table_data_topics:
-                last_value = data[key][-1] if data[key] else None
-                data[key].append(last_value)
-
-        # Other data topics: These UPDATE the last row
-        elif topic in table_data_topics:
-            raw_payload = float(msg.payload.decode())
-            payload = round(raw_payload, 2) if topic in topics_to_round else raw_payload
-            
-            if data[topic]:
-                data[topic][-1] = payload # Use the rounded payload
-        
-        # Process alarm code topics
-        elif topic.startswith('kodeAlarm'):
-            try:
-                alarm_value = int(msg.payload.decode())
-                alarm_data[topic] = alarm_value
-                print(f"Updated alarm {topic}: {alarm_value}")
-            except ValueError:
-                print(f"Error parsing alarm value for {topic}: {msg.payload.decode()}")
-        
-        # Process berita (alert message) topics
-        elif topic.startswith('berita'):
-            berita_value = msg.payload.decode()
-            alarm_data[topic] = berita_value
-            print(f"Updated berita {topic}: {berita_value}")
-
-        # Process prediction data topics
-        elif  topic in ['kodeData0213', 'kodeData0214', 'kodeData0215', 'kodeData0216',
-                    'kodeData0217', 'kodeData0218', 'kodeData0219', 'kodeData0220',
-                    'kodeData0221', 'kodeData0222', 'kodeData0713', 'kodeData0714', 
-                    'kodeData0715', 'kodeData0716', 'kodeData0717', 'kodeData0718',
-                    'kodeData0719', 'kodeData0720', 'kodeData0721', 'kodeData0722',
-                    'kodeData0312', 'kodeData0313', 'kodeData0314', 'kodeData0315',
-                    'kodeData0316', 'kodeData0412', 'kodeData0413', 'kodeData0414',
-                    'kodeData0415', 'kodeData0416', 'kodeData0512', 'kodeData0513',
-                    'kodeData0514', 'kodeData0515', 'kodeData0516', 'kodeData0612',
-                    'kodeData0613', 'kodeData0614', 'kodeData0615', 'kodeData0616']:
-            # Process prediction values
-            try:
-                predict_value = float(msg.payload.decode())
-                prediction_data[topic].append(predict_value)
-                print(f"Updated prediction {topic}: {predict_value}")
-            except ValueError:
-                print(f"Error parsing prediction value for {topic}: {msg.payload.decode()}")
+        recv_ts = time.time()
+
+        if capture_writer is not None:
+            capture_writer.write(msg.topic, msg.payload, recv_ts)
 
-        # Trim all historical lists at the end
-        for key in data.keys():
-            if len(data[key]) > MAX_HISTORY:
-                data[key] = data[key][-MAX_HISTORY:]
+        if MQTT_INGEST_MODE == 'queue':
+            # Hand off to the processor thread, never block the network loop
+            ingest_pipeline.submit(msg, recv_ts)
+        else:
+            # Route the message to its site through the precomputed topic registry
+            dispatch_site_message(site_shards, msg.topic, msg.payload, recv_ts)
 
     except Exception as e:
         print(f"Error processing MQTT message: {e}")
@@ -779,18 +669,59 @@ def setup_mqtt_client():
 # NEW: Background thread to monitor connection and reset data if needed
 def connection_monitor():
     """Monitor connection status and reset data if no messages received"""
+    reported_drops = 0
+    last_saved = time.monotonic()
     while True:
         try:
+            # Report messages dropped by a full ingest queue since the last check
+            stats = ingest_pipeline.stats()
+            if stats['dropped'] > reported_drops:
+                print(f"Ingest queue full, dropped {stats['dropped'] - reported_drops} MQTT messages "
+                      f"(depth {stats['depth']}/{stats['maxsize']})")
+                reported_drops = stats['dropped']
             if is_data_stale():
                 if connection_status['connected']:
                     print("No recent data received, connection may be stale")
                     connection_status['connected'] = False
-                reset_to_default_values()
+
+            # Reset every site that stopped publishing, once per outage
+            for shard in site_shards:
+                if shard.went_stale(connection_status['connection_timeout']):
+                    reset_to_default_values(shard)
+
+            # Write cycles still buffered for the history database
+            if history_store is not None:
+                history_store.flush()
+
+            # Save the state of every site for a warm start
+            if WARM_START_DIR and time.monotonic() - last_saved >= WARM_START_SAVE_SECONDS:
+                save_all(WARM_START_DIR, site_shards)
+                last_saved = time.monotonic()
             time.sleep(30)  # Check every 30 seconds
         except Exception as e:
             print(f"Error in connection monitor: {e}")
             time.sleep(30)
 
+# NEW: History maintenance thread
+def history_maintenance():
+    """Seal finished days into the Parquet archive, then apply the retention policy"""
+    while True:
+        try:
+            history_store.flush()
+            # Archive first so raw days are sealed before retention drops them
+            if history_archive is not None and history_archive.available:
+                written = history_archive.compact(history_store, time.time())
+                if written:
+                    print(f"Archived {written} day(s) of history to {HISTORY_ARCHIVE_DIR}")
+            if HISTORY_RETENTION:
+                report = history_store.apply_retention(HISTORY_RETENTION, time.time())
+                if any(report['deleted'].values()):
+                    print(f"History retention: deleted {report['deleted']}, reclaimed "
+                          f"{report['reclaimed_bytes'] / 1e6:.1f} MB in {report['seconds']:.1f}s")
+        except Exception as e:
+            print(f"Error in history maintenance: {e}")
+        time.sleep(HISTORY_MAINTENANCE_SECONDS)
+
 # NEW: MQTT reconnection thread
 def mqtt_reconnection_handler(client):
     """Handle MQTT reconnection in a separate thread"""
@@ -806,8 +737,12 @@ def mqtt_reconnection_handler(client):
             print(f"Reconnection attempt failed: {e}")
             time.sleep(10)
 
+# NEW: Start the ingest processor before any message can arrive
+if MQTT_INGEST_MODE == 'queue':
+    ingest_pipeline.start()
+
 # Initialize MQTT client
-mqtt_client = setup_mqtt_client()
+mqtt_client = setup_mqtt_client() if MQTT_CONNECT else None
 if mqtt_client:
     # Run MQTT in thread only if connection successful
     mqtt_thread = threading.Thread(target=mqtt_client.loop_forever, daemon=True)
@@ -823,11 +758,113 @@ if mqtt_client:
     
     print("MQTT client and monitoring threads started")
 else:
-    print("MQTT client not started due to connection issues")
+    print("MQTT client not started due to connection issues" if MQTT_CONNECT
+          else "MQTT client not started (MQTT_CONNECT=0)")
     # Start monitor thread even without MQTT to reset data
     monitor_thread = threading.Thread(target=connection_monitor, daemon=True)
     monitor_thread.start()
 
+# NEW: Start the history maintenance (independent of the MQTT connection)
+if history_archive is not None and not history_archive.available:
+    print("pyarrow is not installed, daily history archive disabled")
+if history_store is not None:
+    maintenance_thread = threading.Thread(target=history_maintenance, name='history-maintenance', daemon=True)
+    maintenance_thread.start()
+
+# NEW: Ingest queue depth and drop counters, plus per-site counters
+@server.route('/ingest-stats')
+@login_required
+def ingest_stats():
+    stats = ingest_pipeline.stats()
+    stats['mode'] = MQTT_INGEST_MODE
+    stats['sites'] = site_shards.stats()
+    stats['history'] = history_store.stats() if history_store is not None else None
+    stats['live'] = live_updates.stats() if live_updates is not None else None
+    stats['archived_days'] = history_archive.sealed if history_archive is not None else None
+    stats['sheet'] = sheet_mirror.stats()
+    stats['exports'] = sheet_exporter.stats()
+    stats['history_exports'] = history_exporter.stats() if history_exporter is not None else None
+    return jsonify(stats)
+
+# NEW: Server-Sent Events stream of the published cycles of one site, e.g.
+# /live?site=default (see live_push.py and assets/live_push.js). Open to guest
+# pages (same values as their callbacks), capped at LIVE_MAX_PER_CLIENT streams
+# per client address and LIVE_MAX_CLIENTS in total
+@server.route('/live')
+def live_stream():
+    if live_updates is None:
+        return jsonify({'error': 'live push disabled'}), 404
+    site = request.args.get('site') or MCS_DEFAULT_SITE
+    if site_shards.get(site, create=False) is None:
+        return jsonify({'error': f'unknown site {site!r}'}), 404
+    # A reconnecting EventSource sends the last version it got
+    last_id = request.headers.get('Last-Event-ID', '')
+    stream = live_updates.subscribe(site, int(last_id) if last_id.isdigit() else None,
+                                    client=request.remote_addr)
+    if stream is None:
+        return jsonify({'error': 'too many live clients'}), 503
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# NEW: Long-range trend of one sensor code from the rollup tiers, e.g.
+# /history/trend?code=kodeData0211&hours=168 (one bucket per hour for a week)
+@server.route('/history/trend')
+@login_required
+def history_trend():
+    code = request.args.get('code', '')
+    if history_store is None:
+        return jsonify({'error': 'history database disabled'}), 404
+    if code not in STORE_CODES:
+        return jsonify({'error': f'unknown sensor code {code!r}'}), 400
+    try:
+        hours = float(request.args.get('hours', '24'))
+        max_points = int(request.args.get('points', '500'))
+    except ValueError:
+        return jsonify({'error': 'hours and points must be numbers'}), 400
+
+    site = request.args.get('site') or MCS_DEFAULT_SITE
+    end = time.time()
+    width, rows = history_store.trend(site, code, end - hours * 3600, end, max_points=max(max_points, 1))
+    return jsonify({'site': site, 'code': code, 'bucket_seconds': width, 'rows': rows})
+
+def parse_history_time(value):
+    """?start= / ?end= value (date or date time, Asia/Jakarta unless given) as epoch seconds"""
+    if not value:
+        return None
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('Asia/Jakarta')
+    return timestamp.timestamp()
+
+# NEW: Raw cycles of one site over a time range, e.g.
+# /history/cycles?start=2026-10-01&end=2026-10-08&codes=kodeData0211,kodeData0212
+# (end defaults to now, all codes by default, at most `limit` cycles); days the raw
+# retention already deleted from the database are read from the Parquet archive
+@server.route('/history/cycles')
+@login_required
+def history_cycles():
+    if history_store is None:
+        return jsonify({'error': 'history database disabled'}), 404
+    codes = [c.strip() for c in request.args.get('codes', '').split(',') if c.strip()] or list(STORE_CODES)
+    unknown = [c for c in codes if c not in STORE_CODES]
+    if unknown:
+        return jsonify({'error': f'unknown sensor code {unknown[0]!r}'}), 400
+    try:
+        start = parse_history_time(request.args.get('start'))
+        end = parse_history_time(request.args.get('end')) or time.time()
+        limit = min(max(int(request.args.get('limit', '10000')), 1), 100000)
+    except ValueError:
+        return jsonify({'error': 'start and end must be dates or date times, limit a number'}), 400
+    if start is None:
+        return jsonify({'error': 'start is required'}), 400
+
+    site = request.args.get('site') or MCS_DEFAULT_SITE
+    if history_archive is not None:
+        rows = history_archive.cycles(history_store, site, start, end, codes, limit)
+    else:
+        rows = history_store.between(site, start, end, codes, limit)
+    return jsonify({'site': site, 'codes': codes, 'rows': rows})
+
 # main layout dash
 app_dash.layout = html.Div([
     # CSS styles for the app
@@ -868,6 +905,129 @@ def display_page(pathname):
     # Default to guest homepage for unknown paths
     return pages['/dash/']
 
+# NEW: Snapshot gates - the page interval only bumps the page's version store
+# when a new snapshot of the selected site has been published (or another site
+# is selected), so render callbacks (which listen to the store) skip ticks
+# where no new MQTT cycle arrived
+SNAPSHOT_GATES = {
+    'interval_mcs': 'version_mcs',
+    'interval_thin': 'version_thin',
+    'interval_thout': 'version_thout',
+    'interval_co2': 'version_co2',
+    'interval_par': 'version_par',
+    'interval_windspeed': 'version_windspeed',
+    'interval_rainfall': 'version_rainfall',
+    'interval_eps_ac': 'version_eps_ac',
+    'interval-alarm': 'version-alarm',
+    'interval_gps': 'version_gps',
+}
+
+def register_snapshot_gate(interval_id, version_id):
+    @app_dash.callback(
+        Output(version_id, 'data'),
+        Input(interval_id, 'n_intervals'),
+        Input('site-selector', 'value'),
+        State(version_id, 'data')
+    )
+    def snapshot_gate(n, site, last_version):
+        site = site or MCS_DEFAULT_SITE
+        version = {'site': site, 'version': site_shards.snapshot(site).version}
+        return dash.no_update if version == last_version else version
+
+    if live_updates is not None:
+        # Browser side of the push channel: pushed cycles bump the version store
+        # directly and the interval is slowed down while the stream is open
+        app_dash.clientside_callback(
+            "function(site, intervalId, versionId, interval) { return window.dash_clientside.live"
+            f".subscribe(site, intervalId, versionId, interval, {LIVE_SLOW_INTERVAL_MS}); }}",
+            Output(interval_id, 'interval'),
+            Input('site-selector', 'value'),
+            State(interval_id, 'id'),
+            State(version_id, 'id'),
+            State(interval_id, 'interval')
+        )
+
+for interval_id, version_id in SNAPSHOT_GATES.items():
+    register_snapshot_gate(interval_id, version_id)
+
+def page_snapshot(version):
+    """Snapshot of the site named in a page's version store (default site before the first tick)"""
+    return site_shards.snapshot(version['site'] if version else None)
+
+# NEW: Historical table columns (DataTable column id per sensor code)
+HISTORY_TABLE_COLUMNS = {
+    'historical-table-th-in': {'kodeData0211': 'temperature_in_historical',
+                               'kodeData0212': 'humidity_in_historical'},
+    'historical-table-th-out': {'kodeData0711': 'temperature_out_historical',
+                                'kodeData0712': 'humidity_out_historical'},
+    'historical-table-co2': {'kodeData0311': 'co2-historical'},
+    'historical-table-windspeed': {'kodeData0411': 'windspeed-historical'},
+    'historical-table-rainfall': {'kodeData0511': 'rainfall-historical'},
+    'historical-table-par': {'kodeData0611': 'par-historical'},
+    'historical-table-eps-ac': {'kodeData0911': 'voltage_ac_historical',
+                                'kodeData0912': 'current_ac_historical',
+                                'kodeData0913': 'power_ac_historical'},
+}
+
+def history_table_records(table_id, site, limit):
+    """
+    Newest `limit` cycles of `site` from the history database as DataTable rows
+    (newest on top), or None when nothing was recorded for the site yet.
+    """
+    if history_store is None:
+        return None
+    columns = HISTORY_TABLE_COLUMNS[table_id]
+    rows = history_store.latest(site or MCS_DEFAULT_SITE, limit, codes=columns)
+    if not rows:
+        return None
+    labels = format_time_labels([row['ts'] for row in rows], '%Y-%m-%d %H:%M:%S')
+    return [dict({'time': label}, **{column: row[code] for code, column in columns.items()})
+            for label, row in zip(labels, rows)]
+
+# NEW: One authorized Google Sheets client per process and one background thread
+# mirroring the sheet every SHEET_SYNC_SECONDS; tables and /download read the mirror
+GOOGLE_CREDENTIALS_FILE = os.getenv('GOOGLE_CREDENTIALS_FILE', 'credentials.json')
+GOOGLE_SHEET_NAME = os.getenv('GOOGLE_SHEET_NAME', 'microclimate_database')
+SHEET_SYNC_SECONDS = float(os.getenv('SHEET_SYNC_SECONDS', '30'))
+sheet_mirror = SheetMirror(SheetClient(GOOGLE_CREDENTIALS_FILE, GOOGLE_SHEET_NAME),
+                           interval=SHEET_SYNC_SECONDS)
+
+# NEW: /download files are built once per (data version, range, columns, format)
+# and kept in EXPORT_CACHE_DIR (the EXPORT_CACHE_FILES most recently used ones)
+EXPORT_CACHE_DIR = os.getenv('EXPORT_CACHE_DIR', 'exports')
+EXPORT_CACHE_FILES = int(os.getenv('EXPORT_CACHE_FILES', '32'))
+sheet_exporter = SheetExporter(sheet_mirror, EXPORT_CACHE_DIR, max_files=EXPORT_CACHE_FILES)
+
+# NEW: Spreadsheet column -> DataTable column id of each historical table (Sheet fallback)
+SHEET_TABLE_COLUMNS = {
+    'historical-table-th-in': {'Temp In': 'temperature_in_historical',
+                               'Humid In': 'humidity_in_historical'},
+    'historical-table-th-out': {'Temp Out': 'temperature_out_historical',
+                                'Humid Out': 'humidity_out_historical'},
+    'historical-table-co2': {'CO2': 'co2-historical'},
+    'historical-table-windspeed': {'Windspeed': 'windspeed-historical'},
+    'historical-table-rainfall': {'Rainfall': 'rainfall-historical'},
+    'historical-table-par': {'PAR': 'par-historical'},
+    'historical-table-eps-ac': {'Voltage AC': 'voltage_ac_historical',
+                                'Current AC': 'current_ac_historical',
+                                'Power AC': 'power_ac_historical'},
+}
+
+def sheet_table_records(table_id, limit):
+    """Newest `limit` spreadsheet rows from the mirror as DataTable rows (newest on top)"""
+    columns = SHEET_TABLE_COLUMNS[table_id]
+    return [dict({'time': str(row.get('Time', ''))},
+                 **{column: row.get(key) for key, column in columns.items()})
+            for row in sheet_mirror.latest(limit)]
+
+# NEW: Site selector options, refreshed whenever a page is opened
+@app_dash.callback(
+    Output('site-selector', 'options'),
+    Input('url', 'pathname')
+)
+def update_site_options(pathname):
+    return [{'label': name, 'value': name} for name in site_shards.names()]
+
 # Callback for main dashboard
 @app_dash.callback(
     [Output({'type': 'sensor-value', 'id': 'suhu-display-indoor'}, 'children'),
@@ -878,19 +1038,21 @@ def display_page(pathname):
      Output({'type': 'sensor-value', 'id': 'windspeed-display'}, 'children'),
      Output({'type': 'sensor-value', 'id': 'rainfall-display'}, 'children'),
      Output({'type': 'sensor-value', 'id': 'par-display'}, 'children')],
-    [Input('interval_mcs', 'n_intervals')]
+    [Input('version_mcs', 'data')]
 )
 def update_main_dashboard(n):
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
     try:
         # Get latest values or default if no data
-        suhu = data['kodeData0211'][-1] if data['kodeData0211'] else DEFAULT_VALUES['kodeData0211']
-        kelembaban = data['kodeData0212'][-1] if data['kodeData0212'] else DEFAULT_VALUES['kodeData0212']
-        suhu_out = data['kodeData0711'][-1] if data['kodeData0711'] else DEFAULT_VALUES['kodeData0711']
-        kelembaban_out = data['kodeData0712'][-1] if data['kodeData0712'] else DEFAULT_VALUES['kodeData0712']
-        co2 = data['kodeData0311'][-1] if data['kodeData0311'] else DEFAULT_VALUES['kodeData0311']
-        windspeed = data['kodeData0411'][-1] if data['kodeData0411'] else DEFAULT_VALUES['kodeData0411']
-        rainfall = data['kodeData0511'][-1] if data['kodeData0511'] else DEFAULT_VALUES['kodeData0511']
-        par = data['kodeData0611'][-1] if data['kodeData0611'] else DEFAULT_VALUES['kodeData0611']
+        suhu = snap.latest('kodeData0211', DEFAULT_VALUES['kodeData0211'])
+        kelembaban = snap.latest('kodeData0212', DEFAULT_VALUES['kodeData0212'])
+        suhu_out = snap.latest('kodeData0711', DEFAULT_VALUES['kodeData0711'])
+        kelembaban_out = snap.latest('kodeData0712', DEFAULT_VALUES['kodeData0712'])
+        co2 = snap.latest('kodeData0311', DEFAULT_VALUES['kodeData0311'])
+        windspeed = snap.latest('kodeData0411', DEFAULT_VALUES['kodeData0411'])
+        rainfall = snap.latest('kodeData0511', DEFAULT_VALUES['kodeData0511'])
+        par = snap.latest('kodeData0611', DEFAULT_VALUES['kodeData0611'])
 
         return (
             f" {suhu}°C",
@@ -912,209 +1074,36 @@ def update_main_dashboard(n):
      Output({'type': 'sensor-value', 'id': 'kelembaban-display-indoor'}, 'children', allow_duplicate=True),
      Output('temp-graph', 'figure'),
      Output('humidity-graph', 'figure')],
-    [Input('interval_thin', 'n_intervals')],
+    [Input('version_thin', 'data')],
     prevent_initial_call=True
 )
 def update_th_in_dashboard(n):
-    try:        
-        # Default values
-        suhu_value = "N/A"
-        kelembaban_value = "N/A"
-        
-        # Empty figures with proper layout
-        empty_temp_fig = go.Figure(layout=dict(
-            title="Temperature Trend",
-            xaxis=dict(title="Time"),
-            yaxis=dict(title="Temperature (°C)", range=[0, 40]),
-            margin=dict(l=40, r=20, t=40, b=30),
-            height=150,
-            plot_bgcolor='rgba(240, 240, 240, 0.9)'
-        ))
-        
-        empty_humid_fig = go.Figure(layout=dict(
-            title="Humidity Trend",
-            xaxis=dict(title="Time"),
-            yaxis=dict(title="Humidity (%)", range=[0, 100]),
-            margin=dict(l=40, r=20, t=40, b=30),
-            height=150,
-            plot_bgcolor='rgba(240, 240, 240, 0.9)'
-        ))
-        
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
+    try:
         # Check if we have data
-        if not data['kodeData0211'] or not data['kodeData0212'] or not data['waktu']:
-            return suhu_value, kelembaban_value, empty_temp_fig, empty_humid_fig
-        
+        if len(snap) == 0:
+            return ("N/A", "N/A",
+                    blank_trend_patch('temp-graph'),
+                    blank_trend_patch('humidity-graph'))
+
         # Get the latest values
-        suhu = data['kodeData0211'][-1] if data['kodeData0211'] else DEFAULT_VALUES['kodeData0211']
-        kelembaban = data['kodeData0212'][-1] if data['kodeData0212'] else DEFAULT_VALUES['kodeData0212']
+        suhu = snap.latest('kodeData0211', DEFAULT_VALUES['kodeData0211'])
+        kelembaban = snap.latest('kodeData0212', DEFAULT_VALUES['kodeData0212'])
         suhu_value = f"{suhu}°C"
         kelembaban_value = f"{kelembaban}%"
-        
-        # Create temperature graph with properly aligned x and y values
-        temp_fig = go.Figure()
 
-        try:
-            # Ensure we have data to work with
-            if len(data['waktu']) > 3 and len(data['kodeData0211']) > 3:
-                # We'll use only 4 data points for simplicity
-                num_points = 4
-                
-                # Select evenly spaced indices from the data
-                indices = np.linspace(0, min(len(data['waktu']), len(data['kodeData0211']))-1, num_points, dtype=int)
-                
-                # Get the selected timestamps and temperature values
-                selected_timestamps = [data['waktu'][i] for i in indices]
-                selected_values = [data['kodeData0211'][i] for i in indices]
-                
-                # Create x values (0, 1, 2) for plotting
-                x_plot = list(range(num_points))
-                
-                # Add the simplified line
-                temp_fig.add_trace(go.Scatter(
-                    x=x_plot,  # Just use 0, 1, 2 for x values
-                    y=selected_values,
-                    mode='lines',
-                    line=dict(color='#FF4B4B', width=3, shape='spline', smoothing=1.3),
-                    fill='tozeroy',
-                    fillcolor='rgba(75, 134, 255, 0.2)',
-                    showlegend=False
-                ))
-                
-                # Set up the axis with only 3 ticks
-                temp_fig.update_layout(
-                    title="Temperature Trend",
-                    xaxis=dict(
-                        title="Time",
-                        tickmode='array',
-                        tickvals=x_plot,  # [0, 1, 2]
-                        ticktext=selected_timestamps,
-                        tickangle=0
-                    ),
-                    yaxis=dict(title="Temperature (°C)", range=[0, 40]),
-                    margin=dict(l=40, r=20, t=40, b=30),
-                    height=150,
-                    plot_bgcolor='rgba(250, 250, 250, 0.9)',
-                    showlegend=False
-                )
-                
-            else:
-                # Fallback for insufficient data
-                temp_fig.add_trace(go.Scatter(
-                    x=[0, 1],
-                    y=[0, 0],
-                    mode='lines',
-                    line=dict(color='#FF4B4B', width=3),
-                    showlegend=False
-                ))
-                temp_fig.update_layout(
-                    title="Temperature Trend - Insufficient Data",
-                    xaxis=dict(title="Time"),
-                    yaxis=dict(title="Temperature (°C)", range=[0, 40]),
-                    height=150,
-                    showlegend=False
-                )
-                
-        except Exception as e:
-            print(f"Error creating temp graph: {e}")
-            # Create a basic empty chart if there's an error
-            temp_fig = go.Figure()
-            temp_fig.add_annotation(
-                text=f"Error creating chart: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False
-            )
-
-        # Create humidity graph with properly aligned x and y values
-        humid_fig = go.Figure()
+        # The figures are in the page layout, only their data and tick labels are sent
+        return (suhu_value, kelembaban_value,
+                trend_patch('temp-graph', snap, TREND_WINDOW),
+                trend_patch('humidity-graph', snap, TREND_WINDOW))
 
-        try:
-            # Ensure we have data to work with
-            if len(data['waktu']) > 3 and len(data['kodeData0212']) > 3:
-                # We'll use only 3 data points for simplicity
-                num_points = 4
-                
-                # Select evenly spaced indices from the data
-                indices = np.linspace(0, min(len(data['waktu']), len(data['kodeData0212']))-1, num_points, dtype=int)
-                
-                # Get the selected timestamps and temperature values
-                selected_timestamps = [data['waktu'][i] for i in indices]
-                selected_values = [data['kodeData0212'][i] for i in indices]
-                
-                # Create x values (0, 1, 2) for plotting
-                x_plot = list(range(num_points))
-                
-                # Add the simplified line
-                humid_fig.add_trace(go.Scatter(
-                    x=x_plot,  # Just use 0, 1, 2 for x values
-                    y=selected_values,
-                    mode='lines',
-                    line=dict(color='#4B86FF', width=3, shape='spline', smoothing=1.3),
-                    fill='tozeroy',
-                    fillcolor='rgba(75, 134, 255, 0.2)',
-                    showlegend=False
-                ))
-                
-                # Set up the axis with only 3 ticks
-                humid_fig.update_layout(
-                    title="Humidity Trend",
-                    xaxis=dict(
-                        title="Time",
-                        tickmode='array',
-                        tickvals=x_plot,  # [0, 1, 2]
-                        ticktext=selected_timestamps,
-                        tickangle=0
-                    ),
-                    yaxis=dict(title="Humidity (%)", range=[0, 100]),
-                    margin=dict(l=40, r=20, t=40, b=30),
-                    height=150,
-                    plot_bgcolor='rgba(250, 250, 250, 0.9)',
-                    showlegend=False
-                )
-                
-            else:
-                # Fallback for insufficient data
-                humid_fig.add_trace(go.Scatter(
-                    x=[0, 1],
-                    y=[0, 0],
-                    mode='lines',
-                    line=dict(color='#4B86FF', width=3),
-                    showlegend=False
-                ))
-                humid_fig.update_layout(
-                    title="Humidity Trend - Insufficient Data",
-                    xaxis=dict(title="Time"),
-                    yaxis=dict(title="Humidity (%)", range=[0, 100]),
-                    height=150,
-                    showlegend=False
-                )
-                
-        except Exception as e:
-            print(f"Error creating humid graph: {e}")
-            # Create a basic empty chart if there's an error
-            humid_fig = go.Figure()
-            humid_fig.add_annotation(
-                text=f"Error creating chart: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False
-            )
-        
-        return suhu_value, kelembaban_value, temp_fig, humid_fig
-    
     except Exception as e:
         print(f"Error in update_th_in_dashboard: {e}")
         # Return default values if there's an error
-        default_fig = go.Figure(layout=dict(
-            title="Data Unavailable",
-            annotations=[dict(
-                text="Error loading data",
-                xref="paper",
-                yref="paper",
-                x=0.5,
-                y=0.5,
-                showarrow=False
-            )]
-        ))
-        return "N/A", "N/A", default_fig, default_fig
+        return ("N/A", "N/A",
+                blank_trend_patch('temp-graph', "Data Unavailable"),
+                blank_trend_patch('humidity-graph', "Data Unavailable"))
     
 # Separate callback for th_out layout - Completely revised version
 @app_dash.callback(
@@ -1122,693 +1111,144 @@ def update_th_in_dashboard(n):
      Output({'type': 'sensor-value', 'id': 'kelembaban-display-outdoor'}, 'children', allow_duplicate=True),
      Output('temp-graph-out', 'figure'),
      Output('humidity-graph-out', 'figure')],
-    [Input('interval_thout', 'n_intervals')],
+    [Input('version_thout', 'data')],
     prevent_initial_call=True
 )
 def update_th_out_dashboard(n):
-    try:        
-        # Default values
-        suhu_value = "N/A"
-        kelembaban_value = "N/A"
-        
-        # Empty figures with proper layout
-        empty_temp_fig = go.Figure(layout=dict(
-            title="Temperature Trend",
-            xaxis=dict(title="Time"),
-            yaxis=dict(title="Temperature (°C)", range=[0, 40]),
-            margin=dict(l=40, r=20, t=40, b=30),
-            height=150,
-            plot_bgcolor='rgba(240, 240, 240, 0.9)'
-        ))
-        
-        empty_humid_fig = go.Figure(layout=dict(
-            title="Humidity Trend",
-            xaxis=dict(title="Time"),
-            yaxis=dict(title="Humidity (%)", range=[0, 100]),
-            margin=dict(l=40, r=20, t=40, b=30),
-            height=150,
-            plot_bgcolor='rgba(240, 240, 240, 0.9)'
-        ))
-        
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
+    try:
         # Check if we have data
-        if not data['kodeData0711'] or not data['kodeData0712'] or not data['waktu']:
-            return suhu_value, kelembaban_value, empty_temp_fig, empty_humid_fig
-        
+        if len(snap) == 0:
+            return ("N/A", "N/A",
+                    blank_trend_patch('temp-graph-out'),
+                    blank_trend_patch('humidity-graph-out'))
+
         # Get the latest values
-        suhu = data['kodeData0711'][-1] if data['kodeData0711'] else DEFAULT_VALUES['kodeData0711']
-        kelembaban = data['kodeData0712'][-1] if data['kodeData0712'] else DEFAULT_VALUES['kodeData0712']
+        suhu = snap.latest('kodeData0711', DEFAULT_VALUES['kodeData0711'])
+        kelembaban = snap.latest('kodeData0712', DEFAULT_VALUES['kodeData0712'])
         suhu_value = f"{suhu}°C"
         kelembaban_value = f"{kelembaban}%"
 
-        # Create temperature graph with properly aligned x and y values
-        temp_fig = go.Figure()
+        # The figures are in the page layout, only their data and tick labels are sent
+        return (suhu_value, kelembaban_value,
+                trend_patch('temp-graph-out', snap, TREND_WINDOW),
+                trend_patch('humidity-graph-out', snap, TREND_WINDOW))
 
-        try:
-            # Ensure we have data to work with
-            if len(data['waktu']) > 3 and len(data['kodeData0711']) > 3:
-                # We'll use only 3 data points for simplicity
-                num_points = 4
-                
-                # Select evenly spaced indices from the data
-                indices = np.linspace(0, min(len(data['waktu']), len(data['kodeData0711']))-1, num_points, dtype=int)
-                
-                # Get the selected timestamps and temperature values
-                selected_timestamps = [data['waktu'][i] for i in indices]
-                selected_values = [data['kodeData0711'][i] for i in indices]
-                
-                # Create x values (0, 1, 2) for plotting
-                x_plot = list(range(num_points))
-                
-                # Add the simplified line
-                temp_fig.add_trace(go.Scatter(
-                    x=x_plot,  # Just use 0, 1, 2 for x values
-                    y=selected_values,
-                    mode='lines',
-                    line=dict(color='#FF4B4B', width=3, shape='spline', smoothing=1.3),
-                    fill='tozeroy',
-                    fillcolor='rgba(75, 134, 255, 0.2)',
-                    showlegend=False
-                ))
-                
-                # Set up the axis with only 3 ticks
-                temp_fig.update_layout(
-                    title="Temperature Trend",
-                    xaxis=dict(
-                        title="Time",
-                        tickmode='array',
-                        tickvals=x_plot,  # [0, 1, 2]
-                        ticktext=selected_timestamps,
-                        tickangle=0
-                    ),
-                    yaxis=dict(title="Temperature (°C)", range=[0, 40]),
-                    margin=dict(l=40, r=20, t=40, b=30),
-                    height=150,
-                    plot_bgcolor='rgba(250, 250, 250, 0.9)',
-                    showlegend=False
-                )
-                
-            else:
-                # Fallback for insufficient data
-                temp_fig.add_trace(go.Scatter(
-                    x=[0, 1],
-                    y=[0, 0],
-                    mode='lines',
-                    line=dict(color='#FF4B4B', width=3),
-                    showlegend=False
-                ))
-                temp_fig.update_layout(
-                    title="Temperature Trend - Insufficient Data",
-                    xaxis=dict(title="Time"),
-                    yaxis=dict(title="Temperature (°C)", range=[0, 40]),
-                    height=150,
-                    showlegend=False
-                )
-                
-        except Exception as e:
-            print(f"Error creating temp graph: {e}")
-            # Create a basic empty chart if there's an error
-            temp_fig = go.Figure()
-            temp_fig.add_annotation(
-                text=f"Error creating chart: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False
-            )
-
-        # Create humidity graph with properly aligned x and y values
-        humid_fig = go.Figure()
-
-        try:
-            # Ensure we have data to work with
-            if len(data['waktu']) > 3 and len(data['kodeData0712']) > 3:
-                # We'll use only 3 data points for simplicity
-                num_points = 4
-                
-                # Select evenly spaced indices from the data
-                indices = np.linspace(0, min(len(data['waktu']), len(data['kodeData0712']))-1, num_points, dtype=int)
-                
-                # Get the selected timestamps and temperature values
-                selected_timestamps = [data['waktu'][i] for i in indices]
-                selected_values = [data['kodeData0712'][i] for i in indices]
-                
-                # Create x values (0, 1, 2) for plotting
-                x_plot = list(range(num_points))
-                
-                # Add the simplified line
-                humid_fig.add_trace(go.Scatter(
-                    x=x_plot,  # Just use 0, 1, 2 for x values
-                    y=selected_values,
-                    mode='lines',
-                    line=dict(color='#4B86FF', width=3, shape='spline', smoothing=1.3),
-                    fill='tozeroy',
-                    fillcolor='rgba(75, 134, 255, 0.2)',
-                    showlegend=False
-                ))
-                
-                # Set up the axis with only 3 ticks
-                humid_fig.update_layout(
-                    title="Humidity Trend",
-                    xaxis=dict(
-                        title="Time",
-                        tickmode='array',
-                        tickvals=x_plot,  # [0, 1, 2]
-                        ticktext=selected_timestamps,
-                        tickangle=0
-                    ),
-                    yaxis=dict(title="Humidity (%)", range=[0, 100]),
-                    margin=dict(l=40, r=20, t=40, b=30),
-                    height=150,
-                    plot_bgcolor='rgba(250, 250, 250, 0.9)',
-                    showlegend=False
-                )
-                
-            else:
-                # Fallback for insufficient data
-                humid_fig.add_trace(go.Scatter(
-                    x=[0, 1],
-                    y=[0, 0],
-                    mode='lines',
-                    line=dict(color='#4B86FF', width=3),
-                    showlegend=False
-                ))
-                humid_fig.update_layout(
-                    title="Humidity Trend - Insufficient Data",
-                    xaxis=dict(title="Time"),
-                    yaxis=dict(title="Humidity (%)", range=[0, 100]),
-                    height=150,
-                    showlegend=False
-                )
-                
-        except Exception as e:
-            print(f"Error creating humid graph: {e}")
-            # Create a basic empty chart if there's an error
-            humid_fig = go.Figure()
-            humid_fig.add_annotation(
-                text=f"Error creating chart: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False
-            )
-        return suhu_value, kelembaban_value, temp_fig, humid_fig
-    
     except Exception as e:
-        print(f"Error in update_th_in_dashboard: {e}")
+        print(f"Error in update_th_out_dashboard: {e}")
         # Return default values if there's an error
-        default_fig = go.Figure(layout=dict(
-            title="Data Unavailable",
-            annotations=[dict(
-                text="Error loading data",
-                xref="paper",
-                yref="paper",
-                x=0.5,
-                y=0.5,
-                showarrow=False
-            )]
-        ))
-        return "N/A", "N/A", default_fig, default_fig
+        return ("N/A", "N/A",
+                blank_trend_patch('temp-graph-out', "Data Unavailable"),
+                blank_trend_patch('humidity-graph-out', "Data Unavailable"))
     
 # Separate callback for windspeed layout - Completely revised version
 @app_dash.callback(
     [Output({'type': 'sensor-value', 'id': 'windspeed-display'}, 'children', allow_duplicate=True),
      Output('windspeed-graph', 'figure')],
-    [Input('interval_windspeed', 'n_intervals')],
+    [Input('version_windspeed', 'data')],
     prevent_initial_call=True
 )
 def update_windspeed_dashboard(n):
-    try:        
-        # Default values
-        windspeed_value = "N/A"
-        
-        # Empty figures with proper layout
-        empty_windspeed_fig = go.Figure(layout=dict(
-            title="Windspeed Trend",
-            xaxis=dict(title="Time"),
-            yaxis=dict(title="Windspeed (m/s)", range=[0, 70]),
-            margin=dict(l=40, r=20, t=40, b=30),
-            height=300,
-            plot_bgcolor='rgba(240, 240, 240, 0.9)'
-        ))
-        
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
+    try:
         # Check if we have data
-        if not data['kodeData0411'] or not data['waktu']:
-            return windspeed_value, empty_windspeed_fig
-        
+        if len(snap) == 0:
+            return "N/A", blank_trend_patch('windspeed-graph')
+
         # Get the latest values
-        windspeed = data['kodeData0411'][-1] if data['kodeData0411'] else DEFAULT_VALUES['kodeData0411']
+        windspeed = snap.latest('kodeData0411', DEFAULT_VALUES['kodeData0411'])
         windspeed_value = f"{windspeed}m/s"
-        
-        # Create windspeed graph with properly aligned x and y values
-        windspeed_fig = go.Figure()
 
-        try:
-            # Ensure we have data to work with
-            if len(data['waktu']) > 3 and len(data['kodeData0411']) > 3:
-                # We'll use only 3 data points for simplicity
-                num_points = 4
-                
-                # Select evenly spaced indices from the data
-                indices = np.linspace(0, min(len(data['waktu']), len(data['kodeData0411']))-1, num_points, dtype=int)
-                
-                # Get the selected timestamps and temperature values
-                selected_timestamps = [data['waktu'][i] for i in indices]
-                selected_values = [data['kodeData0411'][i] for i in indices]
-                
-                # Create x values (0, 1, 2) for plotting
-                x_plot = list(range(num_points))
-                
-                # Add the simplified line
-                windspeed_fig.add_trace(go.Scatter(
-                    x=x_plot,  # Just use 0, 1, 2 for x values
-                    y=selected_values,
-                    mode='lines',
-                    line=dict(color='#4B86FF', width=3, shape='spline', smoothing=1.3),
-                    fill='tozeroy',
-                    fillcolor='rgba(75, 134, 255, 0.2)',
-                    showlegend=False
-                ))
-                
-                # Set up the axis with only 3 ticks
-                windspeed_fig.update_layout(
-                    title="Windspeed Trend",
-                    xaxis=dict(
-                        title="Time",
-                        tickmode='array',
-                        tickvals=x_plot,  # [0, 1, 2]
-                        ticktext=selected_timestamps,
-                        tickangle=0
-                    ),
-                    yaxis=dict(title="Windspeed (m/s)", range=[0, 70]),
-                    margin=dict(l=40, r=20, t=40, b=30),
-                    height=300,
-                    plot_bgcolor='rgba(250, 250, 250, 0.9)',
-                    showlegend=False
-                )
-                
-            else:
-                # Fallback for insufficient data
-                windspeed_fig.add_trace(go.Scatter(
-                    x=[0, 1],
-                    y=[0, 0],
-                    mode='lines',
-                    line=dict(color='#4B86FF', width=3),
-                    showlegend=False
-                ))
-                windspeed_fig.update_layout(
-                    title="Windspeed Trend - Insufficient Data",
-                    xaxis=dict(title="Time"),
-                    yaxis=dict(title="Windspeed (m/s)", range=[0, 70]),
-                    height=300,
-                    showlegend=False
-                )
-                
-        except Exception as e:
-            print(f"Error creating windspeed graph: {e}")
-            # Create a basic empty chart if there's an error
-            windspeed_fig = go.Figure()
-            windspeed_fig.add_annotation(
-                text=f"Error creating chart: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False
-            )
-        return windspeed_value, windspeed_fig
-    
+        # The figures are in the page layout, only their data and tick labels are sent
+        return windspeed_value, trend_patch('windspeed-graph', snap, TREND_WINDOW)
+
     except Exception as e:
-        print(f"Error in update_th_in_dashboard: {e}")
+        print(f"Error in update_windspeed_dashboard: {e}")
         # Return default values if there's an error
-        default_fig = go.Figure(layout=dict(
-            title="Data Unavailable",
-            annotations=[dict(
-                text="Error loading data",
-                xref="paper",
-                yref="paper",
-                x=0.5,
-                y=0.5,
-                showarrow=False
-            )]
-        ))
-        return "N/A", default_fig
+        return "N/A", blank_trend_patch('windspeed-graph', "Data Unavailable")
     
 # Separate callback for rainfall layout - Completely revised version
 @app_dash.callback(
     [Output({'type': 'sensor-value', 'id': 'rainfall-display'}, 'children', allow_duplicate=True),
      Output('rainfall-graph', 'figure')],
-    [Input('interval_rainfall', 'n_intervals')],
+    [Input('version_rainfall', 'data')],
     prevent_initial_call=True
 )
 def update_rainfall_dashboard(n):
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
     try:
-        # Default values
-        rainfall_value = "N/A"
-        
-        # Empty figures with proper layout
-        empty_rainfall_fig = go.Figure(layout=dict(
-            title="Rainfall Trend",
-            xaxis=dict(title="Time"),
-            yaxis=dict(title="Rainfall (mm)", range=[0, 70]),
-            margin=dict(l=40, r=20, t=40, b=30),
-            height=300,
-            plot_bgcolor='rgba(240, 240, 240, 0.9)'
-        ))
-        
         # Check if we have data
-        if not data['kodeData0511'] or not data['waktu']:
-            return rainfall_value, empty_rainfall_fig
-        
+        if len(snap) == 0:
+            return "N/A", blank_trend_patch('rainfall-graph')
+
         # Get the latest values
-        rainfall = data['kodeData0511'][-1] if data['kodeData0511'] else DEFAULT_VALUES['kodeData0511']
+        rainfall = snap.latest('kodeData0511', DEFAULT_VALUES['kodeData0511'])
         rainfall_value = f"{rainfall}mm"
-        
-        # Create rainfall graph with properly aligned x and y values
-        rainfall_fig = go.Figure()
 
-        try:
-            # Ensure we have data to work with
-            if len(data['waktu']) > 3 and len(data['kodeData0511']) > 3:
-                # We'll use only 3 data points for simplicity
-                num_points = 4
-                
-                # Select evenly spaced indices from the data
-                indices = np.linspace(0, min(len(data['waktu']), len(data['kodeData0511']))-1, num_points, dtype=int)
-                
-                # Get the selected timestamps and temperature values
-                selected_timestamps = [data['waktu'][i] for i in indices]
-                selected_values = [data['kodeData0511'][i] for i in indices]
-                
-                # Create x values (0, 1, 2) for plotting
-                x_plot = list(range(num_points))
-                
-                # Add the simplified line
-                rainfall_fig.add_trace(go.Scatter(
-                    x=x_plot,  # Just use 0, 1, 2 for x values
-                    y=selected_values,
-                    mode='lines',
-                    line=dict(color='#4B86FF', width=3, shape='spline', smoothing=1.3),
-                    fill='tozeroy',
-                    fillcolor='rgba(75, 134, 255, 0.2)',
-                    showlegend=False
-                ))
-                
-                # Set up the axis with only 3 ticks
-                rainfall_fig.update_layout(
-                    title="Rainfall Trend",
-                    xaxis=dict(
-                        title="Time",
-                        tickmode='array',
-                        tickvals=x_plot,  # [0, 1, 2]
-                        ticktext=selected_timestamps,
-                        tickangle=0
-                    ),
-                    yaxis=dict(title="Rainfall (mm)", range=[0, 70]),
-                    margin=dict(l=40, r=20, t=40, b=30),
-                    height=300,
-                    plot_bgcolor='rgba(250, 250, 250, 0.9)',
-                    showlegend=False
-                )
-                
-            else:
-                # Fallback for insufficient data
-                rainfall_fig.add_trace(go.Scatter(
-                    x=[0, 1],
-                    y=[0, 0],
-                    mode='lines',
-                    line=dict(color='#4B86FF', width=3),
-                    showlegend=False
-                ))
-                rainfall_fig.update_layout(
-                    title="Rainfall Trend - Insufficient Data",
-                    xaxis=dict(title="Time"),
-                    yaxis=dict(title="Rainfall (mm)", range=[0, 70]),
-                    height=300,
-                    showlegend=False
-                )
-                
-        except Exception as e:
-            print(f"Error creating rainfall graph: {e}")
-            # Create a basic empty chart if there's an error
-            rainfall_fig = go.Figure()
-            rainfall_fig.add_annotation(
-                text=f"Error creating chart: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False
-            )
-        return rainfall_value, rainfall_fig
-    
+        # The figures are in the page layout, only their data and tick labels are sent
+        return rainfall_value, trend_patch('rainfall-graph', snap, TREND_WINDOW)
+
     except Exception as e:
-        print(f"Error in update_th_in_dashboard: {e}")
+        print(f"Error in update_rainfall_dashboard: {e}")
         # Return default values if there's an error
-        default_fig = go.Figure(layout=dict(
-            title="Data Unavailable",
-            annotations=[dict(
-                text="Error loading data",
-                xref="paper",
-                yref="paper",
-                x=0.5,
-                y=0.5,
-                showarrow=False
-            )]
-        ))
-        return "N/A", default_fig
+        return "N/A", blank_trend_patch('rainfall-graph', "Data Unavailable")
     
 # Separate callback for co2 layout - Completely revised version
 @app_dash.callback(
     [Output({'type': 'sensor-value', 'id': 'co2-display'}, 'children', allow_duplicate=True),
      Output('co2-graph', 'figure')],
-    [Input('interval_co2', 'n_intervals')],
+    [Input('version_co2', 'data')],
     prevent_initial_call=True
 )
 def update_co2_dashboard(n):
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
     try:
-        # Default values
-        co2_value = "N/A"
-        
-        # Empty figures with proper layout
-        co2_fig = go.Figure(layout=dict(
-            title="CO2 Trend",
-            xaxis=dict(title="Time"),
-            yaxis=dict(title="CO2 (PPM)", range=[0, 2000]),
-            margin=dict(l=40, r=20, t=40, b=30),
-            height=300,
-            plot_bgcolor='rgba(240, 240, 240, 0.9)'
-        ))
-        
         # Check if we have data
-        if not data['kodeData0311'] or not data['waktu']:
-            return co2_value, co2_fig
-        
+        if len(snap) == 0:
+            return "N/A", blank_trend_patch('co2-graph')
+
         # Get the latest values
-        co2 = data['kodeData0311'][-1] if data['kodeData0311'] else DEFAULT_VALUES['kodeData0311']
+        co2 = snap.latest('kodeData0311', DEFAULT_VALUES['kodeData0311'])
         co2_value = f"{co2}PPM"
-        
 
-        # Create co2 graph with properly aligned x and y values
-        co2_fig = go.Figure()
+        # The figures are in the page layout, only their data and tick labels are sent
+        return co2_value, trend_patch('co2-graph', snap, TREND_WINDOW)
 
-        try:
-            # Ensure we have data to work with
-            if len(data['waktu']) > 3 and len(data['kodeData0311']) > 3:
-                # We'll use only 3 data points for simplicity
-                num_points = 4
-                
-                # Select evenly spaced indices from the data
-                indices = np.linspace(0, min(len(data['waktu']), len(data['kodeData0311']))-1, num_points, dtype=int)
-                
-                # Get the selected timestamps and temperature values
-                selected_timestamps = [data['waktu'][i] for i in indices]
-                selected_values = [data['kodeData0311'][i] for i in indices]
-                
-                # Create x values (0, 1, 2) for plotting
-                x_plot = list(range(num_points))
-                
-                # Add the simplified line
-                co2_fig.add_trace(go.Scatter(
-                    x=x_plot,  # Just use 0, 1, 2 for x values
-                    y=selected_values,
-                    mode='lines',
-                    line=dict(color='#4B86FF', width=3, shape='spline', smoothing=1.3),
-                    fill='tozeroy',
-                    fillcolor='rgba(75, 134, 255, 0.2)',
-                    showlegend=False
-                ))
-                
-                # Set up the axis with only 3 ticks
-                co2_fig.update_layout(
-                    title="CO2 Trend",
-                    xaxis=dict(
-                        title="Time",
-                        tickmode='array',
-                        tickvals=x_plot,  # [0, 1, 2]
-                        ticktext=selected_timestamps,
-                        tickangle=0
-                    ),
-                    yaxis=dict(title="CO2 (PPM)", range=[0, 2000]),
-                    margin=dict(l=40, r=20, t=40, b=30),
-                    height=300,
-                    plot_bgcolor='rgba(250, 250, 250, 0.9)',
-                    showlegend=False
-                )
-                
-            else:
-                # Fallback for insufficient data
-                co2_fig.add_trace(go.Scatter(
-                    x=[0, 1],
-                    y=[0, 0],
-                    mode='lines',
-                    line=dict(color='#4B86FF', width=3),
-                    showlegend=False
-                ))
-                co2_fig.update_layout(
-                    title="CO2 Trend - Insufficient Data",
-                    xaxis=dict(title="Time"),
-                    yaxis=dict(title="CO2 (PPM)", range=[0, 2000]),
-                    height=300,
-                    showlegend=False
-                )
-                
-        except Exception as e:
-            print(f"Error creating co2 graph: {e}")
-            # Create a basic empty chart if there's an error
-            co2_fig = go.Figure()
-            co2_fig.add_annotation(
-                text=f"Error creating chart: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False
-            )
-        return co2_value, co2_fig
-    
     except Exception as e:
-        print(f"Error in update_th_in_dashboard: {e}")
+        print(f"Error in update_co2_dashboard: {e}")
         # Return default values if there's an error
-        default_fig = go.Figure(layout=dict(
-            title="Data Unavailable",
-            annotations=[dict(
-                text="Error loading data",
-                xref="paper",
-                yref="paper",
-                x=0.5,
-                y=0.5,
-                showarrow=False
-            )]
-        ))
-        return "N/A", default_fig
+        return "N/A", blank_trend_patch('co2-graph', "Data Unavailable")
     
 # Separate callback for PAR layout - Completely revised version
 @app_dash.callback(
     [Output({'type': 'sensor-value', 'id': 'par-display'}, 'children', allow_duplicate=True),
      Output('par-graph', 'figure')],
-    [Input('interval_par', 'n_intervals')],
+    [Input('version_par', 'data')],
     prevent_initial_call=True
 )
 def update_par_dashboard(n):
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
     try:
-        # Default values
-        par_value = "N/A"
-        
-        # Empty figures with proper layout
-        par_fig = go.Figure(layout=dict(
-            title="PAR Trend",
-            xaxis=dict(title="Time"),
-            yaxis=dict(title="PAR (μmol/m²/s)", range=[0, 2500]),
-            margin=dict(l=40, r=20, t=40, b=30),
-            height=300,
-            plot_bgcolor='rgba(240, 240, 240, 0.9)'
-        ))
-        
         # Check if we have data
-        if not data['kodeData0611'] or not data['waktu']:
-            return par_value, par_fig
-        
+        if len(snap) == 0:
+            return "N/A", blank_trend_patch('par-graph')
+
         # Get the latest values
-        par = data['kodeData0611'][-1] if data['kodeData0611'] else DEFAULT_VALUES['kodeData0611']
+        par = snap.latest('kodeData0611', DEFAULT_VALUES['kodeData0611'])
         par_value = f"{par}μmol/m²/s"
-        
-        # Create par graph with properly aligned x and y values
-        par_fig = go.Figure()
 
-        try:
-            # Ensure we have data to work with
-            if len(data['waktu']) > 3 and len(data['kodeData0611']) > 3:
-                # We'll use only 3 data points for simplicity
-                num_points = 4
-                
-                # Select evenly spaced indices from the data
-                indices = np.linspace(0, min(len(data['waktu']), len(data['kodeData0611']))-1, num_points, dtype=int)
-                
-                # Get the selected timestamps and temperature values
-                selected_timestamps = [data['waktu'][i] for i in indices]
-                selected_values = [data['kodeData0611'][i] for i in indices]
-                
-                # Create x values (0, 1, 2) for plotting
-                x_plot = list(range(num_points))
-                
-                # Add the simplified line
-                par_fig.add_trace(go.Scatter(
-                    x=x_plot,  # Just use 0, 1, 2 for x values
-                    y=selected_values,
-                    mode='lines',
-                    line=dict(color='#4B86FF', width=3, shape='spline', smoothing=1.3),
-                    fill='tozeroy',
-                    fillcolor='rgba(75, 134, 255, 0.2)',
-                    showlegend=False
-                ))
-                
-                # Set up the axis with only 3 ticks
-                par_fig.update_layout(
-                    title="PAR Trend",
-                    xaxis=dict(
-                        title="Time",
-                        tickmode='array',
-                        tickvals=x_plot,  # [0, 1, 2]
-                        ticktext=selected_timestamps,
-                        tickangle=0
-                    ),
-                    yaxis=dict(title="PAR (μmol/m²/s)", range=[0, 2500]),
-                    margin=dict(l=40, r=20, t=40, b=30),
-                    height=300,
-                    plot_bgcolor='rgba(250, 250, 250, 0.9)',
-                    showlegend=False
-                )
-                
-            else:
-                # Fallback for insufficient data
-                par_fig.add_trace(go.Scatter(
-                    x=[0, 1],
-                    y=[0, 0],
-                    mode='lines',
-                    line=dict(color='#4B86FF', width=3),
-                    showlegend=False
-                ))
-                par_fig.update_layout(
-                    title="PAR Trend - Insufficient Data",
-                    xaxis=dict(title="Time"),
-                    yaxis=dict(title="PAR (μmol/m²/s)", range=[0, 2500]),
-                    height=300,
-                    showlegend=False
-                )
-                
-        except Exception as e:
-            print(f"Error creating par graph: {e}")
-            # Create a basic empty chart if there's an error
-            par_fig = go.Figure()
-            par_fig.add_annotation(
-                text=f"Error creating chart: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False
-            )
-        return par_value, par_fig
-    
+        # The figures are in the page layout, only their data and tick labels are sent
+        return par_value, trend_patch('par-graph', snap, TREND_WINDOW)
+
     except Exception as e:
-        print(f"Error in update_th_in_dashboard: {e}")
+        print(f"Error in update_par_dashboard: {e}")
         # Return default values if there's an error
-        default_fig = go.Figure(layout=dict(
-            title="Data Unavailable",
-            annotations=[dict(
-                text="Error loading data",
-                xref="paper",
-                yref="paper",
-                x=0.5,
-                y=0.5,
-                showarrow=False
-            )]
-        ))
-        return "N/A", default_fig
+        return "N/A", blank_trend_patch('par-graph', "Data Unavailable")
 
 # Separate callback for eps_ac layout - Updated for EPS AC parameters
 @app_dash.callback(
@@ -1819,332 +1259,76 @@ def update_par_dashboard(n):
      Output('current-ac-graph', 'figure'),
      Output('power-ac-graph', 'figure'),
      ],
-    [Input('interval_eps_ac', 'n_intervals')],
+    [Input('version_eps_ac', 'data')],
     prevent_initial_call=True
 )
 def update_eps_ac_dashboard(n):
-    try:        
-        # Default values
-        voltage_ac_value = "N/A"
-        current_ac_value = "N/A"
-        power_ac_value = "N/A"
-        
-        # Empty figures with proper layout
-        empty_voltage_ac_fig = go.Figure(layout=dict(
-            title="Voltage AC Trend",
-            xaxis=dict(title="Time"),
-            yaxis=dict(title="Voltage AC (V)", range=[0, 250]),
-            margin=dict(l=40, r=20, t=40, b=30),
-            height=190,
-            plot_bgcolor='rgba(240, 240, 240, 0.9)'
-        ))
-        
-        empty_current_ac_fig = go.Figure(layout=dict(
-            title="Current AC Trend",
-            xaxis=dict(title="Time"),
-            yaxis=dict(title="Current AC (A)", range=[0, 2]),
-            margin=dict(l=40, r=20, t=40, b=30),
-            height=190,
-            plot_bgcolor='rgba(240, 240, 240, 0.9)'
-        ))
-
-        empty_power_ac_fig = go.Figure(layout=dict(
-            title="Power AC Trend",
-            xaxis=dict(title="Time"),
-            yaxis=dict(title="Power AC (W)", range=[0, 10]),
-            margin=dict(l=40, r=20, t=40, b=30),
-            height=190,
-            plot_bgcolor='rgba(240, 240, 240, 0.9)'
-        ))
-        
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
+    try:
         # Check if we have data
-        if not data['kodeData0911'] or not data['kodeData0912'] or not data['kodeData0913'] or not data['waktu']:
-            return voltage_ac_value, current_ac_value, power_ac_value, empty_voltage_ac_fig, empty_current_ac_fig, empty_power_ac_fig
-        
+        if len(snap) == 0:
+            return ("N/A", "N/A", "N/A",
+                    blank_trend_patch('voltage-ac-graph'),
+                    blank_trend_patch('current-ac-graph'),
+                    blank_trend_patch('power-ac-graph'))
+
         # Get the latest values
-        voltage_ac = data['kodeData0911'][-1] if data['kodeData0911'] else DEFAULT_VALUES.get('kodeData0911', 0)
-        current_ac = data['kodeData0912'][-1] if data['kodeData0912'] else DEFAULT_VALUES.get('kodeData0912', 0)
-        power_ac = data['kodeData0913'][-1] if data['kodeData0913'] else DEFAULT_VALUES.get('kodeData0913', 0)
-        
+        voltage_ac = snap.latest('kodeData0911', DEFAULT_VALUES.get('kodeData0911', 0))
+        current_ac = snap.latest('kodeData0912', DEFAULT_VALUES.get('kodeData0912', 0))
+        power_ac = snap.latest('kodeData0913', DEFAULT_VALUES.get('kodeData0913', 0))
         voltage_ac_value = f"{voltage_ac} V"
         current_ac_value = f"{current_ac} A"
         power_ac_value = f"{power_ac} W"
-        
-        # Create voltage AC graph
-        voltage_ac_fig = go.Figure()
-
-        try:
-            # Ensure we have data to work with
-            if len(data['waktu']) > 3 and len(data['kodeData0911']) > 3:
-                # We'll use only 4 data points for simplicity
-                num_points = 4
-                
-                # Select evenly spaced indices from the data
-                indices = np.linspace(0, min(len(data['waktu']), len(data['kodeData0911']))-1, num_points, dtype=int)
-                
-                # Get the selected timestamps and voltage values
-                selected_timestamps = [data['waktu'][i] for i in indices]
-                selected_values = [data['kodeData0911'][i] for i in indices]
-                
-                # Create x values (0, 1, 2, 3) for plotting
-                x_plot = list(range(num_points))
-                
-                # Add the simplified line
-                voltage_ac_fig.add_trace(go.Scatter(
-                    x=x_plot,
-                    y=selected_values,
-                    mode='lines',
-                    line=dict(color='#FF6B35', width=3, shape='spline', smoothing=1.3),
-                    fill='tozeroy',
-                    fillcolor='rgba(255, 107, 53, 0.2)',
-                    showlegend=False
-                ))
-                
-                # Set up the axis with only 4 ticks
-                voltage_ac_fig.update_layout(
-                    title="Voltage AC Trend",
-                    xaxis=dict(
-                        title="Time",
-                        tickmode='array',
-                        tickvals=x_plot,
-                        ticktext=selected_timestamps,
-                        tickangle=0
-                    ),
-                    yaxis=dict(title="Voltage AC (V)", range=[0, 250]),
-                    margin=dict(l=40, r=20, t=40, b=30),
-                    height=190,
-                    plot_bgcolor='rgba(250, 250, 250, 0.9)',
-                    showlegend=False
-                )
-                
-            else:
-                # Fallback for insufficient data
-                voltage_ac_fig.add_trace(go.Scatter(
-                    x=[0, 1],
-                    y=[0, 0],
-                    mode='lines',
-                    line=dict(color='#FF6B35', width=3),
-                    showlegend=False
-                ))
-                voltage_ac_fig.update_layout(
-                    title="Voltage AC Trend - Insufficient Data",
-                    xaxis=dict(title="Time"),
-                    yaxis=dict(title="Voltage AC (V)", range=[0, 250]),
-                    height=190,
-                    showlegend=False
-                )
-                
-        except Exception as e:
-            print(f"Error creating voltage AC graph: {e}")
-            voltage_ac_fig = empty_voltage_ac_fig
-
-        # Create current AC graph
-        current_ac_fig = go.Figure()
-
-        try:
-            # Ensure we have data to work with
-            if len(data['waktu']) > 3 and len(data['kodeData0912']) > 3:
-                # We'll use only 4 data points for simplicity
-                num_points = 4
-                
-                # Select evenly spaced indices from the data
-                indices = np.linspace(0, min(len(data['waktu']), len(data['kodeData0912']))-1, num_points, dtype=int)
-                
-                # Get the selected timestamps and current values
-                selected_timestamps = [data['waktu'][i] for i in indices]
-                selected_values = [data['kodeData0912'][i] for i in indices]
-                
-                # Create x values (0, 1, 2, 3) for plotting
-                x_plot = list(range(num_points))
-                
-                # Add the simplified line
-                current_ac_fig.add_trace(go.Scatter(
-                    x=x_plot,
-                    y=selected_values,
-                    mode='lines',
-                    line=dict(color="#0011FF", width=3, shape='spline', smoothing=1.3),
-                    fill='tozeroy',
-                    fillcolor='rgba(78, 205, 196, 0.2)',
-                    showlegend=False
-                ))
-                
-                # Set up the axis with only 4 ticks
-                current_ac_fig.update_layout(
-                    title="Current AC Trend",
-                    xaxis=dict(
-                        title="Time",
-                        tickmode='array',
-                        tickvals=x_plot,
-                        ticktext=selected_timestamps,
-                        tickangle=0
-                    ),
-                    yaxis=dict(title="Current AC (A)", range=[0, 2]),
-                    margin=dict(l=40, r=20, t=40, b=30),
-                    height=190,
-                    plot_bgcolor='rgba(250, 250, 250, 0.9)',
-                    showlegend=False
-                )
-                
-            else:
-                # Fallback for insufficient data
-                current_ac_fig.add_trace(go.Scatter(
-                    x=[0, 1],
-                    y=[0, 0],
-                    mode='lines',
-                    line=dict(color='#0011FF', width=3),
-                    showlegend=False
-                ))
-                current_ac_fig.update_layout(
-                    title="Current AC Trend - Insufficient Data",
-                    xaxis=dict(title="Time"),
-                    yaxis=dict(title="Current AC (A)", range=[0, 2]),
-                    height=190,
-                    showlegend=False
-                )
-                
-        except Exception as e:
-            print(f"Error creating current AC graph: {e}")
-            current_ac_fig = empty_current_ac_fig
 
-        # Create power AC graph
-        power_ac_fig = go.Figure()
+        # The figures are in the page layout, only their data and tick labels are sent
+        return (voltage_ac_value, current_ac_value, power_ac_value,
+                trend_patch('voltage-ac-graph', snap, TREND_WINDOW),
+                trend_patch('current-ac-graph', snap, TREND_WINDOW),
+                trend_patch('power-ac-graph', snap, TREND_WINDOW))
 
-        try:
-            # Ensure we have data to work with
-            if len(data['waktu']) > 3 and len(data['kodeData0913']) > 3:
-                # We'll use only 4 data points for simplicity
-                num_points = 4
-                
-                # Select evenly spaced indices from the data
-                indices = np.linspace(0, min(len(data['waktu']), len(data['kodeData0913']))-1, num_points, dtype=int)
-                
-                # Get the selected timestamps and power values
-                selected_timestamps = [data['waktu'][i] for i in indices]
-                selected_values = [data['kodeData0913'][i] for i in indices]
-                
-                # Create x values (0, 1, 2, 3) for plotting
-                x_plot = list(range(num_points))
-                
-                # Add the simplified line
-                power_ac_fig.add_trace(go.Scatter(
-                    x=x_plot,
-                    y=selected_values,
-                    mode='lines',
-                    line=dict(color="#FF0000", width=3, shape='spline', smoothing=1.3),
-                    fill='tozeroy',
-                    fillcolor='rgba(168, 230, 207, 0.2)',
-                    showlegend=False
-                ))
-                
-                # Set up the axis with only 4 ticks
-                power_ac_fig.update_layout(
-                    title="Power AC Trend",
-                    xaxis=dict(
-                        title="Time",
-                        tickmode='array',
-                        tickvals=x_plot,
-                        ticktext=selected_timestamps,
-                        tickangle=0
-                    ),
-                    yaxis=dict(title="Power AC (W)", range=[0, 10]),
-                    margin=dict(l=40, r=20, t=40, b=30),
-                    height=190,
-                    plot_bgcolor='rgba(250, 250, 250, 0.9)',
-                    showlegend=False
-                )
-                
-            else:
-                # Fallback for insufficient data
-                power_ac_fig.add_trace(go.Scatter(
-                    x=[0, 1],
-                    y=[0, 0],
-                    mode='lines',
-                    line=dict(color='#FF0000', width=3),
-                    showlegend=False
-                ))
-                power_ac_fig.update_layout(
-                    title="Power AC Trend - Insufficient Data",
-                    xaxis=dict(title="Time"),
-                    yaxis=dict(title="Power AC (W)", range=[0, 10]),
-                    height=190,
-                    showlegend=False
-                )
-                
-        except Exception as e:
-            print(f"Error creating power AC graph: {e}")
-            power_ac_fig = empty_power_ac_fig
-        
-        return voltage_ac_value, current_ac_value, power_ac_value, voltage_ac_fig, current_ac_fig, power_ac_fig
-    
     except Exception as e:
         print(f"Error in update_eps_ac_dashboard: {e}")
         # Return default values if there's an error
-        default_fig = go.Figure(layout=dict(
-            title="Data Unavailable",
-            annotations=[dict(
-                text="Error loading data",
-                xref="paper",
-                yref="paper",
-                x=0.5,
-                y=0.5,
-                showarrow=False
-            )]
-        ))
-        return "N/A", "N/A", "N/A", default_fig, default_fig, default_fig
+        return ("N/A", "N/A", "N/A",
+                blank_trend_patch('voltage-ac-graph', "Data Unavailable"),
+                blank_trend_patch('current-ac-graph', "Data Unavailable"),
+                blank_trend_patch('power-ac-graph', "Data Unavailable"))
     
 # Callbacks to update the realtime table
 @app_dash.callback(
     Output('realtime-table', 'data'),
-    Input('interval_mcs', 'n_intervals')
+    Input('version_mcs', 'data')
 )
 def update_realtime_table(n_intervals):
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n_intervals)
     # Prepare data for the table
     table_data = []
     
     # Only add rows if we have data
-    if len(data['waktu']) > 0:
-        # Get the most recent 10 data points (or fewer if less than 10 available)
-        num_records = min(10, len(data['waktu']))
-        start_index = max(0, len(data['waktu']) - num_records)
+    num_records = min(TREND_WINDOW, len(snap))
+    if num_records > 0:
+        # Views over the most recent rows (oldest first), formatted only here
+        times = format_time_labels(snap.epochs(num_records))
+        columns = {code: snap.window(code, num_records) for code in TABLE_DATA_CODES}
         
         # Loop through the most recent data points in reverse order (newest first)
-        for i in range(len(data['waktu']) - 1, start_index - 1, -1):
+        for i in range(num_records - 1, -1, -1):
             try:
                 table_row = {
-                    "Time": data['waktu'][i] if i < len(data['waktu']) else "N/A",
-                    "Temp In (°C)": safe_float_convert(
-                        data['kodeData0211'][i] if i < len(data['kodeData0211']) else None
-                    ),
-                    "Humidity In (%)": safe_float_convert(
-                        data['kodeData0212'][i] if i < len(data['kodeData0212']) else None
-                    ),
-                    "Temp Out (°C)": safe_float_convert(
-                        data['kodeData0711'][i] if i < len(data['kodeData0711']) else None
-                    ),
-                    "Humidity Out (%)": safe_float_convert(
-                        data['kodeData0712'][i] if i < len(data['kodeData0712']) else None
-                    ),
-                    "PAR (μmol/m²/s)": safe_float_convert(
-                        data['kodeData0611'][i] if i < len(data['kodeData0611']) else None
-                    ),
-                    "CO2 (PPM)": safe_float_convert(
-                        data['kodeData0311'][i] if i < len(data['kodeData0311']) else None
-                    ),
-                    "Windspeed (m/s)": safe_float_convert(
-                        data['kodeData0411'][i] if i < len(data['kodeData0411']) else None
-                    ),
-                    "Rainfall (mm)": safe_float_convert(
-                        data['kodeData0511'][i] if i < len(data['kodeData0511']) else None
-                    ),
-                    "Voltage AC (V)": safe_float_convert(
-                        data['kodeData0911'][i] if i < len(data['kodeData0911']) else None
-                    ),
-                    "Current AC (A)": safe_float_convert(
-                        data['kodeData0912'][i] if i < len(data['kodeData0912']) else None
-                    ),
-                    "Power AC (W)": safe_float_convert(
-                        data['kodeData0913'][i] if i < len(data['kodeData0913']) else None
-                    ),
+                    "Time": times[i],
+                    "Temp In (°C)": safe_float_convert(columns['kodeData0211'][i]),
+                    "Humidity In (%)": safe_float_convert(columns['kodeData0212'][i]),
+                    "Temp Out (°C)": safe_float_convert(columns['kodeData0711'][i]),
+                    "Humidity Out (%)": safe_float_convert(columns['kodeData0712'][i]),
+                    "PAR (μmol/m²/s)": safe_float_convert(columns['kodeData0611'][i]),
+                    "CO2 (PPM)": safe_float_convert(columns['kodeData0311'][i]),
+                    "Windspeed (m/s)": safe_float_convert(columns['kodeData0411'][i]),
+                    "Rainfall (mm)": safe_float_convert(columns['kodeData0511'][i]),
+                    "Voltage AC (V)": safe_float_convert(columns['kodeData0911'][i]),
+                    "Current AC (A)": safe_float_convert(columns['kodeData0912'][i]),
+                    "Power AC (W)": safe_float_convert(columns['kodeData0913'][i]),
                 }
                 table_data.append(table_row)
             except (IndexError, ValueError) as e:
@@ -2192,10 +1376,12 @@ def login_redirect(n_clicks):
     [Output('gps-map', 'figure'),
      Output('current-location-text', 'children'),
      Output('current-coordinates', 'children')],
-    [Input('interval_gps', 'n_intervals')]
+    [Input('version_gps', 'data')]
 )
 def update_gps_data(n_intervals):
     """Update GPS map and location information using MQTT data"""
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n_intervals)
     # Add eFarming Corpora Community to LOCATIONS
     efarming_location = {"name": "eFarming Corpora Community", "lat": -6.880044, "lon": 107.6772643}
     
@@ -2219,10 +1405,10 @@ def update_gps_data(n_intervals):
             return fallback_value
     
     # Check if we have GPS data from MQTT
-    if data["kodeData1011"] and data["kodeData1012"]:
+    if len(snap) > 0:
         # Use the latest GPS coordinates from the MQTT data with safe conversion
-        raw_lat = data["kodeData1011"][-1] if len(data["kodeData1011"]) > 0 else None
-        raw_lon = data["kodeData1012"][-1] if len(data["kodeData1012"]) > 0 else None
+        raw_lat = snap.latest("kodeData1011")
+        raw_lon = snap.latest("kodeData1012")
         
         current_lat = safe_coordinate_convert(raw_lat, efarming_location["lat"])
         current_lon = safe_coordinate_convert(raw_lon, efarming_location["lon"])
@@ -2336,9 +1522,11 @@ def update_gps_data(n_intervals):
      Output("power-ac-alarm", "children"),
      Output("power-ac-berita", "children"),
      Output("power-ac-circle", "className")],
-    [Input("interval-alarm", "n_intervals")]
+    [Input("version-alarm", "data")]
 )
 def update_alarm_values(n):
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
     def get_circle_class(kode_alarm):
         if kode_alarm in [1, 4]:
             return "status-circle status-red"
@@ -2350,58 +1538,56 @@ def update_alarm_values(n):
             return "status-circle status-black"
     
     return (
-        alarm_data['kodeAlarm0211'],
-        alarm_data['berita0211'],
-        get_circle_class(alarm_data['kodeAlarm0211']),
-        alarm_data['kodeAlarm0212'],
-        alarm_data['berita0212'],
-        get_circle_class(alarm_data['kodeAlarm0212']),
-        alarm_data['kodeAlarm0711'],
-        alarm_data['berita0711'],
-        get_circle_class(alarm_data['kodeAlarm0711']),
-        alarm_data['kodeAlarm0712'],
-        alarm_data['berita0712'],
-        get_circle_class(alarm_data['kodeAlarm0712']),
-        alarm_data['kodeAlarm0611'],
-        alarm_data['berita0611'],
-        get_circle_class(alarm_data['kodeAlarm0611']),
-        alarm_data['kodeAlarm0311'],
-        alarm_data['berita0311'],
-        get_circle_class(alarm_data['kodeAlarm0311']),
-        alarm_data['kodeAlarm0411'],
-        alarm_data['berita0411'],
-        get_circle_class(alarm_data['kodeAlarm0411']),
-        alarm_data['kodeAlarm0511'],
-        alarm_data['berita0511'],
-        get_circle_class(alarm_data['kodeAlarm0511']),
-        alarm_data['kodeAlarm0911'],
-        alarm_data['berita0911'],
-        get_circle_class(alarm_data['kodeAlarm0911']),
-        alarm_data['kodeAlarm0912'],
-        alarm_data['berita0912'],
-        get_circle_class(alarm_data['kodeAlarm0912']),
-        alarm_data['kodeAlarm0913'],
-        alarm_data['berita0913'],
-        get_circle_class(alarm_data['kodeAlarm0913'])
+        snap.alarms['kodeAlarm0211'],
+        snap.alarms['berita0211'],
+        get_circle_class(snap.alarms['kodeAlarm0211']),
+        snap.alarms['kodeAlarm0212'],
+        snap.alarms['berita0212'],
+        get_circle_class(snap.alarms['kodeAlarm0212']),
+        snap.alarms['kodeAlarm0711'],
+        snap.alarms['berita0711'],
+        get_circle_class(snap.alarms['kodeAlarm0711']),
+        snap.alarms['kodeAlarm0712'],
+        snap.alarms['berita0712'],
+        get_circle_class(snap.alarms['kodeAlarm0712']),
+        snap.alarms['kodeAlarm0611'],
+        snap.alarms['berita0611'],
+        get_circle_class(snap.alarms['kodeAlarm0611']),
+        snap.alarms['kodeAlarm0311'],
+        snap.alarms['berita0311'],
+        get_circle_class(snap.alarms['kodeAlarm0311']),
+        snap.alarms['kodeAlarm0411'],
+        snap.alarms['berita0411'],
+        get_circle_class(snap.alarms['kodeAlarm0411']),
+        snap.alarms['kodeAlarm0511'],
+        snap.alarms['berita0511'],
+        get_circle_class(snap.alarms['kodeAlarm0511']),
+        snap.alarms['kodeAlarm0911'],
+        snap.alarms['berita0911'],
+        get_circle_class(snap.alarms['kodeAlarm0911']),
+        snap.alarms['kodeAlarm0912'],
+        snap.alarms['berita0912'],
+        get_circle_class(snap.alarms['kodeAlarm0912']),
+        snap.alarms['kodeAlarm0913'],
+        snap.alarms['berita0913'],
+        get_circle_class(snap.alarms['kodeAlarm0913'])
     )
 
 # Callback for prediction graphs temperature and humidity indoor
 @app_dash.callback(
     [Output('temp-prediction-graph', 'figure'),
      Output('humidity-prediction-graph', 'figure')],
-    [Input('interval_thin', 'n_intervals')]
+    [Input('version_thin', 'data')]
 )
 def update_th_in_prediction_graphs(n):
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
 # Temperature prediction graph
     temp_fig = go.Figure()
     
-    if data['waktu'] and len(data['waktu']) > 0:
-        # Get the last timestamp and ensure it's a proper datetime
-        last_time = data['waktu'][-1]
-        
-        # Convert to pandas datetime if it's not already
-        if not isinstance(last_time, pd.Timestamp):
-            last_time = pd.to_datetime(last_time)
+    if len(snap) > 0:
+        # Epoch of the newest row as a local datetime (no string round-trip)
+        last_time = local_datetime(snap.epochs(1)[-1])
         
         future_times = []
         temp_predictions = []
@@ -2412,15 +1598,11 @@ def update_th_in_prediction_graphs(n):
         
         for i, pred_key in enumerate(temp_codes, 1):
             # Use datetime arithmetic instead of pd.Timedelta
-            future_time = last_time + pd.Timedelta(minutes=i)
+            future_time = last_time + timedelta(minutes=i)
             future_times.append(future_time)
             
             # Get the latest prediction value for each minute ahead
-            if pred_key in prediction_data and prediction_data[pred_key] and len(prediction_data[pred_key]) > 0:
-                temp_predictions.append(prediction_data[pred_key][-1])
-            else:
-                # Use a reasonable default or interpolation
-                temp_predictions.append(None)
+            temp_predictions.append(snap.prediction(pred_key))
         
         # Debug: Print the values to check
         print(f"Future times: {future_times}")
@@ -2499,13 +1681,9 @@ def update_th_in_prediction_graphs(n):
     # Humidity prediction graph
     humidity_fig = go.Figure()
     
-    if data['waktu'] and len(data['waktu']) > 0:
-        # Get the last timestamp and ensure it's a proper datetime
-        last_time = data['waktu'][-1]
-        
-        # Convert to pandas datetime if it's not already
-        if not isinstance(last_time, pd.Timestamp):
-            last_time = pd.to_datetime(last_time)
+    if len(snap) > 0:
+        # Epoch of the newest row as a local datetime (no string round-trip)
+        last_time = local_datetime(snap.epochs(1)[-1])
         
         future_times = []
         humidity_predictions = []
@@ -2515,15 +1693,11 @@ def update_th_in_prediction_graphs(n):
         
         for i, pred_key in enumerate(humidity_codes, 1):
             # Use datetime arithmetic instead of pd.Timedelta
-            future_time = last_time + pd.Timedelta(minutes=i)
+            future_time = last_time + timedelta(minutes=i)
             future_times.append(future_time)
             
             # Get the latest prediction value for each minute ahead
-            if pred_key in prediction_data and prediction_data[pred_key] and len(prediction_data[pred_key]) > 0:
-                humidity_predictions.append(prediction_data[pred_key][-1])
-            else:
-                # Use a reasonable default or interpolation
-                humidity_predictions.append(None)
+            humidity_predictions.append(snap.prediction(pred_key))
         
         # Debug: Print the values to check
         print(f"Humidity future times: {future_times}")
@@ -2605,19 +1779,17 @@ def update_th_in_prediction_graphs(n):
 @app_dash.callback(
     [Output('temp-prediction-out-graph', 'figure'),
      Output('humidity-prediction-out-graph', 'figure')],
-    [Input('interval_thout', 'n_intervals')]
+    [Input('version_thout', 'data')]
 )
 def update_th_out_prediction_graphs(n):
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
     # Temperature prediction graph
     temp_fig = go.Figure()
     
-    if data['waktu'] and len(data['waktu']) > 0:
-        # Get the last timestamp and ensure it's a proper datetime
-        last_time = data['waktu'][-1]
-        
-        # Convert to pandas datetime if it's not already
-        if not isinstance(last_time, pd.Timestamp):
-            last_time = pd.to_datetime(last_time)
+    if len(snap) > 0:
+        # Epoch of the newest row as a local datetime (no string round-trip)
+        last_time = local_datetime(snap.epochs(1)[-1])
         
         future_times = []
         temp_predictions = []
@@ -2627,15 +1799,11 @@ def update_th_out_prediction_graphs(n):
         # Using kodeData0713 to kodeData0717 for temperature predictions
         for i, pred_key in enumerate(temp_codes, 1):
             # Use datetime arithmetic instead of pd.Timedelta
-            future_time = last_time + pd.Timedelta(minutes=i)
+            future_time = last_time + timedelta(minutes=i)
             future_times.append(future_time)
             
             # Get the latest prediction value for each minute ahead
-            if pred_key in prediction_data and prediction_data[pred_key] and len(prediction_data[pred_key]) > 0:
-                temp_predictions.append(prediction_data[pred_key][-1])
-            else:
-                # Use a reasonable default or interpolation
-                temp_predictions.append(None)
+            temp_predictions.append(snap.prediction(pred_key))
         
         # Debug: Print the values to check
         print(f"Future times: {future_times}")
@@ -2714,13 +1882,9 @@ def update_th_out_prediction_graphs(n):
     # Humidity prediction graph
     humidity_fig = go.Figure()
     
-    if data['waktu'] and len(data['waktu']) > 0:
-        # Get the last timestamp and ensure it's a proper datetime
-        last_time = data['waktu'][-1]
-        
-        # Convert to pandas datetime if it's not already
-        if not isinstance(last_time, pd.Timestamp):
-            last_time = pd.to_datetime(last_time)
+    if len(snap) > 0:
+        # Epoch of the newest row as a local datetime (no string round-trip)
+        last_time = local_datetime(snap.epochs(1)[-1])
         
         future_times = []
         humidity_predictions = []
@@ -2730,15 +1894,11 @@ def update_th_out_prediction_graphs(n):
         
         for i, pred_key in enumerate(humidity_codes, 1):
             # Use datetime arithmetic instead of pd.Timedelta
-            future_time = last_time + pd.Timedelta(minutes=i)
+            future_time = last_time + timedelta(minutes=i)
             future_times.append(future_time)
             
             # Get the latest prediction value for each minute ahead
-            if pred_key in prediction_data and prediction_data[pred_key] and len(prediction_data[pred_key]) > 0:
-                humidity_predictions.append(prediction_data[pred_key][-1])
-            else:
-                # Use a reasonable default or interpolation
-                humidity_predictions.append(None)
+            humidity_predictions.append(snap.prediction(pred_key))
         
         # Debug: Print the values to check
         print(f"Humidity future times: {future_times}")
@@ -2819,19 +1979,17 @@ def update_th_out_prediction_graphs(n):
 # Callback for prediction graphs co2
 @app_dash.callback(
     Output('co2-prediction-graph', 'figure'),
-    [Input('interval_co2', 'n_intervals')]
+    [Input('version_co2', 'data')]
 )
 def update_co2_prediction_graphs(n):
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
     # Temperature prediction graph
     co2_fig = go.Figure()
     
-    if data['waktu'] and len(data['waktu']) > 0:
-        # Get the last timestamp and ensure it's a proper datetime
-        last_time = data['waktu'][-1]
-        
-        # Convert to pandas datetime if it's not already
-        if not isinstance(last_time, pd.Timestamp):
-            last_time = pd.to_datetime(last_time)
+    if len(snap) > 0:
+        # Epoch of the newest row as a local datetime (no string round-trip)
+        last_time = local_datetime(snap.epochs(1)[-1])
         
         future_times = []
         co2_prediction = []
@@ -2841,15 +1999,11 @@ def update_co2_prediction_graphs(n):
         
         for i, pred_key in enumerate(co2_codes, 1):
             # Use datetime arithmetic instead of pd.Timedelta
-            future_time = last_time + pd.Timedelta(minutes=i)
+            future_time = last_time + timedelta(minutes=i)
             future_times.append(future_time)
             
             # Get the latest prediction value for each minute ahead
-            if pred_key in prediction_data and prediction_data[pred_key] and len(prediction_data[pred_key]) > 0:
-                co2_prediction.append(prediction_data[pred_key][-1])
-            else:
-                # Use a reasonable default or interpolation
-                co2_prediction.append(None)
+            co2_prediction.append(snap.prediction(pred_key))
         
         # Debug: Print the values to check
         print(f"Future times: {future_times}")
@@ -2930,19 +2084,17 @@ def update_co2_prediction_graphs(n):
 # Callback for prediction graphs par
 @app_dash.callback(
     Output('par-prediction-graph', 'figure'),
-    [Input('interval_par', 'n_intervals')]
+    [Input('version_par', 'data')]
 )
 def update_par_prediction_graphs(n):
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
     # Temperature prediction graph
     par_fig = go.Figure()
     
-    if data['waktu'] and len(data['waktu']) > 0:
-        # Get the last timestamp and ensure it's a proper datetime
-        last_time = data['waktu'][-1]
-        
-        # Convert to pandas datetime if it's not already
-        if not isinstance(last_time, pd.Timestamp):
-            last_time = pd.to_datetime(last_time)
+    if len(snap) > 0:
+        # Epoch of the newest row as a local datetime (no string round-trip)
+        last_time = local_datetime(snap.epochs(1)[-1])
         
         future_times = []
         par_prediction = []
@@ -2952,15 +2104,11 @@ def update_par_prediction_graphs(n):
         
         for i, pred_key in enumerate(par_codes, 1):
             # Use datetime arithmetic instead of pd.Timedelta
-            future_time = last_time + pd.Timedelta(minutes=i)
+            future_time = last_time + timedelta(minutes=i)
             future_times.append(future_time)
             
             # Get the latest prediction value for each minute ahead
-            if pred_key in prediction_data and prediction_data[pred_key] and len(prediction_data[pred_key]) > 0:
-                par_prediction.append(prediction_data[pred_key][-1])
-            else:
-                # Use a reasonable default or interpolation
-                par_prediction.append(None)
+            par_prediction.append(snap.prediction(pred_key))
         
         # Debug: Print the values to check
         print(f"Future times: {future_times}")
@@ -3041,19 +2189,17 @@ def update_par_prediction_graphs(n):
 # Callback for prediction graphs windspeed
 @app_dash.callback(
     Output('windspeed-prediction-graph', 'figure'),
-    [Input('interval_windspeed', 'n_intervals')]
+    [Input('version_windspeed', 'data')]
 )
 def update_windspeed_prediction_graphs(n):
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
     # Temperature prediction graph
     windspeed_fig = go.Figure()
     
-    if data['waktu'] and len(data['waktu']) > 0:
-        # Get the last timestamp and ensure it's a proper datetime
-        last_time = data['waktu'][-1]
-        
-        # Convert to pandas datetime if it's not already
-        if not isinstance(last_time, pd.Timestamp):
-            last_time = pd.to_datetime(last_time)
+    if len(snap) > 0:
+        # Epoch of the newest row as a local datetime (no string round-trip)
+        last_time = local_datetime(snap.epochs(1)[-1])
         
         future_times = []
         windspeed_prediction = []
@@ -3063,15 +2209,11 @@ def update_windspeed_prediction_graphs(n):
         
         for i, pred_key in enumerate(windspeed_codes, 1):
             # Use datetime arithmetic instead of pd.Timedelta
-            future_time = last_time + pd.Timedelta(minutes=i)
+            future_time = last_time + timedelta(minutes=i)
             future_times.append(future_time)
             
             # Get the latest prediction value for each minute ahead
-            if pred_key in prediction_data and prediction_data[pred_key] and len(prediction_data[pred_key]) > 0:
-                windspeed_prediction.append(prediction_data[pred_key][-1])
-            else:
-                # Use a reasonable default or interpolation
-                windspeed_prediction.append(None)
+            windspeed_prediction.append(snap.prediction(pred_key))
         
         # Debug: Print the values to check
         print(f"Future times: {future_times}")
@@ -3152,19 +2294,17 @@ def update_windspeed_prediction_graphs(n):
 # Callback for prediction graphs rainfall
 @app_dash.callback(
     Output('rainfall-prediction-graph', 'figure'),
-    [Input('interval_rainfall', 'n_intervals')]
+    [Input('version_rainfall', 'data')]
 )
 def update_rainfall_prediction_graphs(n):
+    # Render from the latest published snapshot of the selected site
+    snap = page_snapshot(n)
     # Temperature prediction graph
     rainfall_fig = go.Figure()
     
-    if data['waktu'] and len(data['waktu']) > 0:
-        # Get the last timestamp and ensure it's a proper datetime
-        last_time = data['waktu'][-1]
-        
-        # Convert to pandas datetime if it's not already
-        if not isinstance(last_time, pd.Timestamp):
-            last_time = pd.to_datetime(last_time)
+    if len(snap) > 0:
+        # Epoch of the newest row as a local datetime (no string round-trip)
+        last_time = local_datetime(snap.epochs(1)[-1])
         
         future_times = []
         rainfall_prediction = []
@@ -3174,15 +2314,11 @@ def update_rainfall_prediction_graphs(n):
         
         for i, pred_key in enumerate(rainfall_codes, 1):
             # Use datetime arithmetic instead of pd.Timedelta
-            future_time = last_time + pd.Timedelta(minutes=i)
+            future_time = last_time + timedelta(minutes=i)
             future_times.append(future_time)
             
             # Get the latest prediction value for each minute ahead
-            if pred_key in prediction_data and prediction_data[pred_key] and len(prediction_data[pred_key]) > 0:
-                rainfall_prediction.append(prediction_data[pred_key][-1])
-            else:
-                # Use a reasonable default or interpolation
-                rainfall_prediction.append(None)
+            rainfall_prediction.append(snap.prediction(pred_key))
         
         # Debug: Print the values to check
         print(f"Future times: {future_times}")
@@ -3263,342 +2399,114 @@ def update_rainfall_prediction_graphs(n):
 # CALLBACK TO UPDATE THE HISTORICAL DATA TABLE IN th_in.py
 @app_dash.callback(
     Output('historical-table-th-in', 'data'),
-    Input('interval_thin', 'n_intervals')
+    Input('interval_thin', 'n_intervals'),
+    Input('version_thin', 'data'),
+    Input('site-selector', 'value')
 )
-def update_th_in_historical_table(n):
-    try:
-        # 1. Authenticate with Google Sheets (ensure 'credentials.json' is in your root directory)
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-        client = gspread.authorize(creds)
+def update_th_in_historical_table(n, version, site):
+    # Cycles recorded in the history database (indexed, no remote fetch)
+    records = history_table_records('historical-table-th-in', site, 20)
+    if records is not None or (site or MCS_DEFAULT_SITE) != MCS_DEFAULT_SITE:
+        return records or []
 
-        # 2. Open the spreadsheet and select the first sheet
-        sheet = client.open("microclimate_database").sheet1
-
-        # 3. Get all data, excluding the header row
-        records = sheet.get_all_records()
-        
-        # 4. If there's no data, return an empty list
-        if not records:
-            return []
-
-        # 5. Get the last 20 records for display and reverse them to show the latest on top
-        latest_records = records[-20:]
-        latest_records.reverse()
-
-        # 6. Format the data to match the DataTable column IDs
-        #    Spreadsheet columns: 'Time', 'Temp In', 'Humid In'
-        #    DataTable columns: 'time', 'temperature_in_historical', 'humidity_in_historical'
-        table_data = []
-        for row in latest_records:
-            # Extract only the time part (e.g., '21:00') from the full datetime string
-            time_value = str(row.get('Time', ''))
-
-            table_data.append({
-                'time': time_value,
-                'temperature_in_historical': row.get('Temp In'),
-                'humidity_in_historical': row.get('Humid In')
-            })
-            
-        return table_data
-
-    except gspread.exceptions.SpreadsheetNotFound:
-        print("Error: Spreadsheet 'microclimate_database' not found. Check the name and sharing permissions.")
-        return [] # Return empty data to prevent the app from crashing
-    except Exception as e:
-        print(f"An error occurred while updating the historical table: {e}")
-        return [] # Return empty data on any other error
+    # Nothing recorded yet: fall back to the Google Sheet (default site only)
+    return sheet_table_records('historical-table-th-in', 20)
 
 # CALLBACK TO UPDATE THE HISTORICAL DATA TABLE IN th_out.py
 @app_dash.callback(
     Output('historical-table-th-out', 'data'),
-    Input('interval_thout', 'n_intervals')
+    Input('interval_thout', 'n_intervals'),
+    Input('version_thout', 'data'),
+    Input('site-selector', 'value')
 )
-def update_th_out_historical_table(n):
-    try:
-        # 1. Authenticate with Google Sheets (ensure 'credentials.json' is in your root directory)
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-        client = gspread.authorize(creds)
-
-        # 2. Open the spreadsheet and select the first sheet
-        sheet = client.open("microclimate_database").sheet1
-
-        # 3. Get all data, excluding the header row
-        records = sheet.get_all_records()
-        
-        # 4. If there's no data, return an empty list
-        if not records:
-            return []
-
-        # 5. Get the last 20 records for display and reverse them to show the latest on top
-        latest_records = records[-20:]
-        latest_records.reverse()
-
-        # 6. Format the data to match the DataTable column IDs
-        #    Spreadsheet columns: 'Time', 'Temp In', 'Humid In'
-        #    DataTable columns: 'time', 'temperature_in_historical', 'humidity_in_historical'
-        table_data = []
-        for row in latest_records:
-            # Extract only the time part (e.g., '21:00') from the full datetime string
-            time_value = str(row.get('Time', ''))
-
-            table_data.append({
-                'time': time_value,
-                'temperature_out_historical': row.get('Temp Out'),
-                'humidity_out_historical': row.get('Humid Out')
-            })
-            
-        return table_data
+def update_th_out_historical_table(n, version, site):
+    # Cycles recorded in the history database (indexed, no remote fetch)
+    records = history_table_records('historical-table-th-out', site, 20)
+    if records is not None or (site or MCS_DEFAULT_SITE) != MCS_DEFAULT_SITE:
+        return records or []
 
-    except gspread.exceptions.SpreadsheetNotFound:
-        print("Error: Spreadsheet 'microclimate_database' not found. Check the name and sharing permissions.")
-        return [] # Return empty data to prevent the app from crashing
-    except Exception as e:
-        print(f"An error occurred while updating the historical table: {e}")
-        return [] # Return empty data on any other error
+    # Nothing recorded yet: fall back to the Google Sheet (default site only)
+    return sheet_table_records('historical-table-th-out', 20)
     
 # CALLBACK TO UPDATE THE HISTORICAL DATA TABLE IN par.py
 @app_dash.callback(
     Output('historical-table-par', 'data'),
-    Input('interval_par', 'n_intervals')
+    Input('interval_par', 'n_intervals'),
+    Input('version_par', 'data'),
+    Input('site-selector', 'value')
 )
-def update_par_historical_table(n):
-    try:
-        # 1. Authenticate with Google Sheets (ensure 'credentials.json' is in your root directory)
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-        client = gspread.authorize(creds)
-
-        # 2. Open the spreadsheet and select the first sheet
-        sheet = client.open("microclimate_database").sheet1
+def update_par_historical_table(n, version, site):
+    # Cycles recorded in the history database (indexed, no remote fetch)
+    records = history_table_records('historical-table-par', site, 20)
+    if records is not None or (site or MCS_DEFAULT_SITE) != MCS_DEFAULT_SITE:
+        return records or []
 
-        # 3. Get all data, excluding the header row
-        records = sheet.get_all_records()
-        
-        # 4. If there's no data, return an empty list
-        if not records:
-            return []
-
-        # 5. Get the last 20 records for display and reverse them to show the latest on top
-        latest_records = records[-20:]
-        latest_records.reverse()
-
-        # 6. Format the data to match the DataTable column IDs
-        #    Spreadsheet columns: 'Time', 'Temp In', 'Humid In'
-        #    DataTable columns: 'time', 'temperature_in_historical', 'humidity_in_historical'
-        table_data = []
-        for row in latest_records:
-            # Extract only the time part (e.g., '21:00') from the full datetime string
-            time_value = str(row.get('Time', ''))
-
-            table_data.append({
-                'time': time_value,
-                'par-historical': row.get('PAR'),
-            })
-            
-        return table_data
-
-    except gspread.exceptions.SpreadsheetNotFound:
-        print("Error: Spreadsheet 'microclimate_database' not found. Check the name and sharing permissions.")
-        return [] # Return empty data to prevent the app from crashing
-    except Exception as e:
-        print(f"An error occurred while updating the historical table: {e}")
-        return [] # Return empty data on any other error
+    # Nothing recorded yet: fall back to the Google Sheet (default site only)
+    return sheet_table_records('historical-table-par', 20)
     
 # CALLBACK TO UPDATE THE HISTORICAL DATA TABLE IN rainfall.py
 @app_dash.callback(
     Output('historical-table-rainfall', 'data'),
-    Input('interval_rainfall', 'n_intervals')
+    Input('interval_rainfall', 'n_intervals'),
+    Input('version_rainfall', 'data'),
+    Input('site-selector', 'value')
 )
-def update_rainfall_historical_table(n):
-    try:
-        # 1. Authenticate with Google Sheets (ensure 'credentials.json' is in your root directory)
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-        client = gspread.authorize(creds)
-
-        # 2. Open the spreadsheet and select the first sheet
-        sheet = client.open("microclimate_database").sheet1
-
-        # 3. Get all data, excluding the header row
-        records = sheet.get_all_records()
-        
-        # 4. If there's no data, return an empty list
-        if not records:
-            return []
-
-        # 5. Get the last 20 records for display and reverse them to show the latest on top
-        latest_records = records[-20:]
-        latest_records.reverse()
-
-        # 6. Format the data to match the DataTable column IDs
-        #    Spreadsheet columns: 'Time', 'Temp In', 'Humid In'
-        #    DataTable columns: 'time', 'temperature_in_historical', 'humidity_in_historical'
-        table_data = []
-        for row in latest_records:
-            # Extract only the time part (e.g., '21:00') from the full datetime string
-            time_value = str(row.get('Time', ''))
-
-            table_data.append({
-                'time': time_value,
-                'rainfall-historical': row.get('Rainfall'),
-            })
-            
-        return table_data
+def update_rainfall_historical_table(n, version, site):
+    # Cycles recorded in the history database (indexed, no remote fetch)
+    records = history_table_records('historical-table-rainfall', site, 20)
+    if records is not None or (site or MCS_DEFAULT_SITE) != MCS_DEFAULT_SITE:
+        return records or []
 
-    except gspread.exceptions.SpreadsheetNotFound:
-        print("Error: Spreadsheet 'microclimate_database' not found. Check the name and sharing permissions.")
-        return [] # Return empty data to prevent the app from crashing
-    except Exception as e:
-        print(f"An error occurred while updating the historical table: {e}")
-        return [] # Return empty data on any other error
+    # Nothing recorded yet: fall back to the Google Sheet (default site only)
+    return sheet_table_records('historical-table-rainfall', 20)
 
 # CALLBACK TO UPDATE THE HISTORICAL DATA TABLE IN windspeed.py
 @app_dash.callback(
     Output('historical-table-windspeed', 'data'),
-    Input('interval_windspeed', 'n_intervals')
+    Input('interval_windspeed', 'n_intervals'),
+    Input('version_windspeed', 'data'),
+    Input('site-selector', 'value')
 )
-def update_windspeed_historical_table(n):
-    try:
-        # 1. Authenticate with Google Sheets (ensure 'credentials.json' is in your root directory)
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-        client = gspread.authorize(creds)
-
-        # 2. Open the spreadsheet and select the first sheet
-        sheet = client.open("microclimate_database").sheet1
+def update_windspeed_historical_table(n, version, site):
+    # Cycles recorded in the history database (indexed, no remote fetch)
+    records = history_table_records('historical-table-windspeed', site, 20)
+    if records is not None or (site or MCS_DEFAULT_SITE) != MCS_DEFAULT_SITE:
+        return records or []
 
-        # 3. Get all data, excluding the header row
-        records = sheet.get_all_records()
-        
-        # 4. If there's no data, return an empty list
-        if not records:
-            return []
-
-        # 5. Get the last 20 records for display and reverse them to show the latest on top
-        latest_records = records[-20:]
-        latest_records.reverse()
-
-        # 6. Format the data to match the DataTable column IDs
-        #    Spreadsheet columns: 'Time', 'Temp In', 'Humid In'
-        #    DataTable columns: 'time', 'temperature_in_historical', 'humidity_in_historical'
-        table_data = []
-        for row in latest_records:
-            # Extract only the time part (e.g., '21:00') from the full datetime string
-            time_value = str(row.get('Time', ''))
-
-            table_data.append({
-                'time': time_value,
-                'windspeed-historical': row.get('Windspeed'),
-            })
-            
-        return table_data
-
-    except gspread.exceptions.SpreadsheetNotFound:
-        print("Error: Spreadsheet 'microclimate_database' not found. Check the name and sharing permissions.")
-        return [] # Return empty data to prevent the app from crashing
-    except Exception as e:
-        print(f"An error occurred while updating the historical table: {e}")
-        return [] # Return empty data on any other error
+    # Nothing recorded yet: fall back to the Google Sheet (default site only)
+    return sheet_table_records('historical-table-windspeed', 20)
 
 # CALLBACK TO UPDATE THE HISTORICAL DATA TABLE IN co2.py
 @app_dash.callback(
     Output('historical-table-co2', 'data'),
-    Input('interval_co2', 'n_intervals')
+    Input('interval_co2', 'n_intervals'),
+    Input('version_co2', 'data'),
+    Input('site-selector', 'value')
 )
-def update_co2_historical_table(n):
-    try:
-        # 1. Authenticate with Google Sheets (ensure 'credentials.json' is in your root directory)
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-        client = gspread.authorize(creds)
-
-        # 2. Open the spreadsheet and select the first sheet
-        sheet = client.open("microclimate_database").sheet1
-
-        # 3. Get all data, excluding the header row
-        records = sheet.get_all_records()
-        
-        # 4. If there's no data, return an empty list
-        if not records:
-            return []
-
-        # 5. Get the last 20 records for display and reverse them to show the latest on top
-        latest_records = records[-20:]
-        latest_records.reverse()
-
-        # 6. Format the data to match the DataTable column IDs
-        #    Spreadsheet columns: 'Time', 'Temp In', 'Humid In'
-        #    DataTable columns: 'time', 'temperature_in_historical', 'humidity_in_historical'
-        table_data = []
-        for row in latest_records:
-            # Extract only the time part (e.g., '21:00') from the full datetime string
-            time_value = str(row.get('Time', ''))
-
-            table_data.append({
-                'time': time_value,
-                'co2-historical': row.get('CO2'),
-            })
-            
-        return table_data
+def update_co2_historical_table(n, version, site):
+    # Cycles recorded in the history database (indexed, no remote fetch)
+    records = history_table_records('historical-table-co2', site, 20)
+    if records is not None or (site or MCS_DEFAULT_SITE) != MCS_DEFAULT_SITE:
+        return records or []
 
-    except gspread.exceptions.SpreadsheetNotFound:
-        print("Error: Spreadsheet 'microclimate_database' not found. Check the name and sharing permissions.")
-        return [] # Return empty data to prevent the app from crashing
-    except Exception as e:
-        print(f"An error occurred while updating the historical table: {e}")
-        return [] # Return empty data on any other error
+    # Nothing recorded yet: fall back to the Google Sheet (default site only)
+    return sheet_table_records('historical-table-co2', 20)
 
 # CALLBACK TO UPDATE THE HISTORICAL DATA TABLE IN epsac.py
 @app_dash.callback(
     Output('historical-table-eps-ac', 'data'),
-    Input('interval_eps_ac', 'n_intervals')
+    Input('interval_eps_ac', 'n_intervals'),
+    Input('version_eps_ac', 'data'),
+    Input('site-selector', 'value')
 )
-def update_eps_ac_historical_table(n):
-    try:
-        # 1. Authenticate with Google Sheets (ensure 'credentials.json' is in your root directory)
-        scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-        client = gspread.authorize(creds)
-
-        # 2. Open the spreadsheet and select the first sheet
-        sheet = client.open("microclimate_database").sheet1
-
-        # 3. Get all data, excluding the header row
-        records = sheet.get_all_records()
-        
-        # 4. If there's no data, return an empty list
-        if not records:
-            return []
-
-        # 5. Get the last 20 records for display and reverse them to show the latest on top
-        latest_records = records[-20:]
-        latest_records.reverse()
-
-        # 6. Format the data to match the DataTable column IDs
-        #    Spreadsheet columns: 'Time', 'Temp In', 'Humid In'
-        #    DataTable columns: 'time', 'temperature_in_historical', 'humidity_in_historical'
-        table_data = []
-        for row in latest_records:
-            # Extract only the time part (e.g., '21:00') from the full datetime string
-            time_value = str(row.get('Time', ''))
-
-            table_data.append({
-                'time': time_value,
-                'voltage_ac_historical': row.get('Voltage AC'),
-                'current_ac_historical': row.get('Current AC'),
-                'power_ac_historical': row.get('Power AC'),
-            })
-            
-        return table_data
-
-    except gspread.exceptions.SpreadsheetNotFound:
-        print("Error: Spreadsheet 'microclimate_database' not found. Check the name and sharing permissions.")
-        return [] # Return empty data to prevent the app from crashing
-    except Exception as e:
-        print(f"An error occurred while updating the historical table: {e}")
-        return [] # Return empty data on any other error
+def update_eps_ac_historical_table(n, version, site):
+    # Cycles recorded in the history database (indexed, no remote fetch)
+    records = history_table_records('historical-table-eps-ac', site, 20)
+    if records is not None or (site or MCS_DEFAULT_SITE) != MCS_DEFAULT_SITE:
+        return records or []
+
+    # Nothing recorded yet: fall back to the Google Sheet (default site only)
+    return sheet_table_records('historical-table-eps-ac', 20)
    
 # Run server
 if __name__ == '__main__':
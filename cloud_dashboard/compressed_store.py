@@ -0,0 +1,272 @@
+'''
+ Nama File      : compressed_store.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Penyimpanan sensor terkompresi (opsional) untuk window live yang panjang,
+       misalnya 24 jam data 1 Hz, dengan antarmuka yang sama seperti SensorStore
+    2. Data dibagi per chunk: chunk kepala tidak dikompresi, chunk yang sudah
+       penuh disegel menjadi blok immutable terkompresi ala Gorilla
+       (timestamp delta-of-delta, nilai float XOR dengan nilai sebelumnya)
+    3. Bit packing memakai satu lebar bit per kolom per chunk sehingga encode
+       dan decode sepenuhnya vektor NumPy, dan hanya kolom serta chunk yang
+       masuk window yang di-decode
+'''
+
+from collections import namedtuple
+import numpy as np
+
+def pack_bits(values, width):
+    """Pack uint64 `values` using `width` bits each (MSB first)"""
+    if width == 0 or not len(values):
+        return np.zeros(0, dtype=np.uint8)
+    shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+    bits = ((values[:, None] >> shifts) & np.uint64(1)).astype(np.uint8)
+    return np.packbits(bits)
+
+def unpack_bits(packed, width, count):
+    """Inverse of pack_bits"""
+    if width == 0 or not count:
+        return np.zeros(count, dtype=np.uint64)
+    bits = np.unpackbits(packed, count=count * width).reshape(count, width).astype(np.uint64)
+    shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+    return np.bitwise_or.reduce(bits << shifts, axis=1)
+
+# XOR-encoded float column: first value's bits, bitmap of changed samples,
+# then the changed XORs shifted right by their common trailing zeros
+FloatBlock = namedtuple('FloatBlock', ['first', 'changed', 'trailing', 'width', 'packed'])
+
+def encode_floats(values):
+    """Gorilla-style XOR encoding of a float64 array (NaN safe, lossless)"""
+    bits = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    xor = bits[1:] ^ bits[:-1]
+    changed = xor != 0
+    xor = xor[changed]
+    trailing = width = 0
+    if len(xor):
+        common = int(np.bitwise_or.reduce(xor))
+        trailing = (common & -common).bit_length() - 1
+        xor = xor >> np.uint64(trailing)
+        width = int(xor.max()).bit_length()
+    return FloatBlock(int(bits[0]), np.packbits(changed), trailing, width, pack_bits(xor, width))
+
+def decode_floats(block, count):
+    xor = np.zeros(count, dtype=np.uint64)
+    xor[0] = block.first
+    changed = np.unpackbits(block.changed, count=count - 1).astype(bool)
+    xor[1:][changed] = unpack_bits(block.packed, block.width, int(changed.sum())) << np.uint64(block.trailing)
+    return np.bitwise_xor.accumulate(xor).view(np.float64)
+
+# Delta-of-delta encoded timestamps, in integer milliseconds (zigzag, fixed width)
+EpochBlock = namedtuple('EpochBlock', ['first', 'delta', 'width', 'packed'])
+
+def encode_epochs(epochs):
+    """Delta-of-delta encoding of epoch seconds, rounded to the millisecond"""
+    ms = np.round(np.asarray(epochs, dtype=np.float64) * 1000).astype(np.int64)
+    deltas = np.diff(ms)
+    delta = int(deltas[0]) if len(deltas) else 0
+    dod = np.diff(deltas)
+    zigzag = ((dod << 1) ^ (dod >> 63)).astype(np.uint64)
+    width = int(zigzag.max()).bit_length() if len(zigzag) else 0
+    return EpochBlock(int(ms[0]), delta, width, pack_bits(zigzag, width))
+
+def decode_epochs(block, count):
+    zigzag = unpack_bits(block.packed, block.width, max(count - 2, 0)).astype(np.int64)
+    dod = (zigzag >> 1) ^ -(zigzag & 1)
+    deltas = np.concatenate(([block.delta], block.delta + np.cumsum(dod)))[:count - 1]
+    ms = block.first + np.concatenate(([0], np.cumsum(deltas)))
+    return ms / 1000.0
+
+class CompressedChunk:
+    """Immutable block of `count` rows starting at absolute row `start`"""
+    __slots__ = ('start', 'count', 'epochs', 'columns', 'nbytes')
+
+    def __init__(self, start, values, epochs):
+        self.start = start
+        self.count = len(epochs)
+        self.epochs = encode_epochs(epochs)
+        self.columns = [encode_floats(column) for column in values]
+        self.nbytes = self.epochs.packed.nbytes + 24 + sum(
+            block.changed.nbytes + block.packed.nbytes + 24 for block in self.columns)
+
+    def column(self, index):
+        """Decoded values of one column (None = the timestamps)"""
+        if index is None:
+            return decode_epochs(self.epochs, self.count)
+        return decode_floats(self.columns[index], self.count)
+
+# Uncompressed chunk being filled: absolute index of its first row plus its buffers
+HeadChunk = namedtuple('HeadChunk', ['start', 'values', 'epochs'])
+
+class ChunkedSensorStore:
+    """
+    Drop-in alternative to SensorStore keeping sealed chunks compressed.
+
+    Rows are appended to an uncompressed head chunk of `chunk_size` rows; a
+    full head is sealed into a CompressedChunk and a fresh head is allocated,
+    so windows handed out earlier stay valid. Readers grab the head before
+    the chunk tuple and the writer publishes a sealed chunk before the new
+    head, so a reader never misses or duplicates rows. Chunks entirely older
+    than the newest `depth` rows are dropped.
+
+    Timestamps are kept to the millisecond once sealed.
+    """
+
+    def __init__(self, codes, depth, chunk_size=1024):
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        self.codes = tuple(codes)
+        self.depth = depth
+        self.chunk_size = max(1, min(chunk_size, depth))
+        self._column = {code: i for i, code in enumerate(self.codes)}
+        self._chunks = ()
+        self._head = self._new_head(0)
+        self._carry = None  # last row of the sealed head, forward-filled into the next one
+        self._total = 0     # rows ever appended
+        self._base = 0      # _total at the last clear()
+
+    def _new_head(self, start):
+        return HeadChunk(start, np.full((len(self.codes), self.chunk_size), np.nan),
+                         np.full(self.chunk_size, np.nan))
+
+    def __len__(self):
+        return min(self._total - self._base, self.depth)
+
+    def __contains__(self, code):
+        return code in self._column
+
+    @property
+    def nbytes(self):
+        """Memory held by the head buffers plus the compressed chunks"""
+        head = self._head
+        return head.values.nbytes + head.epochs.nbytes + sum(chunk.nbytes for chunk in self._chunks)
+
+    def _seal(self):
+        head = self._head
+        self._carry = head.values[:, -1].copy()
+        oldest = self._total - self.depth
+        chunks = tuple(c for c in self._chunks if c.start + c.count > oldest)
+        self._chunks = chunks + (CompressedChunk(head.start, head.values, head.epochs),)
+        self._head = self._new_head(self._total)
+
+    def begin_row(self, epoch):
+        """Append a new row stamped `epoch`, forward-filled from the previous row"""
+        if self._total - self._head.start == self.chunk_size:
+            self._seal()
+        head = self._head
+        pos = self._total - head.start
+        if not len(self):
+            head.values[:, pos] = np.nan
+        elif pos:
+            head.values[:, pos] = head.values[:, pos - 1]
+        else:
+            head.values[:, pos] = self._carry
+        head.epochs[pos] = epoch
+        self._total += 1
+
+    def set_latest(self, code, value):
+        """Overwrite `code` in the newest row, ignored while the store is empty"""
+        if not len(self):
+            return
+        head = self._head
+        head.values[self._column[code], self._total - head.start - 1] = value
+
+    def set_latest_many(self, values):
+        """Overwrite every code of `values` (dict code -> value) in the newest row at once"""
+        if not len(self) or not values:
+            return
+        head = self._head
+        rows = [self._column[code] for code in values]
+        head.values[rows, self._total - head.start - 1] = list(values.values())
+
+    def latest(self, code, default=None):
+        """Newest value of `code` as a Python float, or `default` if missing"""
+        if not len(self):
+            return default
+        head = self._head
+        value = head.values[self._column[code], self._total - head.start - 1]
+        return default if np.isnan(value) else float(value)
+
+    def mark(self):
+        """Position of the newest row, pass it as `at` to read the store as of now"""
+        return self._total, len(self)
+
+    def intact(self, n, at):
+        """
+        How many of the newest min(n, rows) rows as of mark() `at` are still
+        held (see SensorStore.intact). Rows are never overwritten here, but
+        chunks older than the newest `depth` rows are dropped.
+        """
+        total, count = at
+        head = self._head
+        chunks = self._chunks
+        first = chunks[0].start if chunks else head.start
+        return max(0, min(n, count, total - first))
+
+    def latest_row(self):
+        """Copy of the newest row as a dict code -> float (NaN when missing)"""
+        if not len(self):
+            return dict.fromkeys(self.codes, np.nan)
+        head = self._head
+        return dict(zip(self.codes, head.values[:, self._total - head.start - 1].tolist()))
+
+    def _read(self, index, n, at):
+        """Rows of column `index` (None = epochs) in the window, decoding only the chunks it covers"""
+        total, count = self.mark() if at is None else at
+        end = total
+        start = end - min(n, count)
+        head = self._head
+        chunks = self._chunks
+        pieces = []
+        for chunk in chunks:
+            lo = max(start, chunk.start)
+            hi = min(end, chunk.start + chunk.count, head.start)
+            if lo < hi:
+                pieces.append(chunk.column(index)[lo - chunk.start:hi - chunk.start])
+        lo = max(start, head.start)
+        if lo < end:
+            buffer = head.epochs if index is None else head.values[index]
+            pieces.append(buffer[lo - head.start:end - head.start])
+        if not pieces:
+            view = np.zeros(0)
+        elif len(pieces) == 1:
+            view = pieces[0]
+        else:
+            view = np.concatenate(pieces)
+        view.flags.writeable = False
+        return view
+
+    def window(self, code, n, at=None):
+        """
+        Read-only array of the newest min(n, len(self)) values of `code`, oldest first
+        (a view while the window lies in the head chunk, a decoded copy otherwise).
+        """
+        return self._read(self._column[code], n, at)
+
+    def epochs(self, n, at=None):
+        """Epoch timestamps matching window(code, n, at)"""
+        return self._read(None, n, at)
+
+    def load(self, epochs, columns):
+        """Replace the contents with rows stamped `epochs` (oldest first), see SensorStore.load"""
+        epochs = np.asarray(epochs, dtype=float)[-self.depth:]
+        n = len(epochs)
+        values = np.full((len(self.codes), n), np.nan)
+        for code, column in columns.items():
+            if code in self._column:
+                values[self._column[code]] = np.asarray(column, dtype=float)[-n:]
+
+        self._chunks = ()
+        self._head = self._new_head(0)
+        self._total = self._base = 0
+        for block in range(0, n, self.chunk_size):
+            if block:
+                self._seal()
+            rows = min(self.chunk_size, n - block)
+            self._head.values[:, :rows] = values[:, block:block + rows]
+            self._head.epochs[:rows] = epochs[block:block + rows]
+            self._total += rows
+
+    def clear(self):
+        """Drop every row; chunks are kept for pinned windows until they age out"""
+        self._base = self._total
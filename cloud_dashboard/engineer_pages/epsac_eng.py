@@ -13,6 +13,7 @@
 from dash import dcc, html, dash_table
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
+from trend_graph import trend_figure
 
 engineer_eps_ac_layout = html.Div([
     # NAVBAR
@@ -24,6 +25,8 @@ engineer_eps_ac_layout = html.Div([
         html.Div(html.Img(src="/static/img/polindra.png", className="navbar-logo")),
         html.Div(html.Img(src="/static/img/polban.png", className="navbar-logo")),
         html.Div("EPS AC DASHBOARD", className="navbar-title"),
+        dcc.Dropdown(id='site-selector', placeholder="Site", clearable=False,
+                     persistence=True, persistence_type='session', className="site-selector"),
         dcc.Link(html.Img(src="/static/icon/gps.svg", className="gps-icon me-2"), href="/dash/engineer/gps"),
         dcc.Link(html.Img(src="/static/icon/notification.svg", className="notification-icon"), href="/dash/engineer/alarm"),
     ], className="d-flex justify-content-between align-items-center p-3 border-bottom navbar-full mb-1"),
@@ -110,6 +113,7 @@ engineer_eps_ac_layout = html.Div([
                         html.Div([
                             dcc.Graph(
                                 id='voltage-ac-graph',
+                                figure=trend_figure('voltage-ac-graph'),
                                 config={"displayModeBar": False},
                                 style={'height': '190px'}
                             )
@@ -119,6 +123,7 @@ engineer_eps_ac_layout = html.Div([
                         html.Div([
                             dcc.Graph(
                                 id='current-ac-graph',
+                                figure=trend_figure('current-ac-graph'),
                                 config={"displayModeBar": False},
                                 style={'height': '190px'}
                             )
@@ -128,6 +133,7 @@ engineer_eps_ac_layout = html.Div([
                         html.Div([
                             dcc.Graph(
                                 id='power-ac-graph',
+                                figure=trend_figure('power-ac-graph'),
                                 config={"displayModeBar": False},
                                 style={'height': '190px'}
                             )
@@ -162,5 +168,7 @@ engineer_eps_ac_layout = html.Div([
     ], className="footer-section"),
     
     # Keep the interval component for data updates
-    dcc.Interval(id='interval_eps_ac', interval=3000, n_intervals=0)
+    dcc.Interval(id='interval_eps_ac', interval=3000, n_intervals=0),
+    # Snapshot version this page last rendered, bumped by the interval gate
+    dcc.Store(id='version_eps_ac')
 ])
\ No newline at end of file
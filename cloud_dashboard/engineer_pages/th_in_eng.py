@@ -13,6 +13,7 @@
 from dash import dcc, html, dash_table
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
+from trend_graph import trend_figure
 
 engineer_th_in_layout = html.Div([
     # NAVBAR
@@ -24,6 +25,8 @@ engineer_th_in_layout = html.Div([
         html.Div(html.Img(src="/static/img/polindra.png", className="navbar-logo")),
         html.Div(html.Img(src="/static/img/polban.png", className="navbar-logo")),
         html.Div("T&H INDOOR DASHBOARD", className="navbar-title"),
+        dcc.Dropdown(id='site-selector', placeholder="Site", clearable=False,
+                     persistence=True, persistence_type='session', className="site-selector"),
         dcc.Link(html.Img(src="/static/icon/gps.svg", className="gps-icon me-2"), href="/dash/engineer/gps"),
         dcc.Link(html.Img(src="/static/icon/notification.svg", className="notification-icon"), href="/dash/engineer/alarm"),
     ], className="d-flex justify-content-between align-items-center p-3 border-bottom navbar-full mb-1"),
@@ -90,6 +93,7 @@ engineer_th_in_layout = html.Div([
                         html.Div([
                             dcc.Graph(
                                 id='temp-graph',
+                                figure=trend_figure('temp-graph'),
                                 config={"displayModeBar": False},
                                 style={'height': '150px'}
                             )
@@ -99,6 +103,7 @@ engineer_th_in_layout = html.Div([
                         html.Div([
                             dcc.Graph(
                                 id='humidity-graph',
+                                figure=trend_figure('humidity-graph'),
                                 config={"displayModeBar": False},
                                 style={'height': '150px'}
                             )
@@ -166,5 +171,7 @@ engineer_th_in_layout = html.Div([
     ], className="footer-section"),
     
     # Keep the interval component for data updates
-    dcc.Interval(id='interval_thin', interval=3000, n_intervals=0)
+    dcc.Interval(id='interval_thin', interval=3000, n_intervals=0),
+    # Snapshot version this page last rendered, bumped by the interval gate
+    dcc.Store(id='version_thin')
 ])
\ No newline at end of file
@@ -12,6 +12,7 @@
 
 from dash import dcc, html, dash_table
 import dash_bootstrap_components as dbc
+from trend_graph import trend_figure
 
 engineer_windspeed_layout = html.Div([
     # NAVBAR
@@ -23,6 +24,8 @@ engineer_windspeed_layout = html.Div([
         html.Div(html.Img(src="/static/img/polindra.png", className="navbar-logo")),
         html.Div(html.Img(src="/static/img/polban.png", className="navbar-logo")),
         html.Div("WINDSPEED DASHBOARD", className="navbar-title"),
+        dcc.Dropdown(id='site-selector', placeholder="Site", clearable=False,
+                     persistence=True, persistence_type='session', className="site-selector"),
         dcc.Link(html.Img(src="/static/icon/gps.svg", className="gps-icon me-2"), href="/dash/engineer/gps"),
         dcc.Link(html.Img(src="/static/icon/notification.svg", className="notification-icon"), href="/dash/engineer/alarm"),
     ], className="d-flex justify-content-between align-items-center p-3 border-bottom navbar-full mb-1"),
@@ -70,6 +73,7 @@ engineer_windspeed_layout = html.Div([
                         html.Div([
                             dcc.Graph(
                                 id='windspeed-graph',
+                                figure=trend_figure('windspeed-graph'),
                                 config={"displayModeBar": False},
                                 style={'height': '300px'}
                             )
@@ -136,5 +140,7 @@ engineer_windspeed_layout = html.Div([
     ], className="footer-section"),
     
     # Keep the interval component for data updates
-    dcc.Interval(id='interval_windspeed', interval=3000, n_intervals=0)
+    dcc.Interval(id='interval_windspeed', interval=3000, n_intervals=0),
+    # Snapshot version this page last rendered, bumped by the interval gate
+    dcc.Store(id='version_windspeed')
 ])
\ No newline at end of file
@@ -0,0 +1,106 @@
+'''
+ Nama File      : history_export.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Ekspor riwayat siklus untuk route /download?source=history dalam format
+       CSV, Parquet atau XLSX, dengan filter rentang waktu, site dan kode
+    2. Data dibaca lewat cycle_frames(): hari yang sudah diarsip langsung dari
+       arsip Parquet, sisanya dari database SQLite (tanpa arsip hanya SQLite)
+    3. Tidak ada DataFrame utuh di RAM: CSV dikirim per potongan, Parquet dan
+       XLSX ditulis per potongan ke file sementara yang terhapus saat ditutup
+    4. Tidak di-cache seperti ekspor spreadsheet: rentang yang memuat hari ini
+       berubah setiap siklus
+'''
+
+import tempfile
+import pandas as pd
+from openpyxl import Workbook
+from history_archive import cycle_frames, pa, pq
+from sheet_export import EXPORT_FORMATS, TIME_COLUMN, TIME_FORMAT
+
+class HistoryExporter:
+    """
+    Downloads of the cycle history of one site: archive partitions and
+    history database rows are converted one frame at a time, with ts turned
+    into an Asia/Jakarta TIME_COLUMN like the spreadsheet export.
+    """
+
+    def __init__(self, history, archive, directory=None, chunk_rows=5000):
+        self.history = history
+        self.archive = archive
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.builds = 0
+
+    @property
+    def formats(self):
+        return [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet' or pq is not None]
+
+    def _frames(self, site, start, end, codes):
+        """Export frames (TIME_COLUMN plus `codes`) of the range, oldest first"""
+        for frame in cycle_frames(self.history, self.archive, site, start, end, codes, self.chunk_rows):
+            times = pd.to_datetime(frame['ts'], unit='s', utc=True).dt.tz_convert('Asia/Jakarta')
+            out = frame[codes].copy()
+            out.insert(0, TIME_COLUMN, times.dt.strftime(TIME_FORMAT))
+            yield out
+
+    def export(self, fmt, site, start, end, codes=None):
+        """
+        ('stream', CSV chunks) or ('file', binary temporary file) of the
+        cycles of `site` with start <= ts < end (epoch seconds). Raises
+        KeyError for an unknown code and ValueError for an unavailable format.
+        """
+        if fmt not in self.formats:
+            raise ValueError(f"unsupported format {fmt!r}, use one of {', '.join(self.formats)}")
+        codes = list(self.history.codes if codes is None else codes)
+        unknown = [c for c in codes if c not in self.history.codes]
+        if unknown:
+            raise KeyError(', '.join(unknown))
+
+        self.builds += 1
+        frames = self._frames(site, start, end, codes)
+        if fmt == 'csv':
+            return 'stream', self._stream_csv(frames, codes)
+        # Removed by the OS once the response closes it
+        f = tempfile.TemporaryFile(dir=self.directory)
+        try:
+            if fmt == 'parquet':
+                self._write_parquet(frames, codes, f)
+            else:
+                self._write_xlsx(frames, codes, f)
+        except BaseException:
+            f.close()
+            raise
+        f.seek(0)
+        return 'file', f
+
+    @staticmethod
+    def _stream_csv(frames, codes):
+        header = True
+        for frame in frames:
+            yield frame.to_csv(index=False, header=header)
+            header = False
+        if header:
+            yield pd.DataFrame(columns=[TIME_COLUMN] + codes).to_csv(index=False)
+
+    @staticmethod
+    def _write_parquet(frames, codes, f):
+        schema = pa.schema([(TIME_COLUMN, pa.string())] + [(code, pa.float64()) for code in codes])
+        with pq.ParquetWriter(f, schema, compression='zstd') as writer:
+            for frame in frames:
+                writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+
+    @staticmethod
+    def _write_xlsx(frames, codes, f):
+        # Write-only workbook, one frame at a time; missing values become empty cells
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('SensorData')
+        sheet.append([TIME_COLUMN] + codes)
+        for frame in frames:
+            for row in frame.astype(object).where(frame.notna(), None).itertuples(index=False):
+                sheet.append(list(row))
+        workbook.save(f)
+
+    def stats(self):
+        return {'builds': self.builds, 'formats': self.formats}
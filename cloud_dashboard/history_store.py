@@ -0,0 +1,411 @@
+'''
+ Nama File      : history_store.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Penyimpanan riwayat persisten: setiap siklus pengukuran yang selesai
+       ditulis sebagai satu baris ke database SQLite lokal (mode WAL)
+    2. Baris ditulis per batch (executemany dalam satu transaksi) dari thread
+       ingest, bukan satu commit per siklus
+    3. Primary key (site, ts) sekaligus menjadi index waktu, sehingga tabel
+       historis cukup membaca N baris terbaru atau rentang waktu per site
+    4. Data tetap ada setelah dashboard di-restart
+    5. Tabel rollup 1 menit, 1 jam, dan 1 hari (min/max/mean/count/last per kode)
+       diperbarui bertahap setiap flush, sehingga tren mingguan/bulanan cukup
+       membaca beberapa ratus baris
+    6. Kebijakan retensi per tingkat (mis. raw 7 hari, 1 menit 90 hari, 1 jam
+       selamanya), dihapus bertahap per batch kecil lalu ruang file dikembalikan
+       lewat incremental vacuum (database lama diubah sekali dengan VACUUM)
+'''
+
+import atexit
+import math
+import os
+import sqlite3
+import threading
+import time
+
+TABLE = 'cycles'
+
+# Rollup tiers: (table, bucket width in seconds), finest first
+ROLLUP_TIERS = (('rollup_1m', 60), ('rollup_1h', 3600), ('rollup_1d', 86400))
+
+# Buckets are aligned on Asia/Jakarta time (UTC+7, no DST) so daily rows are local days
+ROLLUP_UTC_OFFSET = 7 * 3600
+
+# Retention policy keys -> tables
+RETENTION_TABLES = {'raw': TABLE, '1m': 'rollup_1m', '1h': 'rollup_1h', '1d': 'rollup_1d'}
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+def parse_retention(text):
+    """
+    Parse a retention policy such as 'raw=7d,1m=90d,1h=forever' into
+    {policy key: seconds kept}. Tiers not named are kept forever.
+    """
+    policy = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        key, _, duration = item.partition('=')
+        key, duration = key.strip(), duration.strip().lower()
+        if key not in RETENTION_TABLES:
+            raise ValueError(f"Unknown retention tier {key!r}, expected one of {', '.join(RETENTION_TABLES)}")
+        if duration == 'forever':
+            continue
+        if duration[-1:] not in DURATION_UNITS:
+            raise ValueError(f"Invalid retention {item!r}, use e.g. {key}=7d")
+        policy[key] = float(duration[:-1]) * DURATION_UNITS[duration[-1]]
+    return policy
+
+def bucket_start(epoch, width):
+    """Start (epoch seconds) of the `width`-second bucket holding `epoch`"""
+    return (epoch + ROLLUP_UTC_OFFSET) // width * width - ROLLUP_UTC_OFFSET
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def _to_sql(value):
+    """NaN (no value received) is stored as NULL"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value
+
+class SiteHistory:
+    """History writer bound to one site, attached to that site's IngestStores"""
+
+    def __init__(self, store, site):
+        self.store = store
+        self.site = site
+        self.last_epoch = None
+
+    def record(self, epoch, row):
+        """Queue one completed cycle, a cycle already recorded is skipped"""
+        epoch = float(epoch)
+        if epoch == self.last_epoch:
+            return
+        self.last_epoch = epoch
+        self.store.append(self.site, epoch, row)
+
+class HistoryStore:
+    """
+    One row per completed cycle and site in a WAL-mode SQLite database.
+
+    append() only buffers; the rows are inserted in one transaction once
+    `batch_size` are pending or the oldest has waited `flush_interval`
+    seconds, and on close (registered with atexit). Readers get their own
+    connection per thread, so WAL lets them run while the ingest thread
+    writes.
+
+    The first write of a (site, ts) wins: a cycle delivered again (QoS 1
+    redelivery, a retransmit after a restart) is ignored and not added to
+    the rollups a second time. Rows of a failed flush are retried with the
+    next one, keeping at most `max_pending` (the oldest are dropped).
+    """
+
+    def __init__(self, path, codes, batch_size=60, flush_interval=5.0, max_pending=10000):
+        self.path = path
+        self.codes = tuple(codes)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max(max_pending, batch_size)
+        self.written = 0
+        self.duplicates = 0  # cycles already stored, ignored
+        self.dropped = 0     # cycles dropped after failed flushes
+        self.last_retention = None
+        self._pending = []
+        self._pending_since = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # Lets retention hand freed pages back to the file system
+        self._enable_incremental_vacuum()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Safe with WAL: a power loss can only lose the last commits, never corrupt
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self._create_rollups()
+
+        columns = ', '.join(_quote(c) for c in ('site', 'ts') + self.codes)
+        marks = ', '.join('?' * (2 + len(self.codes)))
+        self._insert = f"INSERT OR IGNORE INTO {TABLE} ({columns}) VALUES ({marks})"
+        atexit.register(self.close)
+
+    def _enable_incremental_vacuum(self):
+        """
+        Set auto_vacuum=INCREMENTAL. The pragma only takes effect on a new
+        database; an existing one (auto_vacuum=NONE) is converted by a one-off
+        VACUUM, which rewrites the file and needs as much free disk space.
+        """
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        if self._conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 0:
+            return
+        size = os.path.getsize(self.path) / 1e6
+        print(f"Converting {self.path} ({size:.1f} MB) to incremental auto_vacuum, one-time VACUUM...")
+        start = time.perf_counter()
+        self._conn.execute("VACUUM")
+        print(f"Converted {self.path} in {time.perf_counter() - start:.1f}s")
+
+    def _create_schema(self):
+        code_columns = ''.join(f", {_quote(code)} REAL" for code in self.codes)
+        with self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE} (site TEXT NOT NULL, ts REAL NOT NULL"
+                f"{code_columns}, PRIMARY KEY (site, ts)) WITHOUT ROWID"
+            )
+            # Codes added to the sensor config after the database was created
+            existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({TABLE})")}
+            for code in self.codes:
+                if code not in existing:
+                    self._conn.execute(f"ALTER TABLE {TABLE} ADD COLUMN {_quote(code)} REAL")
+
+    def _create_rollups(self):
+        """Create missing rollup tables, filling new ones from the cycles already stored"""
+        existing = {row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self._upserts = {}
+        created = []
+        for table, _ in ROLLUP_TIERS:
+            if table not in existing:
+                self._conn.execute(
+                    f"CREATE TABLE {table} (site TEXT NOT NULL, code TEXT NOT NULL, bucket REAL NOT NULL, "
+                    f"min_value REAL, max_value REAL, sum_value REAL, count INTEGER, "
+                    f"last_value REAL, last_ts REAL, PRIMARY KEY (site, code, bucket)) WITHOUT ROWID"
+                )
+                created.append(table)
+            # Merge a pre-aggregated bucket into the stored one
+            self._upserts[table] = (
+                f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                f"ON CONFLICT (site, code, bucket) DO UPDATE SET "
+                f"min_value = min(min_value, excluded.min_value), "
+                f"max_value = max(max_value, excluded.max_value), "
+                f"sum_value = sum_value + excluded.sum_value, "
+                f"count = count + excluded.count, "
+                f"last_value = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last_value ELSE last_value END, "
+                f"last_ts = max(last_ts, excluded.last_ts)"
+            )
+        if not created:
+            return
+
+        # One-off backfill from the raw rows (databases created before the rollups existed)
+        columns = ', '.join(_quote(c) for c in ('site', 'ts') + self.codes)
+        cursor = self._conn.execute(f"SELECT {columns} FROM {TABLE}")
+        with self._conn:
+            while True:
+                rows = cursor.fetchmany(5000)
+                if not rows:
+                    break
+                self._write_rollups(rows, tables=created)
+
+    def _write_rollups(self, rows, tables=None):
+        """Aggregate (site, ts, value...) rows per bucket in memory, then merge one row per bucket"""
+        for table, width in ROLLUP_TIERS:
+            if tables is not None and table not in tables:
+                continue
+            aggregates = {}
+            for site, ts, *values in rows:
+                bucket = bucket_start(ts, width)
+                for code, value in zip(self.codes, values):
+                    if value is None:
+                        continue
+                    agg = aggregates.get((site, code, bucket))
+                    if agg is None:
+                        aggregates[(site, code, bucket)] = [value, value, value, 1, value, ts]
+                        continue
+                    if value < agg[0]:
+                        agg[0] = value
+                    if value > agg[1]:
+                        agg[1] = value
+                    agg[2] += value
+                    agg[3] += 1
+                    if ts >= agg[5]:
+                        agg[4] = value
+                        agg[5] = ts
+            self._conn.executemany(self._upserts[table],
+                                   [key + tuple(agg) for key, agg in aggregates.items()])
+
+    def for_site(self, site):
+        return SiteHistory(self, site)
+
+    def append(self, site, epoch, row):
+        """Buffer one cycle (`row` maps code -> value), flushing when the batch is due"""
+        values = (site, epoch) + tuple(_to_sql(row.get(code)) for code in self.codes)
+        with self._lock:
+            if self._conn is None:
+                return
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append(values)
+            if len(self._pending) >= self.batch_size \
+                    or time.monotonic() - self._pending_since >= self.flush_interval:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        try:
+            with self._conn:
+                # Only the rows actually inserted go into the rollups
+                inserted = [row for row in self._pending if self._conn.execute(self._insert, row).rowcount]
+                self._write_rollups(inserted)
+        except sqlite3.Error as e:
+            print(f"Error writing {len(self._pending)} cycles to {self.path}: {e}")
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                del self._pending[:overflow]
+                self.dropped += overflow
+                print(f"History buffer full, dropped the {overflow} oldest cycles")
+            return
+        self.written += len(inserted)
+        self.duplicates += len(self._pending) - len(inserted)
+        self._pending = []
+
+    def flush(self):
+        """Write every buffered cycle now"""
+        with self._lock:
+            if self._conn is not None:
+                self._flush_locked()
+
+    def pending(self):
+        return len(self._pending)
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def _select(self, site, codes, where, params, order, limit=None):
+        codes = self.codes if codes is None else tuple(codes)
+        columns = ', '.join(_quote(c) for c in ('ts',) + codes)
+        sql = f"SELECT {columns} FROM {TABLE} WHERE site = ?{where} ORDER BY ts {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        cursor = self._reader().execute(sql, (site,) + params)
+        return [dict(zip(('ts',) + codes, row)) for row in cursor]
+
+    def latest(self, site, n, codes=None):
+        """Newest `n` cycles of `site`, newest first, as dicts {'ts': epoch, code: value or None}"""
+        return self._select(site, codes, '', (), 'DESC', n)
+
+    def sites(self, table=TABLE):
+        """Sites with rows in `table` (one index seek per site, no table scan)"""
+        sites, cursor = [], self._reader()
+        row = cursor.execute(f"SELECT min(site) FROM {table}").fetchone()
+        while row[0] is not None:
+            sites.append(row[0])
+            row = cursor.execute(f"SELECT min(site) FROM {table} WHERE site > ?", (row[0],)).fetchone()
+        return sites
+
+    def first_epoch(self, site):
+        """Timestamp of the oldest stored cycle of `site`, None if there is none"""
+        return self._reader().execute(f"SELECT min(ts) FROM {TABLE} WHERE site = ?", (site,)).fetchone()[0]
+
+    def between(self, site, start, end, codes=None, limit=None):
+        """Cycles of `site` with start <= ts < end (epoch seconds), oldest first"""
+        return self._select(site, codes, ' AND ts >= ? AND ts < ?', (start, end), 'ASC', limit)
+
+    def rollups(self, site, code, width, start, end):
+        """
+        Buckets of one code in the tier of `width` seconds with start <= bucket < end,
+        oldest first, as dicts {'ts', 'min', 'max', 'mean', 'count', 'last'}
+        """
+        table = dict((w, t) for t, w in ROLLUP_TIERS)[width]
+        cursor = self._reader().execute(
+            f"SELECT bucket, min_value, max_value, sum_value / count, count, last_value FROM {table} "
+            f"WHERE site = ? AND code = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            (site, code, bucket_start(start, width), end))
+        return [dict(zip(('ts', 'min', 'max', 'mean', 'count', 'last'), row)) for row in cursor]
+
+    def trend(self, site, code, start, end, max_points=500):
+        """
+        Rollups of `code` over [start, end) from the finest tier that needs at most
+        `max_points` buckets (the daily tier for longer spans).
+        Returns (bucket width in seconds, rows as in rollups()).
+        """
+        for _, width in ROLLUP_TIERS:
+            if (end - start) / width <= max_points:
+                break
+        return width, self.rollups(site, code, width, start, end)
+
+    def _delete_batches(self, table, series, column, cutoff, batch_size, pause):
+        """
+        Delete rows of one series (`series` maps key column -> value) older than
+        `cutoff`, `batch_size` rows per transaction so ingest never waits long
+        """
+        where = ' AND '.join(f"{key} = ?" for key in series)
+        sql = (f"DELETE FROM {table} WHERE {where} AND {column} IN "
+               f"(SELECT {column} FROM {table} WHERE {where} AND {column} < ? ORDER BY {column} LIMIT {int(batch_size)})")
+        params = tuple(series.values()) * 2 + (cutoff,)
+        deleted = 0
+        while True:
+            with self._lock:
+                if self._conn is None:
+                    return deleted
+                with self._conn:
+                    count = self._conn.execute(sql, params).rowcount
+            deleted += count
+            if count < batch_size:
+                return deleted
+            time.sleep(pause)
+
+    def _file_bytes(self):
+        return sum(os.path.getsize(self.path + suffix) for suffix in ('', '-wal')
+                   if os.path.exists(self.path + suffix))
+
+    def apply_retention(self, policy, now, batch_size=2000, pause=0.05):
+        """
+        Delete rows older than each tier's retention (see parse_retention), then
+        return the freed pages to the file system a chunk at a time.
+        Returns a report {'deleted': {tier: rows}, 'reclaimed_bytes', 'seconds'}.
+        """
+        start = time.perf_counter()
+        size_before = self._file_bytes()
+        deleted = {}
+        for key, keep in policy.items():
+            table = RETENTION_TABLES[key]
+            cutoff = now - keep
+            deleted[key] = 0
+            for site in self.sites(table):
+                if table == TABLE:
+                    deleted[key] += self._delete_batches(table, {'site': site}, 'ts', cutoff, batch_size, pause)
+                    continue
+                for code in self.codes:
+                    deleted[key] += self._delete_batches(table, {'site': site, 'code': code}, 'bucket',
+                                                         cutoff, batch_size, pause)
+
+        if any(deleted.values()):
+            while True:
+                with self._lock:
+                    if self._conn is None:
+                        break
+                    free_pages = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+                    # executescript steps the pragma to completion (execute frees one page)
+                    self._conn.executescript("PRAGMA incremental_vacuum(1000);")
+                    remaining = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+                # Nothing left, or no progress
+                if remaining == 0 or remaining == free_pages:
+                    break
+                time.sleep(pause)
+            with self._lock:
+                if self._conn is not None:
+                    self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+        self.last_retention = {
+            'deleted': deleted,
+            'reclaimed_bytes': max(0, size_before - self._file_bytes()),
+            'seconds': round(time.perf_counter() - start, 3),
+        }
+        return self.last_retention
+
+    def stats(self):
+        return {'path': self.path, 'written': self.written, 'pending': len(self._pending),
+                'duplicates': self.duplicates, 'dropped': self.dropped,
+                'last_retention': self.last_retention}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._flush_locked()
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,188 @@
+'''
+ Nama File      : ingest.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Memproses pesan MQTT menjadi update pada penyimpanan data dashboard
+    2. Setiap jenis kode (lihat sensor_registry.py) punya handler sendiri,
+       dipilih lewat lookup dict, bukan rantai if/elif
+    3. Tidak bergantung pada Dash/Flask sehingga bisa di-benchmark terpisah
+    4. Menerima juga satu pesan batch per siklus (topik mcs/cycle, JSON atau CBOR)
+       yang diterapkan sekaligus sebagai satu baris: nilai dikelompokkan per
+       penyimpanan saat di-parse lalu ditulis dengan satu operasi per penyimpanan
+    5. Setiap siklus yang selesai diteruskan ke penyimpanan riwayat (history_store.py)
+    6. Pesan per nilai dicatat lewat logging level DEBUG (mati secara default),
+       bukan print, agar jalur ingest tidak menulis ke stdout setiap pesan
+'''
+
+from collections import namedtuple
+import json
+import logging
+import math
+import time
+import cbor2
+from sensor_registry import (
+    SENSOR_REGISTRY, CYCLE_BATCH_CODE,
+    KIND_CYCLE_START, KIND_DATA, KIND_ALARM, KIND_BERITA, KIND_PREDICTION, KIND_CYCLE_BATCH,
+)
+
+log = logging.getLogger(__name__)
+
+# Stores mutated by the handlers (the same objects the Dash callbacks read);
+# `history` is an optional SiteHistory receiving every completed cycle
+IngestStores = namedtuple('IngestStores', ['sensors', 'alarm_data', 'predictions', 'snapshots', 'history'],
+                          defaults=(None,))
+
+def record_cycle(stores):
+    """Hand the newest row, once complete, to the history store (if any)"""
+    if stores.history is not None and len(stores.sensors):
+        stores.history.record(stores.sensors.epochs(1)[-1], stores.sensors.latest_row())
+
+def handle_cycle_start(stores, code, value, epoch):
+    """Start a new row stamped `epoch`, forward-filled from the previous one"""
+    # Publish whatever the previous cycle left unpublished
+    stores.snapshots.begin_cycle()
+    # The prediction set received during the previous cycle is complete
+    stores.predictions.seal()
+    # ... and so is the previous row
+    record_cycle(stores)
+    stores.sensors.begin_row(epoch)
+    stores.sensors.set_latest(code, value)
+
+def handle_data(stores, code, value, epoch):
+    """Other data topics UPDATE the last row"""
+    stores.sensors.set_latest(code, value)
+
+def handle_alarm(stores, code, value, epoch):
+    stores.alarm_data[code] = value
+    log.debug("Updated alarm %s: %s", code, value)
+
+def handle_berita(stores, code, value, epoch):
+    stores.alarm_data[code] = value
+    log.debug("Updated berita %s: %s", code, value)
+
+def handle_prediction(stores, code, value, epoch):
+    stores.predictions.update(code, value, epoch)
+    log.debug("Updated prediction %s: %s", code, value)
+
+KIND_HANDLERS = {
+    KIND_CYCLE_START: handle_cycle_start,
+    KIND_DATA: handle_data,
+    KIND_ALARM: handle_alarm,
+    KIND_BERITA: handle_berita,
+    KIND_PREDICTION: handle_prediction,
+}
+
+# code -> (spec, handler), resolved once so dispatch is a single dict lookup
+MessageRoute = namedtuple('MessageRoute', ['spec', 'handler'])
+
+def build_message_routes(registry=SENSOR_REGISTRY):
+    """Pair every registered code with the handler for its kind"""
+    return {code: MessageRoute(spec, KIND_HANDLERS[spec.kind]) for code, spec in registry.items()}
+
+MESSAGE_ROUTES = build_message_routes()
+
+# Codes seen on the wildcard subscription that are not in the registry (logged once each)
+UNKNOWN_CODES = set()
+
+def log_unknown_code(code, source):
+    if code not in UNKNOWN_CODES:
+        UNKNOWN_CODES.add(code)
+        print(f"Ignoring unregistered code {code} from {source}, add it to the sensor config to use it")
+
+# Device timestamps further than this from the receive time are not trusted (unset RTC)
+CYCLE_MAX_CLOCK_SKEW = 3600
+
+# Values of one cycle batch, grouped by the store they go to (dicts code -> value)
+CycleValues = namedtuple('CycleValues', ['row', 'forecasts', 'alarms'])
+
+def parse_cycle(payload, routes=MESSAGE_ROUTES):
+    """
+    Decode a cycle batch: a JSON or CBOR object {"ts": <device epoch>, "<code>": value, ...}.
+    Returns (device_ts or None, CycleValues). Every value is converted
+    before anything is applied, so a bad value rejects the whole cycle.
+    """
+    if payload.lstrip()[:1] in (b'{', b'['):
+        batch = json.loads(payload)
+    else:
+        batch = cbor2.loads(payload)
+    if not isinstance(batch, dict):
+        raise ValueError("cycle payload must be an object")
+
+    device_ts = batch.pop('ts', None)
+    cycle = CycleValues({}, {}, {})
+    targets = {KIND_CYCLE_START: cycle.row, KIND_DATA: cycle.row, KIND_PREDICTION: cycle.forecasts,
+               KIND_ALARM: cycle.alarms, KIND_BERITA: cycle.alarms}
+    for code, raw in batch.items():
+        route = routes.get(code)
+        if route is None:
+            log_unknown_code(code, "a cycle batch")
+            continue
+        spec = route.spec
+        try:
+            targets[spec.kind][code] = spec.convert(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid {spec.kind} value for {code}: {raw!r}")
+    return device_ts, cycle
+
+def apply_cycle(stores, cycle, epoch):
+    """
+    Apply a whole cycle as one row stamped `epoch`: close the previous cycle,
+    start the row, write every value, then publish a single snapshot, so no
+    reader ever sees the row half-filled. Codes missing from the batch keep
+    their forward-filled value.
+    """
+    stores.snapshots.begin_cycle()
+    stores.predictions.seal()
+    stores.sensors.begin_row(epoch)
+    stores.sensors.set_latest_many(cycle.row)
+    stores.predictions.update_many(cycle.forecasts, epoch)
+    stores.alarm_data.update(cycle.alarms)
+    stores.snapshots.publish()
+    record_cycle(stores)
+
+def dispatch_cycle(stores, payload, routes=MESSAGE_ROUTES, recv_ts=None):
+    """Decode and apply one cycle batch, returns KIND_CYCLE_BATCH or None on a bad payload"""
+    recv_ts = time.time() if recv_ts is None else recv_ts
+    try:
+        device_ts, cycle = parse_cycle(payload, routes)
+    except ValueError as e:
+        print(f"Error parsing cycle batch: {e}")
+        return None
+
+    # Prefer the device clock, unless it is clearly wrong
+    epoch = recv_ts
+    if isinstance(device_ts, (int, float)) and math.isfinite(device_ts) \
+            and abs(device_ts - recv_ts) <= CYCLE_MAX_CLOCK_SKEW:
+        epoch = float(device_ts)
+
+    apply_cycle(stores, cycle, epoch)
+    log.debug("Updated cycle: %d values", sum(map(len, cycle)))
+    return KIND_CYCLE_BATCH
+
+def dispatch_message(stores, topic, payload, routes=MESSAGE_ROUTES, recv_ts=None):
+    """
+    Route one MQTT message to its handler.
+    `recv_ts` is the epoch the message was received (defaults to now).
+    Returns the kind of the message, or None if the topic is not registered
+    or the payload could not be parsed.
+    """
+    code = topic.rpartition('/')[2]
+    if code == CYCLE_BATCH_CODE:
+        return dispatch_cycle(stores, payload, routes, recv_ts)
+
+    route = routes.get(code)
+    if route is None:
+        log_unknown_code(code, topic)
+        return None
+
+    spec, handler = route
+    try:
+        value = spec.parser(payload)
+    except ValueError:
+        print(f"Error parsing {spec.kind} value for {code}: {payload!r}")
+        return None
+
+    handler(stores, code, value, time.time() if recv_ts is None else recv_ts)
+    stores.snapshots.received(code)
+    return spec.kind
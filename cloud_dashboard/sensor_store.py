@@ -0,0 +1,295 @@
+'''
+ Nama File      : sensor_store.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Penyimpanan time-series sensor berbasis ring buffer NumPy
+    2. Satu array float64 per kode sensor dan satu kolom timestamp epoch bersama,
+       dialokasikan sekali sehingga pemakaian memori tetap
+    3. Append O(1) dan window data terbaru berupa view tanpa copy
+    4. Penyimpanan prediksi: nilai terbaru per horizon dan riwayat set prediksi
+       terbatas yang diindeks berdasarkan waktu terbit
+'''
+
+from datetime import datetime
+import numpy as np
+import pytz
+
+JAKARTA_TZ = pytz.timezone('Asia/Jakarta')
+
+def format_time_labels(epochs, fmt='%H:%M:%S'):
+    """Format epoch seconds as Asia/Jakarta wall-clock labels (render time only)"""
+    return [datetime.fromtimestamp(t, tz=JAKARTA_TZ).strftime(fmt) for t in epochs]
+
+def local_datetime(epoch):
+    """Epoch seconds as a naive Asia/Jakarta datetime (full date, safe across midnight)"""
+    return datetime.fromtimestamp(epoch, tz=JAKARTA_TZ).replace(tzinfo=None)
+
+class SensorStore:
+    """
+    Fixed-size columnar ring buffer holding one row per measurement cycle.
+
+    Every sample is written twice, at `pos` and `pos + depth`, so the newest
+    n samples always form one contiguous slice and window() can hand out a
+    view instead of a copy. Views alias the live buffer: a reader that keeps
+    one across cycles will see it shift as new rows arrive.
+
+    Slots are overwritten in place, so a reader pinned with mark() checks
+    intact() after copying its window: every begin_row() bumps a write
+    counter before touching its slot.
+    """
+
+    def __init__(self, codes, depth):
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        self.codes = tuple(codes)
+        self.depth = depth
+        self._column = {code: i for i, code in enumerate(self.codes)}
+        self._values = np.full((len(self.codes), 2 * depth), np.nan)
+        self._epochs = np.full(2 * depth, np.nan)
+        self._head = 0     # next write position in [0, depth)
+        self._count = 0    # number of valid rows
+        self._written = 0  # rows begun so far (bumped before the slot is written)
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, code):
+        return code in self._column
+
+    @property
+    def nbytes(self):
+        """Memory held by the buffers, fixed at construction"""
+        return self._values.nbytes + self._epochs.nbytes
+
+    def _last_pos(self):
+        return (self._head - 1) % self.depth
+
+    def begin_row(self, epoch):
+        """Append a new row stamped `epoch`, forward-filled from the previous row"""
+        self._written += 1
+        pos = self._head
+        mirror = pos + self.depth
+        if self._count:
+            self._values[:, pos] = self._values[:, self._last_pos()]
+        else:
+            self._values[:, pos] = np.nan
+        self._values[:, mirror] = self._values[:, pos]
+        self._epochs[pos] = self._epochs[mirror] = epoch
+
+        self._head = (pos + 1) % self.depth
+        if self._count < self.depth:
+            self._count += 1
+
+    def set_latest(self, code, value):
+        """Overwrite `code` in the newest row, ignored while the store is empty"""
+        if not self._count:
+            return
+        pos = self._last_pos()
+        column = self._values[self._column[code]]
+        column[pos] = column[pos + self.depth] = value
+
+    def set_latest_many(self, values):
+        """Overwrite every code of `values` (dict code -> value) in the newest row at once"""
+        if not self._count or not values:
+            return
+        pos = self._last_pos()
+        column = self._values[:, pos]
+        column[[self._column[code] for code in values]] = list(values.values())
+        self._values[:, pos + self.depth] = column
+
+    def latest(self, code, default=None):
+        """Newest value of `code` as a Python float, or `default` if missing"""
+        if not self._count:
+            return default
+        value = self._values[self._column[code], self._last_pos()]
+        return default if np.isnan(value) else float(value)
+
+    def mark(self):
+        """
+        Position of the newest row, pass it as `at` to read the store as of now.
+        It covers at most depth - 1 rows, so the next begin_row() (which reuses
+        the oldest slot of a full ring) leaves every window read at it intact.
+        """
+        return self._head, min(self._count, max(self.depth - 1, 1)), self._written
+
+    def intact(self, n, at):
+        """
+        How many of the newest min(n, rows) rows as of mark() `at` are not
+        overwritten yet. Call it after copying the window: rows older than
+        that may hold newer data.
+        """
+        _, count, written = at
+        return max(0, min(n, count, self.depth - (self._written - written)))
+
+    def latest_row(self):
+        """Copy of the newest row as a dict code -> float (NaN when missing)"""
+        if not self._count:
+            return dict.fromkeys(self.codes, np.nan)
+        return dict(zip(self.codes, self._values[:, self._last_pos()].tolist()))
+
+    def _window_bounds(self, n, at):
+        head, count = (self._head, self._count) if at is None else at[:2]
+        n = min(n, count)
+        end = head + self.depth
+        return end - n, end
+
+    def window(self, code, n, at=None):
+        """
+        Read-only view of the newest min(n, len(self)) values of `code`, oldest first.
+        With `at` from mark(), the window ends at that row instead of the newest one;
+        it stays valid until the ring wraps past it (depth - n rows later, see intact()).
+        """
+        start, end = self._window_bounds(n, at)
+        view = self._values[self._column[code], start:end]
+        view.flags.writeable = False
+        return view
+
+    def epochs(self, n, at=None):
+        """Read-only view of the epoch timestamps matching window(code, n, at)"""
+        start, end = self._window_bounds(n, at)
+        view = self._epochs[start:end]
+        view.flags.writeable = False
+        return view
+
+    def load(self, epochs, columns):
+        """
+        Replace the contents with rows stamped `epochs` (oldest first), keeping
+        the newest `depth`. `columns` maps code -> values aligned with `epochs`;
+        unknown codes are ignored and codes not given are NaN.
+        """
+        epochs = np.asarray(epochs, dtype=float)[-self.depth:]
+        n = len(epochs)
+        # Every slot may change: windows pinned before the load are no longer intact
+        self._written += self.depth
+        self._values[:, :n] = np.nan
+        for code, values in columns.items():
+            if code in self._column:
+                self._values[self._column[code], :n] = np.asarray(values, dtype=float)[-n:]
+        self._epochs[:n] = epochs
+        # Mirror, so the rows are contiguous whatever window is asked for
+        self._values[:, self.depth:self.depth + n] = self._values[:, :n]
+        self._epochs[self.depth:self.depth + n] = epochs
+        self._head = n % self.depth
+        self._count = n
+
+    def clear(self):
+        """
+        Drop every row, keeping the preallocated buffers. Old samples are left
+        in place and the write position is kept (begin_row() never forward-fills
+        into an empty store), so windows pinned by an earlier mark() stay intact
+        until new rows reach their slots, as if the store had not been cleared.
+        """
+        self._count = 0
+
+class PredictionStore:
+    """
+    Latest value per prediction code plus a bounded ring of past prediction sets.
+
+    update() only touches the latest-value slot. seal() copies the current
+    slots into the history ring, keyed by the time the first value of the set
+    arrived, so memory stays fixed at `history` sets of len(codes) floats.
+    """
+
+    def __init__(self, codes, history):
+        if history < 1:
+            raise ValueError("history must be at least 1")
+        self.codes = tuple(codes)
+        self.history = history
+        self._column = {code: i for i, code in enumerate(self.codes)}
+        self._latest = np.full(len(self.codes), np.nan)
+        self._sets = np.full((history, len(self.codes)), np.nan)
+        self._issued = np.full(history, np.nan)
+        self._head = 0
+        self._count = 0
+        self._pending_epoch = None  # issue time of the set being received
+
+    def __len__(self):
+        """Number of sealed prediction sets in the history ring"""
+        return self._count
+
+    @property
+    def nbytes(self):
+        return self._latest.nbytes + self._sets.nbytes + self._issued.nbytes
+
+    def update(self, code, value, epoch):
+        """Store the newest forecast for `code`, received at `epoch`"""
+        self._latest[self._column[code]] = value
+        if self._pending_epoch is None:
+            self._pending_epoch = epoch
+
+    def update_many(self, values, epoch):
+        """Store several forecasts (dict code -> value) received at `epoch`"""
+        if not values:
+            return
+        self._latest[[self._column[code] for code in values]] = list(values.values())
+        if self._pending_epoch is None:
+            self._pending_epoch = epoch
+
+    def latest(self, code, default=None):
+        """Newest forecast for `code` as a Python float, or `default` if none yet"""
+        value = self._latest[self._column[code]]
+        return default if np.isnan(value) else float(value)
+
+    def latest_set(self):
+        """Copy of every latest slot as a dict code -> float (NaN when missing)"""
+        return dict(zip(self.codes, self._latest.tolist()))
+
+    def seal(self):
+        """Archive the current set if any forecast arrived since the last seal"""
+        if self._pending_epoch is None:
+            return
+        self._sets[self._head] = self._latest
+        self._issued[self._head] = self._pending_epoch
+        self._head = (self._head + 1) % self.history
+        if self._count < self.history:
+            self._count += 1
+        self._pending_epoch = None
+
+    def _ordered(self):
+        """Ring positions of the sealed sets, oldest first"""
+        return np.arange(self._head - self._count, self._head) % self.history
+
+    def issued(self):
+        """Issue times (epoch seconds) of the sealed sets, oldest first"""
+        return self._issued[self._ordered()]
+
+    def set_at(self, epoch):
+        """
+        The sealed set that was current at `epoch` (issued at or before it),
+        as a dict code -> value, or None if no set is that old.
+        """
+        order = self._ordered()
+        idx = np.searchsorted(self._issued[order], epoch, side='right') - 1
+        if idx < 0:
+            return None
+        values = self._sets[order[idx]]
+        return {code: (None if np.isnan(v) else float(v)) for code, v in zip(self.codes, values)}
+
+    def state(self):
+        """(latest values, issue times, sets) copies, sets oldest first"""
+        order = self._ordered()
+        return self._latest.copy(), self._issued[order], self._sets[order]
+
+    def load(self, codes, latest, issued, sets):
+        """Replace the contents with a state() taken with prediction codes `codes`"""
+        self.clear()
+        issued = np.asarray(issued, dtype=float)[-self.history:]
+        sets = np.asarray(sets, dtype=float)[-self.history:]
+        for i, code in enumerate(codes):
+            column = self._column.get(code)
+            if column is not None:
+                self._latest[column] = latest[i]
+                self._sets[:len(issued), column] = sets[:, i]
+        self._issued[:len(issued)] = issued
+        self._head = len(issued) % self.history
+        self._count = len(issued)
+
+    def clear(self):
+        """Forget the latest slots and the whole history"""
+        self._latest.fill(np.nan)
+        self._sets.fill(np.nan)
+        self._issued.fill(np.nan)
+        self._head = 0
+        self._count = 0
+        self._pending_epoch = None
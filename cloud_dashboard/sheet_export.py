@@ -0,0 +1,227 @@
+'''
+ Nama File      : sheet_export.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Ekspor data spreadsheet (dari SheetMirror) untuk route /download dalam
+       format CSV, Parquet atau XLSX, dengan filter rentang tanggal dan kolom
+    2. CSV dikirim per potongan (streaming) sambil ditulis ke cache, XLSX
+       ditulis langsung ke file (openpyxl write-only); baris diambil per
+       potongan dari mirror, tidak ada DataFrame utuh di RAM (kecuali Parquet)
+    3. File hasil di-cache di disk per (versi data, format, rentang, kolom),
+       sehingga unduhan yang sama berikutnya langsung dikirim dari cache
+    4. pyarrow opsional: tanpa pyarrow format Parquet tidak tersedia
+'''
+
+import hashlib
+import os
+import threading
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+TIME_COLUMN = 'Time'
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
+}
+
+def parse_times(values):
+    """Sheet time strings to datetime64 (NaT when unparseable)"""
+    times = pd.to_datetime(pd.Series(values, dtype=object), format=TIME_FORMAT, errors='coerce')
+    if times.isna().all() and len(values):
+        times = pd.to_datetime(pd.Series(values, dtype=object), format='mixed', errors='coerce')
+    return times.to_numpy(dtype='datetime64[ns]')
+
+class SheetExporter:
+    """
+    Builds downloads of a SheetMirror into `directory`, keeping at most
+    `max_files` of them (least recently used are removed).
+
+    The row times are parsed once per mirror generation and only extended
+    for rows appended since, so filtering a large sheet by date stays cheap.
+    CSV and XLSX rows are read from the mirror `chunk_rows` at a time; only
+    Parquet (columnar) builds the whole selection as one DataFrame.
+
+    Cached files are opened and pruned under one lock, so a file handed to
+    the caller is never removed before it has been opened.
+    """
+
+    def __init__(self, mirror, directory, max_files=32, chunk_rows=5000):
+        self.mirror = mirror
+        self.directory = directory
+        self.max_files = max_files
+        self.chunk_rows = chunk_rows
+        self._lock = threading.Lock()
+        self._files_lock = threading.Lock()
+        self._times = (None, np.empty(0, dtype='datetime64[ns]'))  # (generation, parsed times)
+        self.builds = 0
+        self.hits = 0
+
+    @property
+    def formats(self):
+        return [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet' or pq is not None]
+
+    def _row_times(self, version, header, rows):
+        generation, count = version
+        with self._lock:
+            parsed_generation, times = self._times
+            if parsed_generation != generation or len(times) > count:
+                times = times[:0]
+            if len(times) < count:
+                index = header.index(TIME_COLUMN)
+                new = parse_times([row[index] for row in rows[len(times):count]])
+                times = np.concatenate((times, new))
+                self._times = (generation, times)
+            return times[:count]
+
+    @staticmethod
+    def _columns(header, columns):
+        columns = list(header) if columns is None else \
+            [TIME_COLUMN] + [c for c in columns if c != TIME_COLUMN]
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise KeyError(', '.join(missing))
+        return columns
+
+    def select(self, start=None, end=None, columns=None):
+        """
+        DataFrame of the mirrored rows with start <= Time < end (either bound
+        may be None) and only `columns` (None = all, Time is always first).
+        Raises KeyError for an unknown column.
+        """
+        table = self.mirror.table()
+        columns = self._columns(table[1], columns)
+        return self._frame(table, self._selected(table, start, end), columns)
+
+    def _selected(self, table, start, end):
+        """Indexes of the table rows with start <= Time < end"""
+        version, header, rows = table
+        if (start is None and end is None) or TIME_COLUMN not in header:
+            return np.arange(version[1])
+        times = self._row_times(version, header, rows)
+        mask = ~np.isnat(times)
+        if start is not None:
+            mask &= times >= np.datetime64(start, 'ns')
+        if end is not None:
+            mask &= times < np.datetime64(end, 'ns')
+        return np.flatnonzero(mask)
+
+    @staticmethod
+    def _frame(table, selected, columns):
+        """DataFrame of the `selected` rows of the table, only `columns`"""
+        _, header, rows = table
+        indexes = [header.index(c) for c in columns]
+        return pd.DataFrame([[rows[i][j] for j in indexes] for i in selected], columns=columns)
+
+    def _chunks(self, selected):
+        """`selected` in slices of at most chunk_rows (one empty slice when nothing is selected)"""
+        for offset in range(0, max(len(selected), 1), self.chunk_rows):
+            yield selected[offset:offset + self.chunk_rows]
+
+    def cache_path(self, key, fmt):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+        return os.path.join(self.directory, digest + EXPORT_FORMATS[fmt][1])
+
+    def export(self, fmt, start=None, end=None, columns=None):
+        """
+        ('file', binary file) of a cached or freshly built export, opened
+        for the caller to send and close, or for CSV not cached yet
+        ('stream', chunks) where iterating the chunks also writes the cache
+        file. Raises KeyError for an unknown column and ValueError for an
+        unavailable format.
+        """
+        if fmt not in self.formats:
+            raise ValueError(f"unsupported format {fmt!r}, use one of {', '.join(self.formats)}")
+        table = self.mirror.table()
+        columns = self._columns(table[1], columns)
+        key = (table[0], fmt, str(start), str(end), tuple(columns))
+        path = self.cache_path(key, fmt)
+        cached = self._open_cached(path)
+        if cached is not None:
+            self.hits += 1
+            return 'file', cached
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.builds += 1
+        selected = self._selected(table, start, end)
+        if fmt == 'csv':
+            return 'stream', self._stream_csv(table, selected, columns, path)
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        if fmt == 'parquet':
+            frame = self._frame(table, selected, columns)
+            pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), tmp, compression='zstd')
+        else:
+            self._write_xlsx(table, selected, columns, tmp)
+        return 'file', self._install(tmp, path, open_file=True)
+
+    def _open_cached(self, path):
+        """`path` opened for reading and marked recently used, None when not cached"""
+        with self._files_lock:
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                return None
+            os.utime(path)
+            return f
+
+    def _install(self, tmp, path, open_file=False):
+        """Move a finished build into the cache (opened for the caller if asked) and prune"""
+        with self._files_lock:
+            os.replace(tmp, path)
+            f = open(path, 'rb') if open_file else None
+            self._prune()
+        return f
+
+    def _stream_csv(self, table, selected, columns, path):
+        """Yield the CSV `chunk_rows` rows at a time, caching it once complete"""
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        done = False
+        try:
+            with open(tmp, 'w', encoding='utf-8', newline='') as f:
+                for i, part in enumerate(self._chunks(selected)):
+                    chunk = self._frame(table, part, columns).to_csv(index=False, header=i == 0)
+                    f.write(chunk)
+                    yield chunk
+            self._install(tmp, path)
+            done = True
+        finally:
+            if not done and os.path.exists(tmp):
+                os.remove(tmp)  # download aborted
+
+    @staticmethod
+    def _write_xlsx(table, selected, columns, path):
+        # Write-only workbook: rows go straight from the mirror to the file,
+        # no DataFrame and no cell tree in memory
+        _, header, rows = table
+        indexes = [header.index(c) for c in columns]
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('SensorData')
+        sheet.append(list(columns))
+        for i in selected:
+            sheet.append([rows[i][j] for j in indexes])
+        workbook.save(path)
+
+    def _prune(self):
+        """Remove the least recently used files beyond max_files (files lock held)"""
+        entries = [entry for entry in os.scandir(self.directory)
+                   if entry.is_file() and not entry.name.endswith('.tmp')]
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in entries[self.max_files:]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def stats(self):
+        return {'builds': self.builds, 'hits': self.hits, 'formats': self.formats}
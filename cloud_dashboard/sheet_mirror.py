@@ -0,0 +1,203 @@
+'''
+ Nama File      : sheet_mirror.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Satu client Google Sheets (gspread) per proses: credentials.json dibaca
+       dan gspread.authorize dijalankan sekali, bukan di setiap callback
+    2. Satu thread background menyalin (mirror) sheet microclimate_database
+       ke memori secara berkala
+    3. Semua tabel historis dan route /download membaca dari mirror ini,
+       sehingga jumlah panggilan API tidak bergantung pada jumlah browser
+    4. Sinkronisasi inkremental dengan watermark baris: setiap poll hanya
+       mengambil baris baru (satu batch_get), sinkronisasi penuh hanya saat
+       header berubah atau ada baris yang dihapus
+'''
+
+import threading
+import time
+import gspread
+from gspread.utils import numericise_all, rowcol_to_a1, to_records
+from oauth2client.service_account import ServiceAccountCredentials
+
+SHEET_SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+
+class SheetClient:
+    """
+    Lazily authorized worksheet handle shared by the whole process. After an
+    API error call invalidate() so the next use authorizes again (expired or
+    revoked credentials, sheet re-shared).
+    """
+
+    def __init__(self, keyfile, spreadsheet, scope=SHEET_SCOPE):
+        self.keyfile = keyfile
+        self.spreadsheet = spreadsheet
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._sheet = None
+        self.authorizations = 0
+
+    def worksheet(self):
+        """First worksheet of the spreadsheet, authorizing on first use"""
+        with self._lock:
+            if self._sheet is None:
+                creds = ServiceAccountCredentials.from_json_keyfile_name(self.keyfile, self.scope)
+                client = gspread.authorize(creds)
+                self._sheet = client.open(self.spreadsheet).sheet1
+                self.authorizations += 1
+            return self._sheet
+
+    def invalidate(self):
+        with self._lock:
+            self._sheet = None
+
+def column_letter(col):
+    return rowcol_to_a1(1, col)[:-1]
+
+class SheetMirror:
+    """
+    In-memory copy of the sheet's rows, the same records get_all_records()
+    returns (oldest first), refreshed every `interval` seconds by one daemon
+    thread.
+
+    The first sync downloads the whole sheet. Later syncs remember the row
+    watermark and fetch, in one batch_get, the header row plus everything
+    from the last synced row down. The overlapping last row must be
+    unchanged and the header identical; otherwise rows were deleted or the
+    columns changed and the sheet is downloaded in full again. Edits to
+    older rows are not picked up until such a full sync.
+
+    The thread is started by the first reader (table(), records(),
+    latest()), so a dashboard served
+    entirely from the history database never calls the Sheets API. Readers
+    never wait for the API: they get the last synced rows (empty before the
+    first sync). Rows are kept as numericised value lists and turned into
+    dicts only when read.
+    """
+
+    def __init__(self, client, interval=30.0):
+        self.client = client
+        self.interval = interval
+        # (generation, header, rows): a new tuple and rows list on every sync that
+        # changes anything (next generation on a full sync), so a table handed
+        # out to a reader is never modified
+        self._table = (0, [], [])
+        self._last_raw = None  # unconverted values of the last synced row (the header when empty)
+        self._synced = None    # time.time() of the last successful sync
+        self._sync_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.syncs = 0
+        self.full_syncs = 0
+        self.rows_fetched = 0
+        self.errors = 0
+        self.last_error = None
+
+    @property
+    def watermark(self):
+        """Sheet row number (1-based, header included) of the last synced row"""
+        return len(self._table[2]) + 1
+
+    def table(self):
+        """
+        (version, header, rows) as of now; version = (generation, row count)
+        changes whenever the data does. Later syncs swap in a new rows list,
+        this one stays as it is; it must not be modified either. Starts the
+        syncer on first use.
+        """
+        self.start()
+        generation, header, rows = self._table
+        return (generation, len(rows)), header, rows
+
+    @property
+    def synced(self):
+        return self._synced is not None
+
+    def sync(self):
+        """Bring the mirror up to date now"""
+        with self._sync_lock:
+            try:
+                worksheet = self.client.worksheet()
+                if self._last_raw is None or not self._sync_new_rows(worksheet):
+                    self._sync_full(worksheet)
+            except (gspread.exceptions.APIError, gspread.exceptions.SpreadsheetNotFound):
+                self.client.invalidate()
+                raise
+            self._synced = time.time()
+            self.syncs += 1
+
+    def _sync_full(self, worksheet):
+        values = worksheet.get(pad_values=True)
+        header, raw = (values[0], values[1:]) if values and values[0] else ([], [])
+        self._table = (self._table[0] + 1, header, [numericise_all(row) for row in raw])
+        self._last_raw = raw[-1] if raw else header
+        self.full_syncs += 1
+        self.rows_fetched += len(raw)
+
+    def _sync_new_rows(self, worksheet):
+        """Append the rows added since the last sync, False when a full sync is needed"""
+        generation, header, rows = self._table
+        width = len(header)
+        if not width:
+            return False
+        watermark = self.watermark
+        head, tail = worksheet.batch_get(
+            ['1:1', f'A{watermark}:{column_letter(width)}'])
+        if not head or self._pad(head[0], width) != header:
+            return False   # columns changed
+        if not tail or self._pad(tail[0], width) != self._last_raw:
+            return False   # rows deleted or rewritten above the watermark
+        new = [self._pad(row, width) for row in tail[1:]]
+        if new:
+            # Readers may be iterating the current list: publish a longer copy
+            self._table = (generation, header, rows + [numericise_all(row) for row in new])
+            self._last_raw = new[-1]
+            self.rows_fetched += len(new)
+        return True
+
+    @staticmethod
+    def _pad(row, width):
+        return list(row) + [''] * (width - len(row))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except gspread.exceptions.SpreadsheetNotFound:
+                self.errors += 1
+                self.last_error = "spreadsheet not found"
+                print("Error: Spreadsheet not found. Check the name and sharing permissions.")
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"An error occurred while syncing the spreadsheet: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sheet-mirror', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def records(self):
+        """All mirrored rows as dicts, oldest first (starts the syncer on first use)"""
+        self.start()
+        _, header, rows = self._table
+        return to_records(header, rows)
+
+    def latest(self, n):
+        """Newest `n` rows as dicts, newest first"""
+        self.start()
+        _, header, rows = self._table
+        return to_records(header, rows[-n:][::-1]) if n > 0 else []
+
+    def stats(self):
+        age = None if self._synced is None else round(time.time() - self._synced, 1)
+        return {'interval': self.interval, 'rows': len(self._table[2]), 'age': age,
+                'syncs': self.syncs, 'full_syncs': self.full_syncs,
+                'rows_fetched': self.rows_fetched, 'errors': self.errors,
+                'last_error': self.last_error, 'authorizations': self.client.authorizations}
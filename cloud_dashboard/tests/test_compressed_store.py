@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+from compressed_store import (
+    ChunkedSensorStore, CompressedChunk, encode_floats, decode_floats, encode_epochs, decode_epochs,
+)
+from sensor_store import SensorStore
+
+def same_bits(a, b):
+    return np.array_equal(np.asarray(a, dtype=np.float64).view(np.uint64),
+                          np.asarray(b, dtype=np.float64).view(np.uint64))
+
+@pytest.mark.parametrize('values', [
+    [25.0],
+    [25.0] * 100,                                        # constant: no changed samples
+    [np.nan, 1.5, np.nan, np.nan, 2.25, -0.0, 0.0],      # NaN and signed zero kept bit for bit
+    [np.inf, -np.inf, 1e300, -1e-300, 5e-324],
+    list(np.cumsum(np.random.default_rng(1).normal(0, 0.1, 1000)) + 25),
+])
+def test_float_round_trip_is_lossless(values):
+    values = np.asarray(values, dtype=np.float64)
+    assert same_bits(decode_floats(encode_floats(values), len(values)), values)
+
+def test_constant_series_packs_no_bits():
+    block = encode_floats(np.full(500, 60.25))
+    assert block.width == 0 and block.packed.nbytes == 0
+
+@pytest.mark.parametrize('epochs', [
+    [1760000000.0],
+    [1760000000.0, 1760000001.0],
+    1760000000.0 + np.arange(1000.0),                    # regular 1 Hz: every delta-of-delta is 0
+    [1760000000.0, 1760000000.9, 1760000005.0, 1760000004.5, 1760000100.0],  # jitter, clock set back
+])
+def test_epoch_round_trip(epochs):
+    epochs = np.asarray(epochs, dtype=np.float64)
+    assert decode_epochs(encode_epochs(epochs), len(epochs)).tolist() == epochs.tolist()
+
+def test_fractional_ms_epochs_are_rounded_to_the_millisecond():
+    epochs = np.array([1760000000.0004, 1760000000.1236, 1760000000.2501])
+    decoded = decode_epochs(encode_epochs(epochs), len(epochs))
+    assert decoded.tolist() == [1760000000.0, 1760000000.124, 1760000000.25]
+
+def test_regular_epochs_pack_no_bits():
+    block = encode_epochs(1760000000.0 + np.arange(100.0))
+    assert block.width == 0 and block.delta == 1000
+
+def test_compressed_chunk_columns():
+    values = np.array([[1.0, 1.0, 2.0], [np.nan, 3.0, 3.0]])
+    chunk = CompressedChunk(6, values, np.array([10.0, 11.0, 12.0]))
+    assert (chunk.start, chunk.count) == (6, 3)
+    assert chunk.column(None).tolist() == [10.0, 11.0, 12.0]
+    assert same_bits(chunk.column(1), values[1])
+
+def fill_both(stores, rows, rng):
+    for i in range(rows):
+        epoch = 1760000000.0 + i
+        value = round(float(rng.normal(25, 1)), 2)
+        for store in stores:
+            store.begin_row(epoch)
+            store.set_latest('a', value)
+            if i % 4 == 0:
+                store.set_latest('b', float(i))
+
+def test_windows_across_chunk_boundaries_match_the_ring():
+    ring = SensorStore(('a', 'b'), 10)
+    chunked = ChunkedSensorStore(('a', 'b'), 10, chunk_size=4)
+    fill_both((ring, chunked), 23, np.random.default_rng(2))
+    # Every window length, from inside the head chunk to spanning three chunks
+    for n in range(1, 12):
+        assert chunked.epochs(n).tolist() == ring.epochs(n).tolist()
+        for code in ('a', 'b'):
+            assert same_bits(chunked.window(code, n), ring.window(code, n))
+
+def test_seal_compresses_full_head_and_drops_old_chunks():
+    store = ChunkedSensorStore(('a', 'b'), 8, chunk_size=4)
+    fill_both((store,), 4, np.random.default_rng(3))
+    assert store._chunks == ()
+    head = store._head
+    view = store.window('a', 4)
+    before = view.tolist()
+
+    # The fifth row seals the full head; the new head is forward-filled from it
+    store.begin_row(1760000004.0)
+    assert [c.start for c in store._chunks] == [0]
+    assert store._head is not head and store._head.start == 4
+    assert store.latest_row() == dict(zip(('a', 'b'), head.values[:, -1].tolist()))
+
+    # The sealed chunk decodes to the head it replaced
+    assert same_bits(store._chunks[0].column(0), head.values[0])
+
+    fill_both((store,), 20, np.random.default_rng(4))
+    # A window handed out before the seal still holds its rows
+    assert view.tolist() == before
+    # Only chunks overlapping the newest `depth` rows are kept
+    assert all(c.start + c.count > store._total - store.depth for c in store._chunks)
+    assert len(store) == 8
+
+def test_compressed_smaller_than_raw_for_a_slow_series():
+    store = ChunkedSensorStore(('a', 'b'), 4096, chunk_size=1024)
+    raw = SensorStore(('a', 'b'), 4096)
+    for i in range(4096):
+        for s in (store, raw):
+            s.begin_row(1760000000.0 + i)
+            s.set_latest('a', 25.0 + (i // 60) * 0.01)
+            s.set_latest('b', 60.0)
+    assert store.nbytes < raw.nbytes / 4
+
+@pytest.mark.parametrize('rows', [3, 8, 11])
+def test_load_splits_into_sealed_chunks(rows):
+    store = ChunkedSensorStore(('a', 'b'), 10, chunk_size=4)
+    epochs = 1760000000.0 + np.arange(rows) + 0.25
+    store.load(epochs, {'a': np.arange(rows) * 1.5})
+    kept = min(rows, 10)
+    assert len(store) == kept
+    # Every full block of 4 is sealed, the last block stays the head
+    assert [c.start for c in store._chunks] == list(range(0, kept, 4))[:-1]
+    assert store.epochs(10).tolist() == epochs[-kept:].tolist()
+    assert store.window('a', 10).tolist() == (np.arange(rows) * 1.5)[-kept:].tolist()
+
+    # Appending continues from the loaded rows, across the next seal
+    for i in range(5):
+        store.begin_row(1760000100.0 + i)
+    assert store.window('a', 6).tolist() == [(rows - 1) * 1.5] * 6
+    assert store.epochs(6).tolist()[1:] == [1760000100.0 + i for i in range(5)]
@@ -0,0 +1,57 @@
+import io
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from history_archive import DAY_SECONDS, HistoryArchive
+from history_export import HistoryExporter
+from history_store import HistoryStore, bucket_start
+
+pytest.importorskip('pyarrow')
+
+CODES = ('a', 'b')
+DAY = bucket_start(1_790_000_000, DAY_SECONDS)
+NOW = DAY + 2 * DAY_SECONDS
+
+@pytest.fixture
+def exporter(tmp_path):
+    history = HistoryStore(str(tmp_path / 'history.db'), CODES)
+    for day in range(2):
+        for hour in (0, 12):
+            history.append('site1', DAY + day * DAY_SECONDS + hour * 3600,
+                           {'a': float(day * 100 + hour), 'b': float('nan')})
+    history.flush()
+    archive = HistoryArchive(str(tmp_path / 'archive'), CODES)
+    archive.compact(history, NOW)
+    # The first day is only left in the archive
+    history.apply_retention({'raw': DAY_SECONDS}, NOW, pause=0)
+    yield HistoryExporter(history, archive, chunk_rows=1)
+    history.close()
+
+def test_csv_streams_archive_and_database(exporter):
+    kind, chunks = exporter.export('csv', 'site1', DAY, NOW, ['a'])
+    assert kind == 'stream'
+    frame = pd.read_csv(io.StringIO(''.join(chunks)))
+    assert list(frame.columns) == ['Time', 'a']
+    assert frame['a'].tolist() == [0.0, 12.0, 100.0, 112.0]
+    # Asia/Jakarta wall clock, days start at local midnight
+    assert frame['Time'][0].endswith('00:00:00')
+
+@pytest.mark.parametrize('fmt', ['parquet', 'xlsx'])
+def test_file_formats(exporter, fmt):
+    kind, f = exporter.export(fmt, 'site1', DAY + 6 * 3600, NOW)
+    assert kind == 'file'
+    with f:
+        if fmt == 'parquet':
+            frame = pd.read_parquet(f)
+            assert frame['a'].tolist() == [12.0, 100.0, 112.0]
+            assert frame['b'].isna().all()
+        else:
+            rows = list(load_workbook(f, read_only=True)['SensorData'].values)
+            assert rows[0] == ('Time', 'a', 'b')
+            assert [row[1] for row in rows[1:]] == [12.0, 100.0, 112.0]
+            # Missing values are empty cells (trailing ones are not read back)
+            assert all(row[2:] in ((), (None,)) for row in rows[1:])
+
+def test_unknown_code_rejected(exporter):
+    with pytest.raises(KeyError):
+        exporter.export('csv', 'site1', DAY, NOW, ['nope'])
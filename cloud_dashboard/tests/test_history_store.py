@@ -0,0 +1,87 @@
+import sqlite3
+import pytest
+from history_store import HistoryStore, parse_retention
+
+CODES = ('a', 'b')
+
+def fill(store, count, start=0.0):
+    for i in range(count):
+        store.append('site1', start + i, {'a': float(i), 'b': float(i) * 2})
+    store.flush()
+
+def test_existing_database_converted_to_incremental_vacuum(tmp_path):
+    path = str(tmp_path / 'history.db')
+    # A database created before retention existed: WAL, auto_vacuum NONE
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE cycles (site TEXT NOT NULL, ts REAL NOT NULL, a REAL, b REAL, "
+                 "PRIMARY KEY (site, ts)) WITHOUT ROWID")
+    conn.executemany("INSERT INTO cycles VALUES ('site1', ?, ?, ?)",
+                     [(float(i), float(i), float(i)) for i in range(20000)])
+    conn.commit()
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+    conn.close()
+
+    store = HistoryStore(path, CODES)
+    try:
+        assert store._conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert len(store.between('site1', 0, 20000)) == 20000
+        report = store.apply_retention({'raw': 1000}, 20000, pause=0)
+        assert report['deleted']['raw'] == 19000
+        assert report['reclaimed_bytes'] > 0
+    finally:
+        store.close()
+
+def test_new_database_reclaims_space(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'), CODES)
+    try:
+        assert store._conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        fill(store, 20000)
+        report = store.apply_retention({'raw': 1000}, 20000, pause=0)
+        assert report['reclaimed_bytes'] > 0
+    finally:
+        store.close()
+
+def test_parse_retention():
+    assert parse_retention('raw=7d, 1m=90d,1h=forever') == {'raw': 7 * 86400, '1m': 90 * 86400}
+    assert parse_retention('') == {}
+    for text in ('raw=7x', 'hourly=7d', 'raw=d'):
+        with pytest.raises(ValueError):
+            parse_retention(text)
+
+def test_redelivered_cycle_counted_once(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'), CODES)
+    try:
+        store.append('site1', 120.0, {'a': 1.0, 'b': 2.0})
+        store.flush()
+        # Same cycle again, in a later batch and twice in one batch
+        store.append('site1', 120.0, {'a': 5.0, 'b': 6.0})
+        store.append('site1', 121.0, {'a': 3.0})
+        store.append('site1', 121.0, {'a': 9.0})
+        store.flush()
+
+        rows = store.between('site1', 0, 200)
+        assert [(row['ts'], row['a']) for row in rows] == [(120.0, 1.0), (121.0, 3.0)]
+        bucket = store.rollups('site1', 'a', 60, 120, 180)[0]
+        assert bucket['count'] == 2
+        assert bucket['mean'] == 2.0
+        assert store.stats()['written'] == 2
+        assert store.stats()['duplicates'] == 2
+    finally:
+        store.close()
+
+def test_failed_flush_keeps_newest_pending(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'), CODES, batch_size=2, max_pending=5)
+    try:
+        good_insert = store._insert
+        store._insert = "INSERT INTO missing_table VALUES (?, ?, ?, ?)"
+        for i in range(12):
+            store.append('site1', float(i), {'a': float(i)})
+        assert store.pending() == 5
+        assert store.stats()['dropped'] == 7
+
+        store._insert = good_insert
+        store.flush()
+        assert [row['ts'] for row in store.between('site1', 0, 100)] == [7.0, 8.0, 9.0, 10.0, 11.0]
+    finally:
+        store.close()
@@ -0,0 +1,61 @@
+import json
+import logging
+
+import cbor2
+import pytest
+
+from compressed_store import ChunkedSensorStore
+from ingest import IngestStores, dispatch_message, handle_alarm, handle_berita
+from sensor_registry import (
+    TOPIC_PREFIX, CYCLE_START_CODE, CYCLE_BATCH_CODE, KIND_CYCLE_BATCH, STORE_CODES,
+    TABLE_DATA_CODES, PREDICTION_CODES, ALARM_CODES, CYCLE_GROUPS,
+)
+from sensor_store import SensorStore, PredictionStore
+from snapshot import SnapshotPublisher
+
+def test_alarm_updates_log_at_debug_only(capsys, caplog):
+    stores = IngestStores(None, {}, None, None)
+    with caplog.at_level(logging.DEBUG, logger='ingest'):
+        handle_alarm(stores, 'kodeAlarm0211', 1, 0.0)
+        handle_berita(stores, 'berita0211', 'Suhu tinggi', 0.0)
+
+    assert stores.alarm_data == {'kodeAlarm0211': 1, 'berita0211': 'Suhu tinggi'}
+    assert capsys.readouterr().out == ""
+    assert [r.getMessage() for r in caplog.records] == [
+        "Updated alarm kodeAlarm0211: 1",
+        "Updated berita berita0211: Suhu tinggi",
+    ]
+
+def new_stores(sensor_store=SensorStore):
+    sensors = sensor_store(STORE_CODES, depth=16)
+    alarm_data = {}
+    predictions = PredictionStore(PREDICTION_CODES, history=4)
+    return IngestStores(sensors, alarm_data, predictions,
+                        SnapshotPublisher(sensors, alarm_data, predictions, CYCLE_GROUPS))
+
+@pytest.mark.parametrize('encode', [lambda batch: json.dumps(batch).encode(), cbor2.dumps])
+@pytest.mark.parametrize('sensor_store', [SensorStore, ChunkedSensorStore])
+def test_cycle_batch_applied_as_one_row(encode, sensor_store):
+    stores = new_stores(sensor_store)
+    data, forecast, alarm = TABLE_DATA_CODES[0], PREDICTION_CODES[0], ALARM_CODES[0]
+    first = {'ts': 1000.0, CYCLE_START_CODE: 1.0, data: 25.456, forecast: 30.0, alarm: 2}
+    assert dispatch_message(stores, TOPIC_PREFIX + CYCLE_BATCH_CODE, encode(first), recv_ts=1000.5) == KIND_CYCLE_BATCH
+    # A code missing from the next batch keeps its forward-filled value
+    second = {'ts': 1060.0, CYCLE_START_CODE: 2.0}
+    assert dispatch_message(stores, TOPIC_PREFIX + CYCLE_BATCH_CODE, encode(second), recv_ts=1060.5) == KIND_CYCLE_BATCH
+
+    assert stores.sensors.epochs(2).tolist() == [1000.0, 1060.0]
+    assert stores.sensors.window(CYCLE_START_CODE, 2).tolist() == [1.0, 2.0]
+    assert stores.sensors.window(data, 2).tolist() == [25.46, 25.46]
+    assert stores.predictions.latest(forecast) == 30.0
+    assert len(stores.predictions) == 1  # the first set was sealed by the second cycle
+    assert stores.alarm_data == {alarm: 2}
+    assert stores.snapshots.version == 2
+
+def test_bad_value_rejects_the_whole_cycle(capsys):
+    stores = new_stores()
+    batch = {'ts': 1000.0, CYCLE_START_CODE: 1.0, TABLE_DATA_CODES[0]: 'not a number'}
+    assert dispatch_message(stores, TOPIC_PREFIX + CYCLE_BATCH_CODE, json.dumps(batch).encode()) is None
+    assert dispatch_message(stores, TOPIC_PREFIX + CYCLE_BATCH_CODE, b'\xff\xff') is None
+    assert len(stores.sensors) == 0
+    assert capsys.readouterr().out.count("Error parsing cycle batch") == 2
@@ -0,0 +1,230 @@
+from functools import partial
+import math
+import numpy as np
+import pytest
+from compressed_store import ChunkedSensorStore
+from sensor_store import SensorStore, PredictionStore
+
+CODES = ('a', 'b')
+DEPTH = 8
+
+# Same behaviour suite for both stores; small chunks so the chunked one seals mid-test
+@pytest.fixture(params=[SensorStore, partial(ChunkedSensorStore, chunk_size=3)], ids=['ring', 'chunked'])
+def store(request):
+    return request.param(CODES, DEPTH)
+
+def fill(store, epochs):
+    """One row per epoch, with a = epoch * 10 and b left forward-filled"""
+    for epoch in epochs:
+        store.begin_row(float(epoch))
+        store.set_latest('a', epoch * 10.0)
+
+def test_empty_store(store):
+    assert len(store) == 0
+    assert store.latest('a', default=-1) == -1
+    assert store.window('a', 4).tolist() == []
+    assert store.epochs(4).tolist() == []
+    # Nothing to overwrite yet
+    store.set_latest('a', 1.0)
+    assert len(store) == 0
+    assert all(math.isnan(v) for v in store.latest_row().values())
+
+def test_new_row_is_forward_filled(store):
+    store.begin_row(1.0)
+    assert math.isnan(store.latest('a', default=math.nan))
+    store.set_latest('a', 10.0)
+    store.set_latest('b', 5.0)
+    store.begin_row(2.0)
+    store.set_latest('a', 20.0)
+    assert store.window('a', 4).tolist() == [10.0, 20.0]
+    assert store.window('b', 4).tolist() == [5.0, 5.0]
+    assert store.latest_row() == {'a': 20.0, 'b': 5.0}
+
+def test_wraparound_keeps_newest_depth_rows_in_order(store):
+    fill(store, range(1, 3 * DEPTH + 4))
+    newest = list(range(2 * DEPTH + 4, 3 * DEPTH + 4))
+    assert len(store) == DEPTH
+    assert store.epochs(100).tolist() == newest
+    assert store.window('a', 100).tolist() == [e * 10.0 for e in newest]
+    assert store.window('a', 3).tolist() == [e * 10.0 for e in newest[-3:]]
+    assert store.latest('a') == newest[-1] * 10.0
+
+def test_windows_are_read_only(store):
+    fill(store, range(1, 4))
+    with pytest.raises(ValueError):
+        store.window('a', 2)[0] = 0.0
+    with pytest.raises(ValueError):
+        store.epochs(2)[0] = 0.0
+
+def test_window_is_a_view_of_the_ring():
+    store = SensorStore(CODES, DEPTH)
+    fill(store, range(1, DEPTH + 3))
+    view = store.window('a', DEPTH)
+    assert np.shares_memory(view, store._values)
+
+def test_read_at_mark_after_new_rows(store):
+    fill(store, range(1, DEPTH + 3))
+    at = store.mark()
+    before = store.window('a', DEPTH, at=at).tolist()
+    epochs = store.epochs(DEPTH, at=at).tolist()
+
+    fill(store, [100, 101])
+    # The pinned window still ends at the marked row; intact() says how much of it to trust
+    n = store.intact(DEPTH, at)
+    assert 0 < n <= len(before)
+    assert store.window('a', DEPTH, at=at).tolist()[-n:] == before[-n:]
+    assert store.epochs(DEPTH, at=at).tolist()[-n:] == epochs[-n:]
+    assert store.window('a', 1).tolist() == [1010.0]
+
+def test_mark_stays_intact_for_one_more_row_when_full():
+    store = SensorStore(CODES, DEPTH)
+    fill(store, range(1, 2 * DEPTH))
+    at = store.mark()
+    assert store.intact(DEPTH, at) == DEPTH - 1
+    fill(store, [100])
+    assert store.intact(DEPTH, at) == DEPTH - 1
+    fill(store, [101])
+    assert store.intact(DEPTH, at) == DEPTH - 2
+
+def test_clear(store):
+    fill(store, range(1, 5))
+    at = store.mark()
+    store.clear()
+    assert len(store) == 0
+    assert store.window('a', 4).tolist() == []
+    assert store.latest('a') is None
+    # A window pinned before the clear still reads the old rows
+    assert store.window('a', 4, at=at).tolist()[-store.intact(4, at):] == [10.0, 20.0, 30.0, 40.0]
+
+    # The first row after a clear is not forward-filled
+    store.begin_row(10.0)
+    assert len(store) == 1
+    assert math.isnan(store.latest('a', default=math.nan))
+    assert store.epochs(4).tolist() == [10.0]
+
+def test_load_keeps_newest_depth_rows(store):
+    epochs = list(range(1, DEPTH + 5))
+    store.load(epochs, {'a': [e * 10.0 for e in epochs], 'unknown': epochs})
+    newest = epochs[-DEPTH:]
+    assert len(store) == DEPTH
+    assert store.epochs(DEPTH).tolist() == newest
+    assert store.window('a', DEPTH).tolist() == [e * 10.0 for e in newest]
+    assert all(math.isnan(v) for v in store.window('b', DEPTH))
+
+    # Rows appended after a load forward-fill from the last loaded row
+    store.begin_row(100.0)
+    assert store.window('a', 2).tolist() == [newest[-1] * 10.0] * 2
+    assert store.epochs(2).tolist() == [newest[-1], 100.0]
+
+def test_load_replaces_previous_rows(store):
+    fill(store, range(1, 6))
+    store.load([50.0, 51.0], {'b': [1.0, 2.0]})
+    assert len(store) == 2
+    assert store.epochs(DEPTH).tolist() == [50.0, 51.0]
+    assert store.window('b', DEPTH).tolist() == [1.0, 2.0]
+    assert all(math.isnan(v) for v in store.window('a', DEPTH))
+
+def test_depth_must_be_positive():
+    with pytest.raises(ValueError):
+        SensorStore(CODES, 0)
+
+PREDICTION_CODES = ('p1', 'p2')
+
+def send_set(predictions, epoch, values):
+    for code, value in zip(PREDICTION_CODES, values):
+        predictions.update(code, value, epoch)
+    predictions.seal()
+
+def test_prediction_ring_wraps_around():
+    predictions = PredictionStore(PREDICTION_CODES, history=3)
+    for i in range(5):
+        send_set(predictions, 100.0 + i, (float(i), -float(i)))
+    assert len(predictions) == 3
+    assert predictions.issued().tolist() == [102.0, 103.0, 104.0]
+    assert predictions.set_at(103.5) == {'p1': 3.0, 'p2': -3.0}
+    # Sets older than the ring are gone
+    assert predictions.set_at(101.0) is None
+
+def test_prediction_seal_without_update_is_a_no_op():
+    predictions = PredictionStore(PREDICTION_CODES, history=3)
+    send_set(predictions, 100.0, (1.0, 2.0))
+    predictions.seal()
+    assert len(predictions) == 1
+
+def test_prediction_clear():
+    predictions = PredictionStore(PREDICTION_CODES, history=3)
+    send_set(predictions, 100.0, (1.0, 2.0))
+    predictions.update('p1', 5.0, 101.0)
+    predictions.clear()
+    assert len(predictions) == 0
+    assert predictions.latest('p1') is None
+    assert predictions.set_at(200.0) is None
+    # The set being received was dropped too
+    predictions.seal()
+    assert len(predictions) == 0
+
+def test_prediction_load_round_trip_with_changed_codes():
+    source = PredictionStore(PREDICTION_CODES, history=4)
+    for i in range(6):
+        send_set(source, 100.0 + i, (float(i), 10.0 + i))
+
+    target = PredictionStore(('p2', 'p3'), history=2)
+    target.load(source.codes, *source.state())
+    # Keeps the newest `history` sets, maps codes by name and leaves new codes empty
+    assert target.issued().tolist() == [104.0, 105.0]
+    assert target.set_at(104.0) == {'p2': 14.0, 'p3': None}
+    assert target.latest('p2') == 15.0
+    assert target.latest('p3') is None
+
+    # The ring continues after the loaded sets
+    target.update('p2', 99.0, 106.0)
+    target.seal()
+    assert target.issued().tolist() == [105.0, 106.0]
+
+def test_prediction_latest_set_is_a_copy_with_nan_for_missing():
+    predictions = PredictionStore(PREDICTION_CODES, history=3)
+    latest = predictions.latest_set()
+    assert list(latest) == list(PREDICTION_CODES)
+    assert all(math.isnan(v) for v in latest.values())
+
+    predictions.update('p1', 1.5, 100.0)
+    latest = predictions.latest_set()
+    assert latest['p1'] == 1.5 and math.isnan(latest['p2'])
+    # Later updates don't change a set already handed out
+    predictions.update('p1', 2.5, 101.0)
+    assert latest['p1'] == 1.5
+    assert predictions.latest('p1') == 2.5
+
+def test_prediction_set_issued_at_first_value():
+    predictions = PredictionStore(PREDICTION_CODES, history=3)
+    predictions.update('p1', 1.0, 100.0)
+    predictions.update('p2', 2.0, 130.0)
+    predictions.seal()
+    assert predictions.issued().tolist() == [100.0]
+    assert predictions.set_at(99.0) is None
+    assert predictions.set_at(100.0) == {'p1': 1.0, 'p2': 2.0}
+
+def test_prediction_state_is_oldest_first_copies():
+    predictions = PredictionStore(PREDICTION_CODES, history=3)
+    for i in range(4):
+        send_set(predictions, 100.0 + i, (float(i), 10.0 + i))
+    latest, issued, sets = predictions.state()
+    assert latest.tolist() == [3.0, 13.0]
+    assert issued.tolist() == [101.0, 102.0, 103.0]
+    assert sets.tolist() == [[1.0, 11.0], [2.0, 12.0], [3.0, 13.0]]
+
+    latest[0] = issued[0] = sets[0, 0] = -1.0
+    assert predictions.latest('p1') == 3.0
+    assert predictions.issued().tolist()[0] == 101.0
+    assert predictions.set_at(101.0)['p1'] == 1.0
+
+def test_prediction_history_limit_keeps_memory_fixed():
+    predictions = PredictionStore(PREDICTION_CODES, history=5)
+    nbytes = predictions.nbytes
+    for i in range(50):
+        send_set(predictions, 100.0 + i, (float(i), float(i)))
+    assert len(predictions) == 5
+    assert predictions.nbytes == nbytes
+    assert predictions.issued().tolist() == [145.0, 146.0, 147.0, 148.0, 149.0]
+    with pytest.raises(ValueError):
+        PredictionStore(PREDICTION_CODES, history=0)
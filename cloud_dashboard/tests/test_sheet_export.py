@@ -0,0 +1,115 @@
+import time
+import pytest
+from gspread.utils import a1_to_rowcol
+from sheet_export import SheetExporter
+from sheet_mirror import SheetMirror
+
+HEADER = ['Time', 'Temp In', 'Humid In']
+
+class FakeWorksheet:
+    """Values API of a gspread worksheet over a list of string rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get(self, pad_values=False):
+        return [list(row) for row in self.rows] or [[]]
+
+    def batch_get(self, ranges):
+        result = []
+        for a1 in ranges:
+            if a1 == '1:1':
+                result.append([list(self.rows[0])])
+            else:
+                first, last = a1.split(':')
+                row, _ = a1_to_rowcol(first)
+                width = a1_to_rowcol(last + '1')[1]
+                result.append([list(r[:width]) for r in self.rows[row - 1:]])
+        return result
+
+class FakeClient:
+    authorizations = 1
+
+    def __init__(self, worksheet):
+        self._worksheet = worksheet
+
+    def worksheet(self):
+        return self._worksheet
+
+    def invalidate(self):
+        pass
+
+def sheet_rows(n, day=1):
+    return [[f'2026-10-{day:02d} 00:{i:02d}:00', str(20 + i), str(60 + i)] for i in range(n)]
+
+@pytest.fixture
+def sheet():
+    worksheet = FakeWorksheet([HEADER] + sheet_rows(5))
+    mirror = SheetMirror(FakeClient(worksheet), interval=0.05)
+    yield worksheet, mirror
+    mirror.stop()
+
+def download(mirror, exporter, fmt='csv', **kwargs):
+    # What /download does: first sync on demand, then the cached export
+    if not mirror.synced:
+        mirror.sync()
+    kind, result = exporter.export(fmt, **kwargs)
+    if kind == 'stream':
+        return ''.join(result)
+    with result:
+        return result.read().decode('utf-8')
+
+def wait_for_rows(mirror, count, timeout=5.0):
+    deadline = time.time() + timeout
+    while mirror.table()[0][1] < count and time.time() < deadline:
+        time.sleep(0.02)
+
+def test_row_appended_between_downloads_is_exported(sheet, tmp_path):
+    worksheet, mirror = sheet
+    exporter = SheetExporter(mirror, str(tmp_path))
+
+    first = download(mirror, exporter)
+    assert len(first.splitlines()) == 6
+
+    worksheet.rows.append(['2026-10-01 00:59:00', '99', '98'])
+    wait_for_rows(mirror, 6)  # the mirror thread picks the row up on its own
+    second = download(mirror, exporter)
+    assert second.splitlines()[-1] == '2026-10-01 00:59:00,99,98'
+    assert len(second.splitlines()) == 7
+
+def test_csv_streamed_in_chunks_and_cached(sheet, tmp_path):
+    _, mirror = sheet
+    mirror.sync()
+    exporter = SheetExporter(mirror, str(tmp_path), chunk_rows=2)
+
+    kind, chunks = exporter.export('csv', columns=['Temp In'])
+    assert kind == 'stream'
+    chunks = list(chunks)
+    assert len(chunks) == 3
+    assert ''.join(chunks).splitlines() == ['Time,Temp In'] + [
+        f'2026-10-01 00:{i:02d}:00,{20 + i}' for i in range(5)]
+
+    kind, cached = exporter.export('csv', columns=['Temp In'])
+    assert kind == 'file'
+    with cached:
+        assert cached.read().decode('utf-8') == ''.join(chunks)
+
+def test_csv_date_range(sheet, tmp_path):
+    worksheet, mirror = sheet
+    worksheet.rows.extend(sheet_rows(3, day=2))
+    exporter = SheetExporter(mirror, str(tmp_path))
+    text = download(mirror, exporter, start='2026-10-02', end='2026-10-03')
+    assert len(text.splitlines()) == 4
+    assert text.splitlines()[1].startswith('2026-10-02 00:00:00')
+
+def test_returned_file_survives_pruning(sheet, tmp_path):
+    _, mirror = sheet
+    mirror.sync()
+    exporter = SheetExporter(mirror, str(tmp_path), max_files=1)
+
+    kind, first = exporter.export('xlsx')
+    assert kind == 'file'
+    # Another export prunes the first file from the cache before it was sent
+    exporter.export('xlsx', columns=['Temp In'])[1].close()
+    with first:
+        assert first.read(2) == b'PK'
@@ -0,0 +1,125 @@
+import pytest
+from gspread.utils import a1_to_rowcol
+from sheet_mirror import SheetMirror
+
+HEADER = ['Time', 'Temp In', 'Humid In']
+
+class FakeWorksheet:
+    """Values API of a gspread worksheet over a list of string rows, recording the calls"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def get(self, pad_values=False):
+        self.calls.append('get')
+        return [list(row) for row in self.rows] or [[]]
+
+    def batch_get(self, ranges):
+        self.calls.append(tuple(ranges))
+        result = []
+        for a1 in ranges:
+            if a1 == '1:1':
+                result.append([list(self.rows[0])] if self.rows else [])
+            else:
+                first, last = a1.split(':')
+                row, _ = a1_to_rowcol(first)
+                width = a1_to_rowcol(last + '1')[1]
+                result.append([list(r[:width]) for r in self.rows[row - 1:]])
+        return result
+
+class FakeClient:
+    authorizations = 1
+
+    def __init__(self, worksheet):
+        self._worksheet = worksheet
+
+    def worksheet(self):
+        return self._worksheet
+
+    def invalidate(self):
+        pass
+
+def sheet_rows(first, last):
+    return [[f'2026-10-01 00:{i:02d}:00', str(20 + i), str(60 + i)] for i in range(first, last)]
+
+@pytest.fixture
+def sheet():
+    worksheet = FakeWorksheet([HEADER] + sheet_rows(0, 5))
+    mirror = SheetMirror(FakeClient(worksheet), interval=3600)
+    # No background syncer: the tests call sync() themselves
+    mirror.stop()
+    mirror.start()
+    mirror.sync()
+    worksheet.calls.clear()
+    return worksheet, mirror
+
+def temps(mirror):
+    return [record['Temp In'] for record in mirror.records()]
+
+def test_appended_rows_fetched_from_the_watermark(sheet):
+    worksheet, mirror = sheet
+    assert mirror.watermark == 6
+    worksheet.rows.extend(sheet_rows(5, 7))
+    mirror.sync()
+
+    # One batch_get: header plus the overlap row down, no full download
+    assert worksheet.calls == [('1:1', 'A6:C')]
+    assert temps(mirror) == [20, 21, 22, 23, 24, 25, 26]
+    assert mirror.watermark == 8
+    stats = mirror.stats()
+    assert (stats['full_syncs'], stats['rows_fetched']) == (1, 7)
+
+    # Nothing new: still incremental, nothing fetched
+    mirror.sync()
+    assert worksheet.calls[-1] == ('1:1', 'A8:C')
+    assert mirror.stats()['rows_fetched'] == 7
+
+def test_edited_overlap_row_forces_a_full_sync(sheet):
+    worksheet, mirror = sheet
+    generation = mirror.table()[0][0]
+    worksheet.rows[5][1] = '99'
+    worksheet.rows.extend(sheet_rows(5, 6))
+    mirror.sync()
+
+    assert worksheet.calls == [('1:1', 'A6:C'), 'get']
+    assert temps(mirror) == [20, 21, 22, 23, 99, 25]
+    assert mirror.stats()['full_syncs'] == 2
+    assert mirror.table()[0][0] == generation + 1
+
+def test_edit_above_the_overlap_waits_for_a_full_sync(sheet):
+    worksheet, mirror = sheet
+    worksheet.rows[1][1] = '99'
+    mirror.sync()
+    assert temps(mirror)[0] == 20
+    assert mirror.stats()['full_syncs'] == 1
+
+def test_shrunk_sheet_falls_back_to_a_full_sync(sheet):
+    worksheet, mirror = sheet
+    del worksheet.rows[3:]
+    mirror.sync()
+
+    assert worksheet.calls == [('1:1', 'A6:C'), 'get']
+    assert temps(mirror) == [20, 21]
+    assert mirror.watermark == 3
+
+def test_changed_header_falls_back_to_a_full_sync(sheet):
+    worksheet, mirror = sheet
+    worksheet.rows = [HEADER + ['CO2']] + [row + ['400'] for row in worksheet.rows[1:]]
+    mirror.sync()
+
+    assert worksheet.calls[-1] == 'get'
+    assert mirror.records()[-1]['CO2'] == 400
+
+def test_table_handed_out_is_not_modified_by_later_syncs(sheet):
+    worksheet, mirror = sheet
+    version, header, rows = mirror.table()
+    before = [list(row) for row in rows]
+
+    worksheet.rows.extend(sheet_rows(5, 8))
+    mirror.sync()
+    # A reader still iterating the old table sees exactly its version
+    assert version == (1, 5) and rows == before
+    new_version, _, new_rows = mirror.table()
+    assert new_version == (1, 8) and new_rows is not rows
+    assert new_rows[:5] == before
@@ -0,0 +1,68 @@
+import logging
+from ingest import IngestStores
+from sensor_registry import STORE_CODES, PREDICTION_CODES, CYCLE_GROUPS
+from sensor_store import SensorStore, PredictionStore
+from sites import SiteShard, SiteShards, dispatch_site_message
+from snapshot import SnapshotPublisher
+
+def new_stores(name):
+    return object()
+
+def new_site_stores(name):
+    sensors = SensorStore(STORE_CODES, depth=4)
+    predictions = PredictionStore(PREDICTION_CODES, history=1)
+    return IngestStores(sensors, {}, predictions, SnapshotPublisher(sensors, {}, predictions, CYCLE_GROUPS))
+
+def test_went_stale_once_per_outage():
+    shard = SiteShard('gh1', new_stores('gh1'))
+    # Never heard from: stale, but nothing to reset
+    assert shard.is_stale(60, now=1000.0)
+    assert not shard.went_stale(60, now=1000.0)
+
+    shard.last_seen = 1000.0
+    assert not shard.went_stale(60, now=1030.0)
+    assert shard.went_stale(60, now=1100.0)
+    assert not shard.went_stale(60, now=1130.0)
+
+    # A new message ends the outage, the next one resets again
+    shard.last_seen, shard.reset = 1200.0, False
+    assert not shard.went_stale(60, now=1230.0)
+    assert shard.went_stale(60, now=1300.0)
+
+def test_only_allowed_sites_get_a_shard(capsys, caplog):
+    shards = SiteShards(new_stores, 'mcs/', 'default', sites=('gh2',), allowed=('gh1',))
+    assert shards.names() == ['default', 'gh2']
+    assert shards.get('gh1') is not None
+
+    assert dispatch_site_message(shards, 'mcs/typo/kodeData0211', b'25.0') is None
+    assert dispatch_site_message(shards, 'mcs/typo/kodeData0212', b'60.0') is None
+    assert shards.get('typo', create=False) is None
+    assert shards.rejected == 2
+    assert [r.getMessage() for r in caplog.records if r.name == 'sites'].count(
+        "Ignoring messages of site 'typo': not listed in sensors.json") == 1
+    assert capsys.readouterr().out == ""
+
+def test_any_site_without_allowed_list():
+    shards = SiteShards(new_stores, 'mcs/', 'default')
+    assert shards.allowed is None
+    assert shards.get('gh9') is not None
+    assert shards.names() == ['default', 'gh9']
+
+def test_unregistered_code_or_bad_name_creates_no_shard(caplog):
+    shards = SiteShards(new_site_stores, 'mcs/', 'default', max_sites=3)
+    # Anything may arrive on the mcs/# subscription
+    assert dispatch_site_message(shards, 'mcs/gh1/notASensor', b'1') is None
+    assert dispatch_site_message(shards, 'mcs/a b/kodeData0211', b'25.0') is None
+    assert dispatch_site_message(shards, 'mcs/x/y/kodeData0211', b'25.0') is None
+    assert dispatch_site_message(shards, 'mcs/' + 'g' * 65 + '/kodeData0211', b'25.0') is None
+    assert shards.names() == ['default']
+    assert shards.rejected == 4
+
+    with caplog.at_level(logging.INFO, logger='sites'):
+        assert dispatch_site_message(shards, 'mcs/gh1/kodeData0211', b'25.0') is not None
+    assert shards.names() == ['default', 'gh1']
+    assert "Added site gh1 (2/3)" in [r.getMessage() for r in caplog.records]
+
+    # Once the site exists, a bad code is counted on the site itself
+    assert dispatch_site_message(shards, 'mcs/gh1/notASensor', b'1') is None
+    assert shards.get('gh1').ignored == 1 and shards.rejected == 4
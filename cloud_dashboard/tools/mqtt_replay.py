@@ -0,0 +1,251 @@
+'''
+ Nama File      : mqtt_replay.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Merekam stream MQTT dari broker ke file capture (lihat mqtt_capture.py)
+    2. Memutar ulang file capture dengan kecepatan 1x, 10x, atau maksimum ke:
+       - ingest : penyimpanan in-process (tanpa Dash), mengukur throughput dan latensi
+       - app    : on_message milik app.py, lalu mengukur waktu callback Dash
+                  (tanpa koneksi MQTT; database riwayat, arsip, dan warm start
+                  ditulis ke folder sementara, bukan milik dashboard)
+       - broker : publish ulang ke broker lokal
+    3. Jalankan dari folder dashboard, contoh:
+       python -m tools.mqtt_replay record capture.bin.gz --host localhost
+       python -m tools.mqtt_replay replay capture.bin.gz --speed 10
+       python -m tools.mqtt_replay replay capture.bin.gz --speed 0 --target app --callbacks 20
+'''
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import paho.mqtt.client as mqtt
+from mqtt_capture import CaptureWriter, read_capture
+from sensor_registry import SUBSCRIPTION_TOPIC, TOPIC_PREFIX
+from sites import SiteShards, dispatch_site_message
+from tools.bench_on_message import FakeMessage, new_stores
+
+def record(args):
+    """Subscribe to the MCS topics and write every message to the capture file"""
+    writer = CaptureWriter(args.file)
+
+    def on_connect(client, userdata, flags, rc):
+        print(f"Connected (rc={rc}), recording {SUBSCRIPTION_TOPIC} to {args.file}")
+        client.subscribe(SUBSCRIPTION_TOPIC, 0)
+
+    def on_message(client, userdata, msg):
+        writer.write(msg.topic, msg.payload, time.time())
+
+    client = mqtt.Client()
+    if args.username:
+        client.username_pw_set(args.username, args.password)
+    if args.tls:
+        client.tls_set()
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(args.host, args.port, 60)
+    client.loop_start()
+    try:
+        deadline = time.monotonic() + args.duration if args.duration else None
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.loop_stop()
+        writer.close()
+    print(f"Recorded {writer.records} messages")
+
+def paced(records, speed):
+    """
+    Yield (topic, payload, lag) following the capture's timing divided by
+    `speed` (0 = as fast as possible); lag is how late the record is sent.
+    """
+    start = None
+    for recv_ts, topic, payload in records:
+        if speed <= 0:
+            yield topic, payload, 0.0
+            continue
+        if start is None:
+            start = (recv_ts, time.perf_counter())
+        due = start[1] + (recv_ts - start[0]) / speed
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield topic, payload, max(0.0, time.perf_counter() - due)
+
+def report(name, latencies, lags, elapsed):
+    """Print throughput and latency percentiles (microseconds)"""
+    count = len(latencies)
+    print(f"{name}: {count} messages in {elapsed:.2f}s ({count / elapsed:,.0f} msg/s)")
+    if count:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1e6
+        print(f"  latency us: p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f}  max {max(latencies) * 1e6:.1f}")
+        print(f"  max schedule lag: {max(lags) * 1e3:.1f} ms")
+
+def replay_ingest(records, args):
+    """Feed the capture into fresh in-process stores, timing every dispatch"""
+    shards = SiteShards(new_stores, TOPIC_PREFIX, 'default')
+    latencies, lags = [], []
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        start = time.perf_counter()
+        for topic, payload, lag in paced(records, args.speed):
+            t0 = time.perf_counter()
+            dispatch_site_message(shards, topic, payload)
+            latencies.append(time.perf_counter() - t0)
+            lags.append(lag)
+            if sink.tell() > 1 << 20:
+                sink.seek(0)
+                sink.truncate()
+        elapsed = time.perf_counter() - start
+    report("ingest", latencies, lags, elapsed)
+    for shard in shards:
+        print(f"  site {shard.name}: {shard.messages} applied, {shard.ignored} ignored, "
+              f"{len(shard.stores.sensors)} rows, snapshot v{shard.snapshots.version}")
+
+def time_callbacks(app, repeat):
+    """Mean wall time of every snapshot render callback of app.py"""
+    version = {'site': app.MCS_DEFAULT_SITE, 'version': app.site_shards.snapshot(None).version}
+    for name in sorted(dir(app)):
+        if not name.startswith('update_') or 'historical' in name:
+            continue
+        callback = getattr(app, name)
+        callback = getattr(callback, '__wrapped__', callback)
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    callback(version)
+                mean_ms = (time.perf_counter() - start) / repeat * 1e3
+            except Exception as e:
+                mean_ms = None
+                error = e
+        if mean_ms is None:
+            print(f"  {name}: failed ({error})")
+        else:
+            print(f"  {name}: {mean_ms:.2f} ms")
+
+def replay_app(records, args):
+    """Feed the capture through app.py's on_message, then time the Dash callbacks"""
+    # Importing app.py starts the whole dashboard: keep it off the broker and
+    # away from the real history database, archive, warm start and capture
+    scratch = tempfile.mkdtemp(prefix='mcs_replay_')
+    os.environ.update({
+        'MQTT_CONNECT': '0',
+        'MQTT_CAPTURE_FILE': '',
+        'HISTORY_DB_FILE': os.path.join(scratch, 'history.db'),
+        'HISTORY_ARCHIVE_DIR': os.path.join(scratch, 'archive'),
+        'WARM_START_DIR': os.path.join(scratch, 'warm_start'),
+    })
+    os.environ.setdefault('MQTT_PORT', '1883')  # parsed at import by the cloud app
+    print(f"Replaying into app.py without MQTT, history and warm start in {scratch}")
+    sys.path.insert(0, os.getcwd())
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+
+    latencies, lags = [], []
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        start = time.perf_counter()
+        for topic, payload, lag in paced(records, args.speed):
+            t0 = time.perf_counter()
+            app.on_message(None, None, FakeMessage(topic, payload))
+            latencies.append(time.perf_counter() - t0)
+            lags.append(lag)
+        # Wait for the processor thread to apply everything (queue mode)
+        pipeline = app.ingest_pipeline
+        while app.MQTT_INGEST_MODE == 'queue' and pipeline.processed < pipeline.received:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+    report(f"app on_message ({app.MQTT_INGEST_MODE})", latencies, lags, elapsed)
+    print(f"  pipeline: {pipeline.stats()}")
+    if args.callbacks:
+        print(f"Dash render callbacks, mean of {args.callbacks}:")
+        time_callbacks(app, args.callbacks)
+
+def replay_broker(records, args):
+    """Republish the capture to a (local) broker"""
+    client = mqtt.Client()
+    if args.username:
+        client.username_pw_set(args.username, args.password)
+    client.connect(args.host, args.port, 60)
+    client.loop_start()
+    latencies, lags = [], []
+    start = time.perf_counter()
+    try:
+        for topic, payload, lag in paced(records, args.speed):
+            t0 = time.perf_counter()
+            client.publish(topic, payload, qos=0).wait_for_publish()
+            latencies.append(time.perf_counter() - t0)
+            lags.append(lag)
+    finally:
+        client.loop_stop()
+        client.disconnect()
+    report(f"broker {args.host}:{args.port}", latencies, lags, time.perf_counter() - start)
+
+def replay(args):
+    capture = list(read_capture(args.file))
+    if not capture:
+        print("Capture is empty")
+        return
+    # Shift each loop to start after the previous one so pacing stays monotonic
+    span = capture[-1][0] - capture[0][0] + 1.0
+    records = [(ts + span * loop, topic, payload)
+               for loop in range(args.loops) for ts, topic, payload in capture]
+    {'ingest': replay_ingest, 'app': replay_app, 'broker': replay_broker}[args.target](records, args)
+
+def info(args):
+    count, size, topics, first, last = 0, 0, set(), None, None
+    for recv_ts, topic, payload in read_capture(args.file):
+        count += 1
+        size += len(payload)
+        topics.add(topic)
+        first = recv_ts if first is None else first
+        last = recv_ts
+    if not count:
+        print("Capture is empty")
+        return
+    span = last - first
+    print(f"{count} messages, {len(topics)} topics, {size} payload bytes, {span:.1f}s "
+          f"({count / span if span else 0:.1f} msg/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay the MCS MQTT stream")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help="record a broker's MCS topics to a capture file")
+    rec.add_argument('file')
+    rec.add_argument('--duration', type=float, default=0, help="seconds to record (0 = until Ctrl-C)")
+
+    rep = sub.add_parser('replay', help="replay a capture file")
+    rep.add_argument('file')
+    rep.add_argument('--speed', type=float, default=1.0, help="1 = real time, 10 = 10x, 0 = max speed")
+    rep.add_argument('--target', choices=('ingest', 'app', 'broker'), default='ingest',
+                     help="ingest = in-process stores; app = app.py's on_message (no MQTT "
+                          "connection, history and warm start in a temporary directory); "
+                          "broker = republish to --host")
+    rep.add_argument('--loops', type=int, default=1, help="replay the capture N times back to back")
+    rep.add_argument('--callbacks', type=int, default=0,
+                     help="with --target app: time each render callback N times after the replay")
+
+    for p in (rec, rep):
+        p.add_argument('--host', default='localhost')
+        p.add_argument('--port', type=int, default=1883)
+        p.add_argument('--username')
+        p.add_argument('--password')
+    rec.add_argument('--tls', action='store_true')
+
+    inf = sub.add_parser('info', help="summarise a capture file")
+    inf.add_argument('file')
+
+    args = parser.parse_args()
+    {'record': record, 'replay': replay, 'info': info}[args.command](args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+'''
+ Nama File      : warm_start.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Menyimpan state in-memory setiap site (baris sensor, alarm, prediksi)
+       ke disk secara berkala dan saat proses berhenti
+    2. Saat start, state dimuat kembali sehingga halaman langsung menampilkan
+       tren dan nilai terakhir tanpa menunggu siklus MQTT baru
+    3. Satu file .npz per site (tanpa pickle), ditulis ke file sementara lalu
+       di-rename agar file lama tidak pernah rusak setengah tertulis
+'''
+
+import json
+import os
+import time
+from urllib.parse import quote, unquote
+import numpy as np
+
+STATE_SUFFIX = '.npz'
+
+def state_path(directory, site):
+    # Site names come from MQTT topics: quote them so they can't escape the directory
+    return os.path.join(directory, quote(site, safe='') + STATE_SUFFIX)
+
+def save_site(directory, shard):
+    """Write the published state of one site, consistent as of its current snapshot"""
+    snap = shard.snapshots.current()
+    stores = shard.stores
+    sensors = stores.sensors
+    # The snapshot pins at most depth - 1 rows, so the cycle being received
+    # (which reuses the oldest slot of a full ring) is never part of them.
+    # Rows overwritten while saving are dropped, keep every array aligned.
+    epochs = snap.epochs(len(snap))
+    values = [snap.window(code, len(snap)) for code in sensors.codes]
+    rows = min([len(epochs)] + [len(column) for column in values])
+    latest, issued, sets = stores.predictions.state()
+
+    path = state_path(directory, shard.name)
+    with open(path + '.tmp', 'wb') as f:
+        np.savez(
+            f,
+            saved=np.float64(time.time()),
+            last_message=np.float64(np.nan if shard.last_message is None else shard.last_message),
+            sensor_codes=np.array(sensors.codes),
+            sensor_epochs=np.array(epochs[len(epochs) - rows:]),
+            sensor_values=np.array([column[len(column) - rows:] for column in values])
+                          .reshape(len(sensors.codes), rows),
+            prediction_codes=np.array(stores.predictions.codes),
+            prediction_latest=latest,
+            prediction_issued=issued,
+            prediction_sets=sets,
+            alarm_data=np.array(json.dumps(dict(snap.alarms))),
+        )
+    os.replace(path + '.tmp', path)
+
+def save_all(directory, shards):
+    """Save every site, returns the number of sites written"""
+    os.makedirs(directory, exist_ok=True)
+    saved = 0
+    for shard in shards:
+        try:
+            save_site(directory, shard)
+            saved += 1
+        except (OSError, ValueError) as e:
+            print(f"Error saving warm start state of site {shard.name}: {e}")
+    return saved
+
+def read_state(path):
+    """Arrays of one saved site as a dict"""
+    with np.load(path, allow_pickle=False) as state:
+        return dict(state)
+
+def load_site(state, shard):
+    """Load a read_state() dict into `shard` and publish it"""
+    stores = shard.stores
+    codes = [str(code) for code in state['sensor_codes']]
+    stores.sensors.load(state['sensor_epochs'], dict(zip(codes, state['sensor_values'])))
+    stores.predictions.load([str(code) for code in state['prediction_codes']],
+                            state['prediction_latest'], state['prediction_issued'],
+                            state['prediction_sets'])
+    stores.alarm_data.update(json.loads(str(state['alarm_data'])))
+
+    shard.last_message = float(state['last_message'])
+    # Give the site a full connection timeout to resume before it is reset
+    shard.last_seen = time.monotonic()
+    # The newest row was recorded before shutdown, don't record it again on the next cycle
+    if stores.history is not None and len(stores.sensors):
+        stores.history.last_epoch = float(stores.sensors.epochs(1)[-1])
+    stores.snapshots.publish()
+
+def restore_all(directory, shards, max_age):
+    """
+    Load every saved site not older than `max_age` seconds (by its last
+    message), returns the names of the restored sites.
+    """
+    if not os.path.isdir(directory):
+        return []
+    restored = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(STATE_SUFFIX):
+            continue
+        try:
+            state = read_state(os.path.join(directory, name))
+            last_message = float(state['last_message'])
+            if np.isnan(last_message) or time.time() - last_message > max_age:
+                continue
+            shard = shards.get(unquote(name[:-len(STATE_SUFFIX)]))
+            if shard is not None:
+                load_site(state, shard)
+                restored.append(shard.name)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading warm start state {name}: {e}")
+    return restored
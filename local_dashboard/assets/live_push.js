@@ -0,0 +1,50 @@
+/*
+ Nama File      : live_push.js
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Berlangganan ke /live (Server-Sent Events) untuk site yang dipilih
+    2. Setiap event siklus menaikkan dcc.Store versi halaman, sehingga callback
+       render jalan sekali per siklus MQTT, bukan setiap tick interval
+    3. Selama stream terbuka dcc.Interval halaman diperlambat; jika stream
+       gagal, interval kembali ke periode semula (polling seperti biasa)
+*/
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    live: {
+        // Clientside callback: (site, intervalId, versionId, interval, slowInterval) -> page interval
+        subscribe: function (site, intervalId, versionId, interval, slowInterval) {
+            var live = window.dash_clientside.live;
+            var setProps = window.dash_clientside.set_props;
+            if (!window.EventSource || !setProps) {
+                return window.dash_clientside.no_update;
+            }
+            // Remember the page's own polling period to fall back to
+            live.periods = live.periods || {};
+            if (!(intervalId in live.periods)) {
+                live.periods[intervalId] = interval;
+            }
+            var pollInterval = live.periods[intervalId];
+
+            if (live.source) {
+                live.source.close();
+            }
+            var url = window.location.origin + '/live' + (site ? '?site=' + encodeURIComponent(site) : '');
+            var source = new EventSource(url);
+            live.source = source;
+
+            source.onopen = function () {
+                setProps(intervalId, {interval: slowInterval});
+            };
+            source.addEventListener('cycle', function (event) {
+                var data = JSON.parse(event.data);
+                setProps(versionId, {data: {site: data.site, version: data.version}});
+            });
+            source.onerror = function () {
+                // Refused (too many clients) or server gone: poll again
+                setProps(intervalId, {interval: pollInterval});
+            };
+            return window.dash_clientside.no_update;
+        }
+    }
+});
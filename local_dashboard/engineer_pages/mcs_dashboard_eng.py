@@ -23,6 +23,8 @@ engineer_dashboard_layout = html.Div([
         html.Div(html.Img(src="/static/img/polindra.png", className="navbar-logo")),
         html.Div(html.Img(src="/static/img/polban.png", className="navbar-logo")),
         html.Div("MICROCLIMATE SYSTEM DASHBOARD", className="navbar-title"),
+        dcc.Dropdown(id='site-selector', placeholder="Site", clearable=False,
+                     persistence=True, persistence_type='session', className="site-selector"),
         dcc.Link(html.Img(src="/static/icon/gps.svg", className="gps-icon me-2"), href="/dash/engineer/gps"),
         dcc.Link(html.Img(src="/static/icon/notification.svg", className="notification-icon"), href="/dash/engineer/alarm"),
     ], className="d-flex justify-content-between align-items-center p-3 border-bottom navbar-full"),
@@ -161,5 +163,7 @@ engineer_dashboard_layout = html.Div([
         ], className="container text-center")
     ], className="footer-section"),
 
-    dcc.Interval(id='interval_mcs', interval=1200, n_intervals=0)
+    dcc.Interval(id='interval_mcs', interval=1200, n_intervals=0),
+    # Snapshot version this page last rendered, bumped by the interval gate
+    dcc.Store(id='version_mcs')
 ])
\ No newline at end of file
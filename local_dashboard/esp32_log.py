@@ -0,0 +1,361 @@
+'''
+ Nama File      : esp32_log.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Cache bersama untuk log.csv dari ESP32 Datalogger
+    2. Semua callback tabel historis dan semua browser memakai satu DataFrame
+       yang sama, ESP32 hanya dihubungi paling banyak sekali per TTL
+    3. Single-flight: jika cache kedaluwarsa hanya satu thread yang mengambil
+       data baru, thread lain langsung memakai data terakhir
+    4. Mode inkremental: hanya byte baru di akhir log yang diminta (HTTP Range)
+       dan di-parse, lalu ditambahkan ke buffer lokal berukuran terbatas
+    5. Koneksi HTTP keep-alive (Session) dengan timeout connect pendek dan
+       circuit breaker: setelah beberapa kegagalan ESP32 tidak dihubungi
+       selama masa cool-down dan data terakhir langsung dipakai (ditandai stale)
+    6. Parsing bertipe: skema kolom log.csv tetap (float64, Waktu dengan format
+       yang diketahui), di-parse sekali dan disimpan terurut menurut waktu
+       sehingga setiap tabel cukup mengambil N baris terakhir
+'''
+
+from collections import deque
+import io
+import threading
+import time
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+# Schema of log.csv written by the ESP32 Datalogger
+LOG_TIME_COLUMN = 'Waktu'
+LOG_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+LOG_VALUE_COLUMNS = ('Suhu Indoor', 'Kelembaban Indoor', 'Suhu Outdoor', 'Kelembaban Outdoor',
+                     'CO2', 'Kecepatan Angin', 'Curah Hujan', 'PAR', 'V AC', 'I AC', 'P AC')
+LOG_DTYPES = dict.fromkeys(LOG_VALUE_COLUMNS, 'float64')
+
+def parse_log(data, sep=';', engine='c'):
+    """
+    CSV bytes (header included) to a DataFrame with float64 sensor columns
+    and a datetime64 'Waktu', sorted oldest first (unparseable times first).
+    `engine` is a pandas read_csv engine, 'pyarrow' needs pyarrow installed.
+    """
+    try:
+        frame = pd.read_csv(io.BytesIO(data), sep=sep, dtype=LOG_DTYPES, engine=engine)
+    except ValueError:
+        # A non-numeric reading somewhere (sensor error text): infer, then coerce to NaN
+        frame = pd.read_csv(io.BytesIO(data), sep=sep, engine=engine)
+        for column in LOG_VALUE_COLUMNS:
+            if column in frame:
+                frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('float64')
+    if LOG_TIME_COLUMN not in frame:
+        return frame
+
+    times = frame[LOG_TIME_COLUMN]
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        parsed = pd.to_datetime(times, format=LOG_TIME_FORMAT, errors='coerce')
+        if parsed.isna().all() and times.notna().any():
+            # Logger configured with another time format
+            parsed = pd.to_datetime(times, format='mixed', errors='coerce')
+        times = parsed
+    frame[LOG_TIME_COLUMN] = times.astype('datetime64[ns]')
+    return sort_log(frame)
+
+def sort_log(frame):
+    """`frame` ordered by time, only sorted when it isn't already"""
+    if frame[LOG_TIME_COLUMN].is_monotonic_increasing:
+        return frame
+    return frame.sort_values(LOG_TIME_COLUMN, kind='stable', na_position='first', ignore_index=True)
+
+def newest_records(frame, columns, limit, time_format=LOG_TIME_FORMAT):
+    """
+    Newest `limit` rows of a parse_log() frame as DataTable rows (newest on
+    top): {'time': ..., id: value} with `columns` mapping log column -> id.
+    """
+    rows = frame.iloc[-limit:][::-1]
+    records = {'time': rows[LOG_TIME_COLUMN].dt.strftime(time_format).tolist()}
+    for column, column_id in columns.items():
+        records[column_id] = rows[column].tolist()
+    return [dict(zip(records, values)) for values in zip(*records.values())]
+
+def new_session(pool_size=2):
+    """Keep-alive session for the datalogger, failures are not retried (the breaker decides)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+class CircuitBreaker:
+    """
+    Opens after `failures` consecutive errors; while open allow() is False
+    for `cooldown` seconds, then a single trial call is let through
+    (half-open) and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failures=3, cooldown=60.0):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.consecutive = 0
+        self.opened = None  # time.monotonic() when the breaker opened
+        self.trips = 0
+
+    @property
+    def state(self):
+        if self.opened is None:
+            return 'closed'
+        return 'open' if time.monotonic() - self.opened < self.cooldown else 'half-open'
+
+    def allow(self):
+        return self.state != 'open'
+
+    def success(self):
+        self.consecutive = 0
+        self.opened = None
+
+    def failure(self):
+        self.consecutive += 1
+        if self.opened is not None or self.consecutive >= self.failures:
+            if self.opened is None:
+                self.trips += 1
+            self.opened = time.monotonic()
+
+    def stats(self):
+        return {'state': self.state, 'consecutive_failures': self.consecutive, 'trips': self.trips}
+
+class SharedFetchCache:
+    """
+    TTL cache around a slow `fetch()` returning a DataFrame.
+
+    get() returns the cached frame while it is younger than `ttl` seconds.
+    When it expires, the first caller refreshes it; concurrent callers don't
+    queue behind the download but get the previous frame right away (they
+    only wait when there is nothing cached yet). The shared frame must be
+    treated as read-only by callers.
+
+    When `fetch` raises one of `errors`, or the optional circuit `breaker`
+    is open, the last good frame is served again with attrs['stale_since']
+    set to the time.time() of the first failure (an empty frame if there
+    never was one). Failed refreshes are cached for `ttl` too, so a dead
+    logger is not hammered either.
+    """
+
+    def __init__(self, fetch, ttl=30.0, breaker=None, errors=(requests.RequestException, ValueError)):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.breaker = breaker
+        self.errors = errors
+        self._refresh_lock = threading.Lock()
+        self._frame = None
+        self._fetched = None  # time.monotonic() of the last refresh
+        self.fetches = 0
+        self.hits = 0
+        self.failures = 0
+        self.skipped = 0      # refreshes not attempted because the breaker was open
+
+    def _fresh(self):
+        return self._fetched is not None and time.monotonic() - self._fetched < self.ttl
+
+    def get(self):
+        if self._fresh():
+            self.hits += 1
+            return self._frame
+        if not self._refresh_lock.acquire(blocking=self._frame is None):
+            # Another thread is already downloading, serve the previous frame
+            self.hits += 1
+            return self._frame
+        try:
+            if not self._fresh():
+                self._refresh()
+            return self._frame
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self):
+        self._fetched = time.monotonic()
+        if self.breaker is not None and not self.breaker.allow():
+            self.skipped += 1
+            self._mark_stale()
+            return
+        try:
+            frame = self._fetch()
+        except self.errors as e:
+            self.failures += 1
+            if self.breaker is not None:
+                self.breaker.failure()
+            print(f"Error fetching the ESP32 log: {e}")
+            self._mark_stale()
+            return
+        if self.breaker is not None:
+            self.breaker.success()
+        self._frame = frame if frame is not None else pd.DataFrame()
+        self.fetches += 1
+
+    def _mark_stale(self):
+        if self._frame is None:
+            self._frame = pd.DataFrame()
+        if 'stale_since' not in self._frame.attrs:
+            # Shallow copy: frames already handed out keep their own attrs
+            self._frame = self._frame.copy(deep=False)
+            self._frame.attrs['stale_since'] = time.time()
+
+    @property
+    def stale(self):
+        return self._frame is not None and 'stale_since' in self._frame.attrs
+
+    def stats(self):
+        age = None if self._fetched is None else round(time.monotonic() - self._fetched, 1)
+        stats = {'ttl': self.ttl, 'fetches': self.fetches, 'hits': self.hits, 'age': age,
+                 'failures': self.failures, 'skipped': self.skipped, 'stale': self.stale,
+                 'rows': 0 if self._frame is None else len(self._frame)}
+        if self.breaker is not None:
+            stats['breaker'] = self.breaker.stats()
+        return stats
+
+class EspLogTail:
+    """
+    Incremental reader of the append-only ESP32 log.
+
+    Each poll() asks only for the bytes after the last offset with an HTTP
+    Range header and parses only the complete new lines. The bytes count as
+    consumed only once they parsed: a chunk parse_log() rejects raises, and
+    the next poll asks for the same bytes again. A device that ignores Range
+    (200 with the whole file) still works, the already-seen prefix is just
+    skipped instead of parsed. The request starts OVERLAP bytes early and
+    those must match the last bytes consumed; if they don't, or the file is
+    shorter than the offset, the log was rotated or rewritten and the buffer
+    is rebuilt from scratch.
+
+    Parsed chunks are kept in a deque holding the newest `max_rows` rows, so
+    a poll never copies the whole buffer: poll() returns the newest
+    `view_rows` rows (concatenating only the chunks they span) and `frame`
+    is built from every chunk on first use after a change.
+
+    Not thread-safe: call it through SharedFetchCache, which only lets one
+    thread refresh at a time.
+    """
+
+    OVERLAP = 64
+
+    def __init__(self, url, sep=';', max_rows=20000, timeout=5, get=requests.get, engine='c', view_rows=None):
+        self.url = url
+        self.sep = sep
+        self.engine = engine
+        self.max_rows = max_rows
+        self.view_rows = view_rows
+        self.timeout = timeout
+        self._get = get
+        self.reset()
+        self.polls = 0
+        self.resets = 0
+        self.bytes_received = 0
+
+    def reset(self):
+        self.offset = 0          # bytes of the log consumed so far (including `_partial`)
+        self._header = None      # header line, prepended to every parsed chunk
+        self._partial = b''      # trailing bytes of an unfinished line
+        self._last = b''         # last OVERLAP bytes consumed, checked against the log on each poll
+        self._chunks = deque()   # parsed chunks, oldest first
+        self._rows = 0           # rows in `_chunks`
+        self._views = {}         # newest(n) results until the next change
+
+    def poll(self):
+        """
+        Fetch and parse whatever was appended since the last poll, returns
+        newest(view_rows)
+        """
+        self.polls += 1
+        overlap = len(self._last)
+        headers = {'Range': f'bytes={self.offset - overlap}-'} if self.offset else {}
+        response = self._get(self.url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 416:
+            # Even the bytes we consumed last are gone: the log shrank
+            self._restart()
+            return self.newest(self.view_rows)
+        if response.status_code == 206:
+            body = response.content
+            if body[:overlap] != self._last:
+                self._restart()
+            else:
+                self._append(body[overlap:])
+            return self.newest(self.view_rows)
+        if response.status_code != 200:
+            raise requests.HTTPError(f"status {response.status_code}", response=response)
+
+        # Whole file: skip the part we already have, or start over if it changed
+        body = response.content
+        if body[self.offset - len(self._last):self.offset] != self._last:
+            self.resets += 1
+            self.reset()
+        self._append(body[self.offset:])
+        return self.newest(self.view_rows)
+
+    def _restart(self):
+        self.resets += 1
+        self.reset()
+        self.poll()
+
+    def _append(self, data):
+        self.bytes_received += len(data)
+        header = self._header
+        complete, newline, partial = (self._partial + data).rpartition(b'\n')
+        if newline:
+            lines = complete + newline
+            if header is None:
+                header, _, lines = lines.partition(b'\n')
+                header += b'\n'
+            if lines.strip():
+                # Raises before anything is consumed, so these bytes are asked for again
+                self._add(parse_log(header + lines, self.sep, self.engine))
+        self._header = header
+        self._partial = partial
+        self.offset += len(data)
+        self._last = (self._last + data)[-self.OVERLAP:]
+
+    def _add(self, chunk):
+        """Append a parsed chunk, dropping the oldest chunks beyond max_rows"""
+        chunks = self._chunks
+        if chunks and LOG_TIME_COLUMN in chunk and len(chunk):
+            times = chunk[LOG_TIME_COLUMN]
+            if times.isna().any() or times.iloc[0] < chunks[-1][LOG_TIME_COLUMN].iloc[-1]:
+                # Out of order (logger clock set back): merge into one sorted chunk, rare
+                chunk = sort_log(pd.concat([*chunks, chunk], ignore_index=True))
+                chunks.clear()
+                self._rows = 0
+        if len(chunk) > self.max_rows:
+            chunk = chunk.iloc[-self.max_rows:].reset_index(drop=True)
+        chunks.append(chunk)
+        self._rows += len(chunk)
+        while self._rows - len(chunks[0]) >= self.max_rows:
+            self._rows -= len(chunks.popleft())
+        self._views = {}
+
+    def newest(self, n=None):
+        """The newest `n` buffered rows (all when None) as one frame, oldest first"""
+        n = self.max_rows if n is None else min(n, self.max_rows)
+        view = self._views.get(n)
+        if view is not None:
+            return view
+        picked, rows = [], 0
+        for chunk in reversed(self._chunks):
+            if rows >= n:
+                break
+            picked.append(chunk)
+            rows += len(chunk)
+        if not picked:
+            view = pd.DataFrame()
+        else:
+            view = picked[0] if len(picked) == 1 else pd.concat(picked[::-1], ignore_index=True)
+            if len(view) > n:
+                view = view.iloc[-n:].reset_index(drop=True)
+        self._views[n] = view
+        return view
+
+    @property
+    def frame(self):
+        """Every buffered row (at most max_rows), oldest first"""
+        return self.newest()
+
+    def stats(self):
+        return {'offset': self.offset, 'rows': min(self._rows, self.max_rows), 'polls': self.polls,
+                'resets': self.resets, 'bytes_received': self.bytes_received}
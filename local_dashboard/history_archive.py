@@ -0,0 +1,163 @@
+'''
+ Nama File      : history_archive.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Arsip jangka panjang: setiap hari data siklus satu site disegel menjadi
+       satu file Parquet kolumnar (kolom ts plus satu kolom per kode kodeData)
+    2. Compactor (thread background di app.py) hanya menyegel hari yang sudah
+       lewat menurut waktu Asia/Jakarta dan belum ada di arsip
+    3. Pembaca me-memory-map partisi hari yang dibutuhkan dan hanya membaca
+       kolom yang diminta, bisa per hari (stream) atau sekaligus
+    4. cycles() menggabungkan arsip (hari yang sudah dihapus retensi dari
+       database) dengan database SQLite untuk route /history/cycles
+    5. cycle_frames() membaca rentang yang sama per hari / per potongan
+       (DataFrame), untuk ekspor yang di-stream seperti /download
+    6. pyarrow opsional: tanpa pyarrow arsip dinonaktifkan, dashboard tetap jalan
+'''
+
+import math
+import os
+from urllib.parse import quote
+import pandas as pd
+from history_store import bucket_start
+from sensor_store import local_datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # the archive is optional, SQLite history works without it
+    pa = pq = None
+
+DAY_SECONDS = 86400
+
+def history_split(history, site, start, end):
+    """
+    Where [start, end) switches from the archive to the history database:
+    the oldest cycle of `site` still in the database (clamped to the range)
+    """
+    first = history.first_epoch(site)
+    return end if first is None else min(max(first, start), end)
+
+class HistoryArchive:
+    """
+    Day-partitioned Parquet files: <directory>/site=<site>/<YYYY-MM-DD>.parquet.
+
+    A partition is written once, to a temporary file renamed into place, so
+    readers never see a half-written day.
+    """
+
+    def __init__(self, directory, codes):
+        self.directory = directory
+        self.codes = tuple(codes)
+        self.sealed = 0
+
+    @property
+    def available(self):
+        return pq is not None
+
+    def partition_path(self, site, day_start):
+        # Site names come from MQTT topics: quote them so they can't escape the directory
+        return os.path.join(self.directory, 'site=' + quote(site, safe=''),
+                            local_datetime(day_start).strftime('%Y-%m-%d') + '.parquet')
+
+    def seal_day(self, history, site, day_start):
+        """Write the cycles of one day from the history store, returns False if there were none"""
+        rows = history.between(site, day_start, day_start + DAY_SECONDS)
+        if not rows:
+            return False
+        table = pa.table({column: pa.array([row[column] for row in rows], pa.float64())
+                          for column in ('ts',) + self.codes})
+        path = self.partition_path(site, day_start)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(table, path + '.tmp', compression='zstd')
+        os.replace(path + '.tmp', path)
+        self.sealed += 1
+        return True
+
+    def compact(self, history, now):
+        """Seal every finished day of every site not archived yet, returns the number written"""
+        today = bucket_start(now, DAY_SECONDS)
+        written = 0
+        for site in history.sites():
+            day = bucket_start(history.first_epoch(site), DAY_SECONDS)
+            while day < today:
+                if not os.path.exists(self.partition_path(site, day)) \
+                        and self.seal_day(history, site, day):
+                    written += 1
+                day += DAY_SECONDS
+        return written
+
+    def partitions(self, site, start, end):
+        """Archived partitions of `site` overlapping [start, end), oldest first"""
+        day = bucket_start(start, DAY_SECONDS)
+        while day < end:
+            path = self.partition_path(site, day)
+            if os.path.exists(path):
+                yield path
+            day += DAY_SECONDS
+
+    def scan(self, site, start, end, codes=None):
+        """
+        Yield one DataFrame (ts plus the requested codes) per archived day of
+        `site` overlapping [start, end). Only the projected columns are read;
+        codes missing from an older partition come back as NaN.
+        """
+        columns = ['ts'] + list(self.codes if codes is None else codes)
+        for path in self.partitions(site, start, end):
+            stored = set(pq.read_schema(path, memory_map=True).names)
+            table = pq.read_table(path, columns=[c for c in columns if c in stored], memory_map=True)
+            frame = table.to_pandas().reindex(columns=columns)
+            frame = frame[(frame['ts'] >= start) & (frame['ts'] < end)]
+            if len(frame):
+                yield frame
+
+    def read(self, site, start, end, codes=None):
+        """scan() concatenated into one DataFrame"""
+        frames = list(self.scan(site, start, end, codes))
+        if not frames:
+            return pd.DataFrame(columns=['ts'] + list(self.codes if codes is None else codes))
+        return pd.concat(frames, ignore_index=True)
+
+    def cycles(self, history, site, start, end, codes=None, limit=None):
+        """
+        Cycles of `site` with start <= ts < end, oldest first, as dicts like
+        HistoryStore.between(). Everything from the oldest cycle still in
+        the history database on is read from there; older cycles (dropped by
+        the raw retention) come from the archived days.
+        """
+        split = history_split(history, site, start, end)
+        rows = []
+        if self.available and start < split:
+            frame = self.read(site, start, split, codes)
+            frame = frame.astype(object).where(frame.notna(), None)
+            rows = frame.to_dict('records')
+        if limit is not None:
+            rows = rows[:limit]
+            limit -= len(rows)
+            if limit <= 0:
+                return rows
+        return rows + history.between(site, split, end, codes, limit)
+
+def cycle_frames(history, archive, site, start, end, codes=None, chunk_rows=5000):
+    """
+    Cycles of `site` with start <= ts < end as DataFrames (ts plus one float
+    column per code), oldest first: the archived days one partition at a
+    time, then the history database `chunk_rows` cycles at a time, split as
+    in HistoryArchive.cycles(). Without a usable `archive` (None, or pyarrow
+    missing) only the database is read.
+    """
+    columns = ['ts'] + list(history.codes if codes is None else codes)
+    split = history_split(history, site, start, end)
+    if archive is not None and archive.available and start < split:
+        yield from archive.scan(site, start, split, columns[1:])
+
+    while split < end:
+        rows = history.between(site, split, end, columns[1:], chunk_rows)
+        if not rows:
+            return
+        yield pd.DataFrame.from_records(rows, columns=columns).astype(float)
+        if len(rows) < chunk_rows:
+            return
+        # ts is the primary key: continue right after the last cycle read
+        split = math.nextafter(rows[-1]['ts'], math.inf)
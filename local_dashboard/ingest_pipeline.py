@@ -0,0 +1,128 @@
+'''
+ Nama File      : ingest_pipeline.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Memisahkan callback paho dari pemrosesan pesan MQTT
+    2. on_message hanya memasukkan pesan paho apa adanya (beserta waktu terima)
+       ke antrian berukuran tetap; topik baru di-decode dan payload baru
+       di-parse oleh thread pemroses, yang mengambilnya per batch lalu
+       menerapkannya ke penyimpanan lewat dispatch_message
+    3. Menyediakan counter kedalaman antrian, pesan yang dibuang (antrian penuh),
+       pesan yang diproses, dan jumlah batch
+'''
+
+import queue
+import threading
+import time
+from ingest import dispatch_message
+
+class IngestPipeline:
+    """
+    Bounded queue between the paho network loop and a processor thread.
+
+    submit() never blocks and does no work on the message: the paho message
+    object is queued as is (its topic is only decoded when read, by the
+    processor). When the queue is full the message is dropped and counted,
+    so a slow consumer can't stall the socket read. The processor
+    waits for one message, then drains up to `batch_size` more without
+    blocking and applies them in arrival order.
+
+    Counters need no lock: `received`/`dropped` are only written by the
+    submitting thread and the rest only by the processor thread.
+    """
+
+    def __init__(self, stores, maxsize=10000, batch_size=256, dispatch=dispatch_message):
+        self._stores = stores
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._batch_size = batch_size
+        self._dispatch = dispatch
+        self._thread = None
+        self.maxsize = maxsize
+        self.received = 0
+        self.dropped = 0
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+
+    def submit(self, message, recv_ts=None):
+        """
+        Enqueue one raw message (anything with .topic and .payload, e.g. paho's
+        MQTTMessage) from the paho thread, returns False if it was dropped
+        """
+        try:
+            self._queue.put_nowait((message, time.time() if recv_ts is None else recv_ts))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.received += 1
+        return True
+
+    def depth(self):
+        """Approximate number of messages waiting"""
+        return self._queue.qsize()
+
+    def _next_batch(self, timeout=None):
+        """Block for the first message, then take whatever else is already queued"""
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        try:
+            while len(batch) < self._batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def process_batch(self, timeout=None):
+        """Apply one batch to the stores, returns the number of messages taken"""
+        batch = self._next_batch(timeout)
+        if not batch:
+            return 0
+        # Queue depth at the moment this batch was taken
+        depth = len(batch) + self._queue.qsize()
+
+        failed = 0
+        for message, recv_ts in batch:
+            try:
+                self._dispatch(self._stores, message.topic, message.payload, recv_ts=recv_ts)
+            except Exception as e:
+                failed += 1
+                print(f"Error processing MQTT message: {e}")
+
+        self.processed += len(batch)
+        self.failed += failed
+        self.batches += 1
+        self.max_depth = max(self.max_depth, depth)
+        return len(batch)
+
+    def _run(self):
+        while True:
+            self.process_batch()
+
+    def start(self):
+        """Start the daemon processor thread (once)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='mqtt-ingest', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def drain(self):
+        """Process everything currently queued on the calling thread"""
+        while self.process_batch(timeout=0):
+            pass
+
+    def stats(self):
+        """Counters as a plain dict (safe to serialise)"""
+        return {
+            'depth': self._queue.qsize(),
+            'maxsize': self.maxsize,
+            'max_depth': self.max_depth,
+            'received': self.received,
+            'dropped': self.dropped,
+            'processed': self.processed,
+            'failed': self.failed,
+            'batches': self.batches,
+        }
@@ -0,0 +1,104 @@
+'''
+ Nama File      : live_push.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Push server (Server-Sent Events) pengganti polling dcc.Interval per
+       browser: thread ingest memberi tahu sekali setiap snapshot diterbitkan
+    2. Setiap event hanya berisi site dan versi snapshot, di-encode sekali
+       per snapshot lalu dikirim ke semua browser site tersebut
+    3. Browser (assets/live_push.js) menaikkan dcc.Store versi halaman saat
+       event datang, sehingga callback render hanya jalan saat ada data baru
+'''
+
+import json
+import threading
+
+class LiveUpdates:
+    """
+    Fan-out of published snapshots to Server-Sent Events streams.
+
+    notify() is called once per published snapshot of a site (from the
+    ingest thread) and encodes one event carrying the site and version;
+    every woken stream of that site sends the same bytes, so the work per
+    cycle does not grow with the number of browsers. The values are not
+    pushed: the page re-renders from the snapshot through its callbacks,
+    and a stream that missed versions only needs the newest one.
+
+    A stream holds one server thread while open, so at most `max_clients`
+    are accepted, and at most `max_per_client` from one client (address);
+    subscribe() returns None beyond that and the browser keeps polling
+    instead. The stream carries the values guest pages already show, so it
+    needs no login; the per-client cap keeps one viewer from taking every
+    slot.
+    """
+
+    def __init__(self, max_clients=50, max_per_client=4, keepalive=15.0):
+        self.max_clients = max_clients
+        self.max_per_client = max_per_client
+        self.keepalive = keepalive
+        self._changed = threading.Condition()
+        self._versions = {}   # site -> latest published version
+        self._events = {}     # site -> encoded event of that version
+        self.clients = 0
+        self._per_client = {}  # client -> open streams
+        self.refused = 0
+        self.notified = 0
+        self.sent = 0
+
+    @staticmethod
+    def encode(site, version):
+        data = json.dumps({'site': site, 'version': version}, separators=(',', ':'))
+        return f'id: {version}\nevent: cycle\ndata: {data}\n\n'.encode()
+
+    def notify(self, site, snapshot):
+        """Publish the version of `snapshot` of `site` to its streams"""
+        event = self.encode(site, snapshot.version)
+        with self._changed:
+            self._versions[site] = snapshot.version
+            self._events[site] = event
+            self.notified += 1
+            self._changed.notify_all()
+
+    def subscribe(self, site, version=None, client=None):
+        """
+        SSE chunks for `site`, None when max_clients streams are already open
+        or `client` already has max_per_client of them
+        """
+        with self._changed:
+            open_streams = self._per_client.get(client, 0)
+            if self.clients >= self.max_clients or open_streams >= self.max_per_client:
+                self.refused += 1
+                return None
+            self.clients += 1
+            self._per_client[client] = open_streams + 1
+        return self._stream(site, version, client)
+
+    def _stream(self, site, version, client):
+        try:
+            yield b': connected\n\n'
+            while True:
+                with self._changed:
+                    self._changed.wait_for(
+                        lambda: self._versions.get(site, version) != version, self.keepalive)
+                    latest = self._versions.get(site, version)
+                    data = None if latest == version else self._events[site]
+                    if data is not None:
+                        self.sent += 1
+                if data is None:
+                    yield b': keepalive\n\n'
+                    continue
+                version = latest
+                yield data
+        finally:
+            # Client went away (the server closes the generator)
+            with self._changed:
+                self.clients -= 1
+                self._per_client[client] -= 1
+                if not self._per_client[client]:
+                    del self._per_client[client]
+
+    def stats(self):
+        return {'clients': self.clients, 'max_clients': self.max_clients,
+                'max_per_client': self.max_per_client, 'refused': self.refused,
+                'notified': self.notified, 'sent': self.sent}
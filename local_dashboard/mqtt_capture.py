@@ -0,0 +1,81 @@
+'''
+ Nama File      : mqtt_capture.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Format file rekaman stream MQTT mentah (topic, payload, waktu terima)
+    2. CaptureWriter dipakai on_message untuk merekam (aktif lewat env
+       MQTT_CAPTURE_FILE), read_capture membaca ulang untuk replay
+    3. Format biner ringkas: header lalu record berukuran variabel,
+       otomatis gzip jika nama file berakhiran .gz
+'''
+
+import atexit
+import gzip
+import struct
+import threading
+
+CAPTURE_MAGIC = b'MCSCAP1\n'
+
+# Record header: receive epoch (float64), topic length (uint16), payload length (uint32)
+RECORD_HEADER = struct.Struct('<dHI')
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+class CaptureWriter:
+    """
+    Append-only writer for the raw MQTT stream.
+
+    write() only packs into a buffered file; the OS write happens every
+    `flush_every` records and on close (registered with atexit), so it
+    is cheap enough to call from on_message.
+    """
+
+    def __init__(self, path, flush_every=256):
+        self.path = path
+        self.records = 0
+        self._flush_every = flush_every
+        self._lock = threading.Lock()
+        self._file = _open(path, 'wb')
+        self._file.write(CAPTURE_MAGIC)
+        atexit.register(self.close)
+
+    def write(self, topic, payload, recv_ts):
+        topic = topic.encode() if isinstance(topic, str) else topic
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(RECORD_HEADER.pack(recv_ts, len(topic), len(payload)))
+            self._file.write(topic)
+            self._file.write(payload)
+            self.records += 1
+            if self.records % self._flush_every == 0:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def read_capture(path):
+    """Yield (recv_ts, topic, payload) for every record of a capture file"""
+    with _open(path, 'rb') as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not an MQTT capture file")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if not header:
+                return
+            if len(header) < RECORD_HEADER.size:
+                # Truncated tail (recorder killed mid-write)
+                return
+            recv_ts, topic_len, payload_len = RECORD_HEADER.unpack(header)
+            topic = f.read(topic_len)
+            payload = f.read(payload_len)
+            if len(payload) < payload_len:
+                return
+            yield recv_ts, topic.decode(), payload
@@ -0,0 +1,149 @@
+'''
+ Nama File      : sensor_registry.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Daftar kode sensor MCS (data, alarm, berita, prediksi) yang dikirim lewat MQTT
+    2. Setiap kode memiliki jenis (kind), satuan (unit), dan parser payload
+    3. Daftar dibaca dari file konfigurasi JSON (default sensors.json, bisa diganti
+       lewat env SENSOR_REGISTRY_FILE), jadi menambah sensor cukup di satu tempat
+    4. Registry dibangun sekali saat modul di-import, sehingga on_message
+       cukup melakukan satu lookup dict per pesan
+    5. Daftar "sites" (opsional) membatasi site yang diterima dari topik MQTT
+'''
+
+from collections import namedtuple
+import json
+import os
+
+# Kinds of topics handled by on_message
+KIND_CYCLE_START = 'cycle_start'
+KIND_DATA = 'data'
+KIND_ALARM = 'alarm'
+KIND_BERITA = 'berita'
+KIND_PREDICTION = 'prediction'
+
+KINDS = (KIND_CYCLE_START, KIND_DATA, KIND_ALARM, KIND_BERITA, KIND_PREDICTION)
+
+# One message carrying a whole cycle (JSON/CBOR object of code -> value)
+KIND_CYCLE_BATCH = 'cycle_batch'
+CYCLE_BATCH_CODE = 'cycle'
+
+# Payload parsers
+def parse_float(payload):
+    """Decode a raw MQTT payload into a float"""
+    return float(payload.decode())
+
+def parse_rounded_float(payload):
+    """Decode a raw MQTT payload into a float rounded to 2 decimal places"""
+    return round(float(payload.decode()), 2)
+
+def parse_int(payload):
+    """Decode a raw MQTT payload into an int (alarm codes)"""
+    return int(payload.decode())
+
+def parse_text(payload):
+    """Decode a raw MQTT payload into a string (berita messages)"""
+    return payload.decode()
+
+# Parser names usable in the config file
+PARSERS = {
+    'float': parse_float,
+    'rounded_float': parse_rounded_float,
+    'int': parse_int,
+    'text': parse_text,
+}
+
+# Same conversions for values already decoded from a cycle batch
+def convert_rounded_float(value):
+    return round(float(value), 2)
+
+CONVERTERS = {
+    'float': float,
+    'rounded_float': convert_rounded_float,
+    'int': int,
+    'text': str,
+}
+
+# Parser used when a config entry doesn't name one
+DEFAULT_PARSERS = {
+    KIND_CYCLE_START: 'float',
+    KIND_DATA: 'rounded_float',
+    KIND_ALARM: 'int',
+    KIND_BERITA: 'text',
+    KIND_PREDICTION: 'float',
+}
+
+# One registry entry per sensor code
+SensorSpec = namedtuple('SensorSpec', ['code', 'kind', 'unit', 'parser', 'convert'])
+
+# Parsed config file: topic prefix plus the code -> SensorSpec registry
+SensorConfig = namedtuple('SensorConfig', ['topic_prefix', 'registry', 'sites'])
+
+DEFAULT_REGISTRY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sensors.json')
+
+def build_sensor_registry(entries):
+    """Build the code -> SensorSpec lookup table used by on_message from config entries"""
+    registry = {}
+    for entry in entries:
+        code = entry['code']
+        kind = entry['kind']
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind {kind!r} for sensor {code}")
+        parser_name = entry.get('parser', DEFAULT_PARSERS[kind])
+        if parser_name not in PARSERS:
+            raise ValueError(f"Unknown parser {parser_name!r} for sensor {code}")
+        if code in registry:
+            raise ValueError(f"Sensor {code} is declared twice")
+        if code == CYCLE_BATCH_CODE:
+            raise ValueError(f"{code!r} is reserved for the cycle batch topic")
+        registry[code] = SensorSpec(code, kind, entry.get('unit', ''),
+                                    PARSERS[parser_name], CONVERTERS[parser_name])
+
+    if sum(spec.kind == KIND_CYCLE_START for spec in registry.values()) != 1:
+        raise ValueError("Exactly one sensor must have kind 'cycle_start'")
+    return registry
+
+def load_sensor_config(path=DEFAULT_REGISTRY_FILE):
+    """
+    Read a sensor config file:
+    {"topic_prefix": "mcs/", "sites": [...], "sensors": [{code, kind, unit, parser}, ...]}
+    An empty or missing "sites" list accepts every site.
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    return SensorConfig(config.get('topic_prefix', 'mcs/'), build_sensor_registry(config['sensors']),
+                        tuple(config.get('sites', ())))
+
+def codes_of_kind(registry, kind):
+    """Codes of one kind, in config file order"""
+    return tuple(code for code, spec in registry.items() if spec.kind == kind)
+
+SENSOR_CONFIG = load_sensor_config(os.getenv('SENSOR_REGISTRY_FILE', DEFAULT_REGISTRY_FILE))
+SENSOR_REGISTRY = SENSOR_CONFIG.registry
+
+# Prefix topik MQTT untuk semua kode MCS, satu subscription wildcard untuk semuanya
+TOPIC_PREFIX = os.getenv('MQTT_TOPIC_PREFIX', SENSOR_CONFIG.topic_prefix)
+SUBSCRIPTION_TOPIC = TOPIC_PREFIX + '#'
+
+# Kode sinyal awal siklus pengukuran
+CYCLE_START_CODE = codes_of_kind(SENSOR_REGISTRY, KIND_CYCLE_START)[0]
+
+# Codes that appear in the real-time table (order is the column order of a row)
+TABLE_DATA_CODES = codes_of_kind(SENSOR_REGISTRY, KIND_DATA)
+
+# Columns of the live sensor store: cycle start signal plus the table codes
+STORE_CODES = (CYCLE_START_CODE,) + TABLE_DATA_CODES
+
+ALARM_CODES = codes_of_kind(SENSOR_REGISTRY, KIND_ALARM)
+
+BERITA_CODES = codes_of_kind(SENSOR_REGISTRY, KIND_BERITA)
+
+# Prediction codes: 5 horizons (1-5 minutes ahead) per predicted parameter
+PREDICTION_CODES = codes_of_kind(SENSOR_REGISTRY, KIND_PREDICTION)
+
+# Code groups that each complete a cycle for snapshot publishing
+CYCLE_GROUPS = (STORE_CODES, ALARM_CODES + BERITA_CODES, PREDICTION_CODES)
+
+# Display unit per code
+SENSOR_UNITS = {code: spec.unit for code, spec in SENSOR_REGISTRY.items()}
@@ -0,0 +1,193 @@
+'''
+ Nama File      : sites.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Dukungan banyak greenhouse (site) dalam satu proses dashboard
+    2. Topik MQTT berbentuk mcs/<site>/kodeDataXXXX, topik lama mcs/kodeDataXXXX
+       masuk ke site default
+    3. Setiap site punya shard penyimpanan sendiri (sensor, alarm, prediksi,
+       snapshot) dengan ukuran memori tetap dan counter ingest per site
+    4. Jumlah site dibatasi agar memori proses tetap terkendali
+    5. Jika sensors.json berisi daftar "sites", hanya site tersebut yang
+       diterima dari topik; tanpa daftar, site baru dicatat di log
+    6. Data site di-reset sekali saat site berhenti mengirim, bukan setiap
+       pemeriksaan, dan site yang belum pernah mengirim tidak di-reset
+    7. Shard baru hanya dibuat untuk nama site yang valid dengan kode yang
+       terdaftar, sehingga topik sembarang tidak menghabiskan slot site
+'''
+
+import logging
+import re
+import threading
+import time
+from ingest import MESSAGE_ROUTES, dispatch_message, log_unknown_code
+from sensor_registry import CYCLE_BATCH_CODE
+
+log = logging.getLogger(__name__)
+
+# Site names accepted from topics: one topic level, no wildcards or spaces
+SITE_NAME = re.compile(r'[A-Za-z0-9_.-]{1,64}')
+
+def split_site_topic(topic, prefix, default_site):
+    """'mcs/<site>/<code>' -> (site, code), 'mcs/<code>' -> (default_site, code)"""
+    rest = topic[len(prefix):] if topic.startswith(prefix) else topic
+    site, _, code = rest.rpartition('/')
+    return (site or default_site), code
+
+class SiteShard:
+    """Stores and ingest counters of one site"""
+
+    def __init__(self, name, stores):
+        self.name = name
+        self.stores = stores
+        self.messages = 0         # messages applied to the stores
+        self.ignored = 0          # unregistered codes or unparsable payloads
+        self.last_message = None  # epoch of the last message received
+        self.last_seen = None     # time.monotonic() of the same, for staleness checks
+        self.reset = False        # stores were reset since the last message
+
+    @property
+    def snapshots(self):
+        return self.stores.snapshots
+
+    @property
+    def nbytes(self):
+        """Memory held by the preallocated sensor and prediction buffers"""
+        return self.stores.sensors.nbytes + self.stores.predictions.nbytes
+
+    def is_stale(self, timeout, now=None):
+        """True if nothing was received for `timeout` seconds (monotonic, immune to clock changes)"""
+        if self.last_seen is None:
+            return True
+        return (time.monotonic() if now is None else now) - self.last_seen > timeout
+
+    def went_stale(self, timeout, now=None):
+        """
+        True once per outage: the first check after the site stopped sending
+        for `timeout` seconds. Sites never heard from have nothing to reset.
+        """
+        if self.last_seen is None or self.reset or not self.is_stale(timeout, now):
+            return False
+        self.reset = True
+        return True
+
+    def stats(self):
+        return {
+            'messages': self.messages,
+            'ignored': self.ignored,
+            'last_message': self.last_message,
+            'rows': len(self.stores.sensors),
+            'version': self.snapshots.version,
+            'nbytes': self.nbytes,
+        }
+
+class SiteShards:
+    """
+    One SiteShard per site, created on the first message from that site.
+
+    `new_stores(name)` builds a fresh IngestStores for a shard; every shard gets
+    its own fixed-size buffers, so memory grows linearly with the number of
+    sites and stops at `max_sites`. With `allowed` (the "sites" list of
+    sensors.json) only those sites, the default site and `sites` get a shard.
+    Messages from other sites or beyond the limit are counted in `rejected`
+    (under the lock) and dropped, each rejected site is logged once.
+    """
+
+    def __init__(self, new_stores, prefix, default_site, max_sites=50, sites=(), allowed=None):
+        self._new_stores = new_stores
+        self._lock = threading.Lock()
+        self._shards = {}
+        self.prefix = prefix
+        self.default_site = default_site
+        self.max_sites = max(max_sites, 1)
+        self.allowed = None if not allowed else {default_site, *sites, *allowed}
+        self.rejected = 0
+        self._rejected_sites = set()
+        # The default site always exists so pages have something to show
+        for name in (default_site,) + tuple(sites):
+            self.get(name)
+
+    def __iter__(self):
+        return iter(list(self._shards.values()))
+
+    def __len__(self):
+        return len(self._shards)
+
+    def names(self):
+        """Site names, default site first"""
+        return [self.default_site] + sorted(n for n in self._shards if n != self.default_site)
+
+    def get(self, name, create=True):
+        """Shard of `name`, created if needed (None if unknown and not created)"""
+        shard = self._shards.get(name)
+        if shard is not None or not create:
+            return shard
+        with self._lock:
+            shard = self._shards.get(name)
+            if shard is None:
+                if self.allowed is not None and name not in self.allowed:
+                    self._reject(name, "not listed in sensors.json")
+                    return None
+                if len(self._shards) >= self.max_sites:
+                    self._reject(name, f"MCS_MAX_SITES={self.max_sites} reached")
+                    return None
+                shard = SiteShard(name, self._new_stores(name))
+                self._shards[name] = shard
+                log.info("Added site %s (%d/%d)", name, len(self._shards), self.max_sites)
+        return shard
+
+    def reject(self, name, reason=None):
+        """Count a dropped message of site `name`, logging `reason` (if any) once per site"""
+        with self._lock:
+            self._reject(name, reason)
+
+    def _reject(self, name, reason):
+        # Called with the lock held. Log each rejected site once (bounded,
+        # topics are not trusted input)
+        self.rejected += 1
+        if reason and name not in self._rejected_sites and len(self._rejected_sites) < self.max_sites:
+            self._rejected_sites.add(name)
+            log.warning("Ignoring messages of site %r: %s", name, reason)
+
+    def snapshot(self, name):
+        """Current snapshot of `name`, or of the default site if `name` is unknown"""
+        shard = self._shards.get(name or self.default_site) or self._shards[self.default_site]
+        return shard.snapshots.current()
+
+    def stats(self):
+        return {
+            'sites': len(self._shards),
+            'max_sites': self.max_sites,
+            'rejected': self.rejected,
+            'per_site': {shard.name: shard.stats() for shard in self},
+        }
+
+def dispatch_site_message(shards, topic, payload, recv_ts=None):
+    """Route one MQTT message to the shard of its site, returns the message kind or None"""
+    recv_ts = time.time() if recv_ts is None else recv_ts
+    site, code = split_site_topic(topic, shards.prefix, shards.default_site)
+    shard = shards.get(site, create=False)
+    if shard is None:
+        # Topics are untrusted: only a well-formed site name sending a
+        # registered code may take one of the site slots
+        if not SITE_NAME.fullmatch(site):
+            shards.reject(site, "invalid site name")
+            return None
+        if code != CYCLE_BATCH_CODE and code not in MESSAGE_ROUTES:
+            log_unknown_code(code, topic)
+            shards.reject(site)
+            return None
+        shard = shards.get(site)
+        if shard is None:
+            return None
+
+    shard.last_message = recv_ts
+    shard.last_seen = time.monotonic()
+    shard.reset = False
+    kind = dispatch_message(shard.stores, topic, payload, recv_ts=recv_ts)
+    if kind is None:
+        shard.ignored += 1
+    else:
+        shard.messages += 1
+    return kind
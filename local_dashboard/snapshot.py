@@ -0,0 +1,144 @@
+'''
+ Nama File      : snapshot.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Snapshot immutable dari data sensor, alarm, dan prediksi untuk callback Dash
+    2. Thread MQTT menerbitkan snapshot baru setiap satu siklus selesai,
+       dengan nomor versi yang selalu naik
+    3. Callback cukup mengambil referensi snapshot terbaru (O(1), tanpa lock)
+       dan bisa melewati render jika versinya belum berubah
+'''
+
+import math
+import threading
+import time
+from types import MappingProxyType
+
+class Snapshot:
+    """
+    Read-only view of the dashboard state as of one published cycle.
+
+    Latest values, alarms and predictions are small copies taken at publish
+    time. Sensor windows are copied from the ring buffer pinned at the
+    snapshot's row (store.mark()), so they never include a newer row, and
+    end with the copy of the newest row taken at publish time (that row is
+    still written to by set_latest).
+
+    The ring reuses its oldest slots, so a window's values never change but
+    its oldest rows can go away: mark() pins at most depth - 1 rows, which
+    stay intact through the next begin_row(). A snapshot kept longer than
+    that returns shorter windows, without the rows overwritten since
+    (window() and epochs() stay aligned on the newest row).
+    """
+    __slots__ = ('version', 'published', 'rows', 'alarms',
+                 '_store', '_at', '_latest', '_predictions')
+
+    def __init__(self, version, published, store, alarm_data, predictions):
+        self.version = version
+        self.published = published
+        self._store = store
+        self._at = store.mark()
+        self.rows = self._at[1]
+        self._latest = store.latest_row()
+        self.alarms = MappingProxyType(dict(alarm_data))
+        self._predictions = predictions.latest_set()
+
+    def __len__(self):
+        return self.rows
+
+    def latest(self, code, default=None):
+        """Newest value of `code`, or `default` if missing"""
+        value = self._latest.get(code, math.nan)
+        return default if math.isnan(value) else value
+
+    def _pinned(self, view):
+        """Copy of `view` without its oldest rows overwritten since publishing"""
+        values = view.copy()
+        # Checked after copying: the writer bumps its counter before a slot changes
+        return values[len(values) - self._store.intact(len(values), self._at):]
+
+    def window(self, code, n):
+        """Read-only array of the newest min(n, rows) values of `code`, oldest first"""
+        values = self._pinned(self._store.window(code, n, at=self._at))
+        if len(values):
+            values[-1] = self._latest[code]
+        values.flags.writeable = False
+        return values
+
+    def epochs(self, n):
+        """Epoch timestamps matching window(code, n)"""
+        values = self._pinned(self._store.epochs(n, at=self._at))
+        values.flags.writeable = False
+        return values
+
+    def prediction(self, code, default=None):
+        """Latest forecast for `code`, or `default` if none yet"""
+        value = self._predictions.get(code, math.nan)
+        return default if math.isnan(value) else value
+
+class SnapshotPublisher:
+    """
+    Copy-on-write holder of the current Snapshot.
+
+    Writers (the MQTT thread, the connection monitor) build a new Snapshot
+    under a lock and rebind `_current`; readers just take the reference,
+    which is atomic, so they never block and never see a partial update.
+
+    A cycle counts as completed when every code of every one of `groups`
+    (e.g. all table data, all alarms, all prediction horizons) has been
+    received since the cycle started; it is then published once. A cycle
+    missing some codes is flushed when the next cycle starts.
+
+    `on_publish(snapshot)`, if given, is called after every publish (outside
+    the lock), e.g. to push the new snapshot to the browsers.
+    """
+
+    def __init__(self, store, alarm_data, predictions, groups=(), on_publish=None):
+        self._store = store
+        self.on_publish = on_publish
+        self._alarm_data = alarm_data
+        self._predictions = predictions
+        # A cycle is complete once every code of every group arrived, so only
+        # their union matters: one set lookup per message
+        self._expected = frozenset().union(*groups)
+        self._missing = set(self._expected)
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._version = 0
+        self._current = Snapshot(0, time.time(), store, alarm_data, predictions)
+
+    def current(self):
+        """Latest published snapshot"""
+        return self._current
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def publish(self):
+        """Publish a new snapshot of the stores, returns it"""
+        with self._lock:
+            self._version += 1
+            snapshot = Snapshot(self._version, time.time(), self._store,
+                                self._alarm_data, self._predictions)
+            self._current = snapshot
+            self._dirty = False
+        if self.on_publish is not None:
+            self.on_publish(snapshot)
+        return snapshot
+
+    def begin_cycle(self):
+        """Called on cycle start: flush the previous cycle, then expect every group again"""
+        if self._dirty:
+            self.publish()
+        self._missing = set(self._expected)
+
+    def received(self, code):
+        """Record an applied update, publishing when it completes the cycle"""
+        self._dirty = True
+        missing = self._missing
+        if code in missing:
+            missing.discard(code)
+            if not missing:
+                self.publish()
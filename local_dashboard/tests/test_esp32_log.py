@@ -0,0 +1,236 @@
+import threading
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+import requests
+import esp32_log
+from esp32_log import CircuitBreaker, EspLogTail, SharedFetchCache, parse_log
+
+HEADER = b'Waktu;Suhu Indoor\n'
+
+def line(i):
+    return f'2026-10-17 10:{i // 60:02d}:{i % 60:02d};{20 + i / 10}\n'.encode()
+
+class FakeLogger:
+    """Serves a growing log.csv, honouring Range like the ESP32 web server"""
+
+    def __init__(self, log=HEADER):
+        self.log = log
+        self.ranges = []
+
+    def get(self, url, headers=None, timeout=None):
+        spec = (headers or {}).get('Range')
+        self.ranges.append(spec)
+        if spec is None:
+            return SimpleNamespace(status_code=200, content=self.log)
+        start = int(spec[len('bytes='):-1])
+        if start >= len(self.log):
+            return SimpleNamespace(status_code=416, content=b'')
+        return SimpleNamespace(status_code=206, content=self.log[start:])
+
+def test_tail_requests_only_new_bytes():
+    logger = FakeLogger(HEADER + line(0) + line(1))
+    tail = EspLogTail('http://esp', get=logger.get)
+    assert tail.poll()['Suhu Indoor'].tolist() == [20.0, 20.1]
+
+    logger.log += line(2) + b'2026-10-17 10:00:03;2'  # last line still being written
+    assert tail.poll()['Suhu Indoor'].tolist() == [20.0, 20.1, 20.2]
+    logger.log += b'0.3\n'
+    assert tail.poll()['Suhu Indoor'].tolist() == [20.0, 20.1, 20.2, 20.3]
+    assert logger.ranges[0] is None and all(spec.startswith('bytes=') for spec in logger.ranges[1:])
+
+def broken_parse(*args):
+    raise ValueError('bad chunk')
+
+def test_failed_parse_is_fetched_again(monkeypatch):
+    logger = FakeLogger(HEADER + line(0))
+    tail = EspLogTail('http://esp', get=logger.get)
+    tail.poll()
+    offset = tail.offset
+
+    logger.log += line(1) + line(2)
+    parse_log = esp32_log.parse_log
+    monkeypatch.setattr(esp32_log, 'parse_log', broken_parse)
+    with pytest.raises(ValueError):
+        tail.poll()
+    assert tail.offset == offset
+
+    # Nothing was skipped: the same bytes are requested and parsed on the next poll
+    monkeypatch.setattr(esp32_log, 'parse_log', parse_log)
+    assert tail.poll()['Suhu Indoor'].tolist() == [20.0, 20.1, 20.2]
+
+def test_buffer_bounded_and_view_is_newest_rows():
+    logger = FakeLogger()
+    tail = EspLogTail('http://esp', get=logger.get, max_rows=10, view_rows=4)
+    for i in range(0, 30, 3):
+        logger.log += line(i) + line(i + 1) + line(i + 2)
+        view = tail.poll()
+    assert view['Suhu Indoor'].tolist() == [20 + i / 10 for i in range(26, 30)]
+    assert tail.frame['Suhu Indoor'].tolist() == [20 + i / 10 for i in range(20, 30)]
+    assert tail.stats()['rows'] == 10
+    assert len(tail._chunks) <= 5
+
+def test_out_of_order_lines_are_merged_sorted():
+    logger = FakeLogger(HEADER + line(5) + line(6))
+    tail = EspLogTail('http://esp', get=logger.get)
+    tail.poll()
+    logger.log += line(1)
+    assert tail.poll()['Suhu Indoor'].tolist() == [20.1, 20.5, 20.6]
+
+class FakeClock:
+    """Stands in for the time module inside esp32_log"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return 1760000000.0 + self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(esp32_log, 'time', clock)
+    return clock
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    breaker = CircuitBreaker(failures=3, cooldown=60.0)
+    breaker.failure()
+    breaker.failure()
+    assert breaker.state == 'closed' and breaker.allow()
+    breaker.failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    assert breaker.trips == 1
+
+    clock.now += 59.9
+    assert not breaker.allow()
+    clock.now += 0.2
+    assert breaker.state == 'half-open' and breaker.allow()
+
+    # A failed trial re-opens for a whole cooldown, without counting a new trip
+    breaker.failure()
+    assert breaker.state == 'open' and breaker.trips == 1
+    clock.now += 60.0
+    assert breaker.state == 'half-open'
+    breaker.success()
+    assert breaker.state == 'closed'
+    assert breaker.stats() == {'state': 'closed', 'consecutive_failures': 0, 'trips': 1}
+
+def test_breaker_counts_consecutive_failures_only(clock):
+    breaker = CircuitBreaker(failures=2, cooldown=60.0)
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    assert breaker.state == 'closed'
+    breaker.failure()
+    assert breaker.state == 'open'
+
+class CountingFetch:
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+
+    def __call__(self):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return pd.DataFrame({'Suhu Indoor': [float(self.calls)]})
+
+def test_cache_is_shared_until_it_expires(clock):
+    fetch = CountingFetch()
+    cache = SharedFetchCache(fetch, ttl=30.0)
+    first = cache.get()
+    clock.now += 29.0
+    assert cache.get() is first
+    assert fetch.calls == 1 and cache.stats()['hits'] == 1
+
+    clock.now += 1.0
+    assert cache.get()['Suhu Indoor'].tolist() == [2.0]
+    assert fetch.calls == 2
+
+def test_cache_serves_previous_frame_during_a_refresh(clock):
+    release, started = threading.Event(), threading.Event()
+    fetch = CountingFetch()
+
+    def slow_fetch():
+        if fetch.calls:
+            started.set()
+            release.wait(5)
+        return fetch()
+
+    cache = SharedFetchCache(slow_fetch, ttl=30.0)
+    first = cache.get()
+    clock.now += 31.0
+    refresher = threading.Thread(target=cache.get)
+    refresher.start()
+    started.wait(5)
+    # The download is in progress: other callers don't wait for it
+    assert cache.get() is first
+    release.set()
+    refresher.join(5)
+    assert cache.get()['Suhu Indoor'].tolist() == [2.0]
+
+def test_failed_refresh_serves_last_frame_marked_stale(clock, capsys):
+    fetch = CountingFetch()
+    breaker = CircuitBreaker(failures=2, cooldown=120.0)
+    cache = SharedFetchCache(fetch, ttl=30.0, breaker=breaker)
+    good = cache.get()
+
+    fetch.error = requests.ConnectionError("unreachable")
+    clock.now += 30.0
+    stale = cache.get()
+    assert stale['Suhu Indoor'].tolist() == [1.0]
+    assert stale.attrs['stale_since'] == clock.time()
+    assert 'stale_since' not in good.attrs
+    # The failure is cached for ttl too
+    assert cache.get() is stale and fetch.calls == 2
+
+    clock.now += 30.0
+    cache.get()
+    assert breaker.state == 'open'
+    # While open the logger is not asked at all; the stale time stays the first failure
+    clock.now += 30.0
+    assert cache.get().attrs['stale_since'] == stale.attrs['stale_since']
+    assert fetch.calls == 3 and cache.stats()['skipped'] == 1
+    assert capsys.readouterr().out.count("Error fetching the ESP32 log") == 2
+
+    fetch.error = None
+    clock.now += 120.0
+    fresh = cache.get()
+    assert not cache.stale and 'stale_since' not in fresh.attrs
+    assert breaker.state == 'closed'
+
+def test_cache_without_any_frame_yet_is_empty_and_stale(clock):
+    fetch = CountingFetch()
+    fetch.error = ValueError("bad log")
+    cache = SharedFetchCache(fetch, ttl=30.0)
+    frame = cache.get()
+    assert frame.empty and cache.stale
+
+LOG = b"""Waktu;Suhu Indoor;CO2
+2026-10-17 10:00:02;25.5;410
+2026-10-17 10:00:01;ERR;415
+not a time;26.0;420
+2026-10-17 10:00:03;27.0
+"""
+
+def test_parse_log_tolerates_malformed_lines():
+    frame = parse_log(LOG)
+    assert frame['Suhu Indoor'].dtype == frame['CO2'].dtype == 'float64'
+    # Unparseable time first, then oldest first
+    assert frame['Waktu'].isna().tolist() == [True, False, False, False]
+    assert frame['Waktu'].iloc[1:].dt.strftime('%H:%M:%S').tolist() == ['10:00:01', '10:00:02', '10:00:03']
+    # Sensor error text and a missing trailing field become NaN
+    assert frame['Suhu Indoor'].tolist()[1:] == pytest.approx([float('nan'), 25.5, 27.0], nan_ok=True)
+    assert frame['CO2'].tolist()[1:] == pytest.approx([415.0, 410.0, float('nan')], nan_ok=True)
+
+def test_parse_log_other_time_format():
+    frame = parse_log(b"Waktu;Suhu Indoor\n17/10/2026 10:00:00;25.0\n17/10/2026 10:00:05;25.5\n")
+    assert frame['Waktu'].notna().all()
+    assert frame['Waktu'].diff().iloc[1] == pd.Timedelta(seconds=5)
+
+def test_parse_log_header_only():
+    frame = parse_log(b"Waktu;Suhu Indoor\n")
+    assert frame.empty and list(frame.columns) == ['Waktu', 'Suhu Indoor']
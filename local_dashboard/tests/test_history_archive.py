@@ -0,0 +1,69 @@
+import pytest
+from history_archive import DAY_SECONDS, HistoryArchive, cycle_frames
+from history_store import HistoryStore, bucket_start
+
+pytest.importorskip('pyarrow')
+
+CODES = ('a', 'b')
+DAY = bucket_start(1_790_000_000, DAY_SECONDS)
+
+@pytest.fixture
+def history(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'), CODES)
+    # Four cycles per day over three days
+    for day in range(3):
+        for hour in (0, 6, 12, 18):
+            ts = DAY + day * DAY_SECONDS + hour * 3600
+            store.append('site1', ts, {'a': float(day * 100 + hour), 'b': float('nan')})
+    store.flush()
+    yield store
+    store.close()
+
+def test_cycles_reads_days_dropped_by_retention_from_the_archive(history, tmp_path):
+    archive = HistoryArchive(str(tmp_path / 'archive'), CODES)
+    now = DAY + 3 * DAY_SECONDS
+    assert archive.compact(history, now) == 3
+    # Keep only the last day in the database
+    history.apply_retention({'raw': DAY_SECONDS}, now, pause=0)
+    assert history.first_epoch('site1') == DAY + 2 * DAY_SECONDS
+
+    rows = archive.cycles(history, 'site1', DAY, now)
+    assert [row['a'] for row in rows] == [float(d * 100 + h) for d in range(3) for h in (0, 6, 12, 18)]
+    assert all(row['b'] is None for row in rows)
+
+    # Range ends before the database rows: archive only
+    rows = archive.cycles(history, 'site1', DAY + 6 * 3600, DAY + DAY_SECONDS, codes=['a'])
+    assert [row['a'] for row in rows] == [6.0, 12.0, 18.0]
+    assert set(rows[0]) == {'ts', 'a'}
+
+def test_cycles_limit_spans_archive_and_database(history, tmp_path):
+    archive = HistoryArchive(str(tmp_path / 'archive'), CODES)
+    now = DAY + 3 * DAY_SECONDS
+    archive.compact(history, now)
+    history.apply_retention({'raw': 2 * DAY_SECONDS}, now, pause=0)
+
+    rows = archive.cycles(history, 'site1', DAY + 12 * 3600, now, limit=4)
+    assert [row['ts'] for row in rows] == [DAY + h * 3600 for h in (12, 18, 24, 30)]
+
+def test_cycles_without_archived_days_reads_the_database(history, tmp_path):
+    archive = HistoryArchive(str(tmp_path / 'archive'), CODES)
+    rows = archive.cycles(history, 'site1', DAY, DAY + DAY_SECONDS)
+    assert [row['a'] for row in rows] == [0.0, 6.0, 12.0, 18.0]
+
+def test_cycle_frames_stream_archive_then_database(history, tmp_path):
+    archive = HistoryArchive(str(tmp_path / 'archive'), CODES)
+    now = DAY + 3 * DAY_SECONDS
+    archive.compact(history, now)
+    history.apply_retention({'raw': DAY_SECONDS}, now, pause=0)
+
+    frames = list(cycle_frames(history, archive, 'site1', DAY, now, codes=['a'], chunk_rows=3))
+    # Two archived days, then the database day in chunks of 3 cycles
+    assert [len(frame) for frame in frames] == [4, 4, 3, 1]
+    assert all(list(frame.columns) == ['ts', 'a'] for frame in frames)
+    assert [a for frame in frames for a in frame['a']] == \
+        [float(d * 100 + h) for d in range(3) for h in (0, 6, 12, 18)]
+
+def test_cycle_frames_without_archive_reads_the_database(history):
+    frames = list(cycle_frames(history, None, 'site1', DAY, DAY + 3 * DAY_SECONDS, chunk_rows=5))
+    assert [len(frame) for frame in frames] == [5, 5, 2]
+    assert frames[0]['b'].isna().all()
@@ -0,0 +1,56 @@
+import threading
+import time
+
+from ingest_pipeline import IngestPipeline
+
+class RawMessage:
+    """paho-like message whose topic is decoded on access, recording the reading thread"""
+
+    def __init__(self, topic, payload):
+        self._topic = topic.encode()
+        self.payload = payload
+        self.read_by = []
+
+    @property
+    def topic(self):
+        self.read_by.append(threading.current_thread().name)
+        return self._topic.decode('utf-8')
+
+def test_submit_returns_before_the_message_is_processed():
+    release = threading.Event()
+    applied = []
+
+    def dispatch(stores, topic, payload, recv_ts=None):
+        release.wait(5)
+        applied.append((topic, float(payload), recv_ts))
+
+    pipeline = IngestPipeline(None, dispatch=dispatch)
+    pipeline.start()
+    first = RawMessage('mcs/kodeData0211', b'25.5')
+    second = RawMessage('mcs/kodeData0212', b'60.0')
+
+    # The processor is stuck on the first message, submit still returns at once
+    assert pipeline.submit(first, recv_ts=1.0)
+    assert pipeline.submit(second, recv_ts=2.0)
+    assert applied == []
+    assert pipeline.stats()['received'] == 2
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while pipeline.processed < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert applied == [('mcs/kodeData0211', 25.5, 1.0), ('mcs/kodeData0212', 60.0, 2.0)]
+    # Topics were decoded by the processor, never by the submitting thread
+    assert first.read_by == second.read_by == ['mqtt-ingest']
+
+def test_full_queue_drops_without_touching_the_message():
+    pipeline = IngestPipeline(None, maxsize=1, dispatch=lambda *args, **kwargs: None)
+    kept, dropped = RawMessage('mcs/a', b'1'), RawMessage('mcs/b', b'2')
+    assert pipeline.submit(kept)
+    assert not pipeline.submit(dropped)
+    assert pipeline.stats()['dropped'] == 1
+    assert kept.read_by == dropped.read_by == []
+
+    pipeline.drain()
+    assert pipeline.processed == 1
+    assert kept.read_by == ['MainThread']
@@ -0,0 +1,50 @@
+import threading
+from types import SimpleNamespace
+
+from live_push import LiveUpdates
+
+def test_event_carries_only_the_version():
+    live = LiveUpdates(keepalive=5.0)
+    behind = live.subscribe('default', version=3, client='a')
+    current = live.subscribe('default', version=None, client='b')
+    assert next(behind) == next(current) == b': connected\n\n'
+
+    live.notify('gh1', SimpleNamespace(version=9))
+    live.notify('default', SimpleNamespace(version=7))
+    expected = b'id: 7\nevent: cycle\ndata: {"site":"default","version":7}\n\n'
+    # Both streams send the same encoded bytes, whatever version they had
+    assert next(behind) is next(current)
+    assert live._events['default'] == expected
+    assert live.stats()['sent'] == 2
+
+    # A stream waits for the next version of its own site
+    got = []
+    reader = threading.Thread(target=lambda: got.append(next(current)))
+    reader.start()
+    live.notify('default', SimpleNamespace(version=8))
+    reader.join(5)
+    assert got == [live.encode('default', 8)]
+    behind.close()
+    current.close()
+
+def test_streams_capped_per_client():
+    live = LiveUpdates(max_clients=3, max_per_client=2, keepalive=0.01)
+    first = live.subscribe('default', client='10.0.0.1')
+    second = live.subscribe('default', client='10.0.0.1')
+    assert next(first) == next(second) == b': connected\n\n'
+
+    # Third stream of the same address is refused, other addresses are not
+    assert live.subscribe('default', client='10.0.0.1') is None
+    other = live.subscribe('default', client='10.0.0.2')
+    assert next(other) == b': connected\n\n'
+    assert live.subscribe('default', client='10.0.0.3') is None
+    assert live.stats()['refused'] == 2
+
+    # Closing a stream frees its slot
+    first.close()
+    third = live.subscribe('default', client='10.0.0.1')
+    assert third is not None
+    next(third)
+    for stream in (second, other, third):
+        stream.close()
+    assert live.stats()['clients'] == 0
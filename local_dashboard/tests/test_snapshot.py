@@ -0,0 +1,119 @@
+import math
+import pytest
+from compressed_store import ChunkedSensorStore
+from sensor_store import SensorStore, PredictionStore
+from snapshot import SnapshotPublisher
+
+CODES = ('a', 'b')
+
+@pytest.fixture(params=[SensorStore, ChunkedSensorStore])
+def store(request):
+    return request.param(CODES, 8)
+
+def make_publisher(store, alarm_data=None):
+    predictions = PredictionStore(('p',), 4)
+    return SnapshotPublisher(store, {} if alarm_data is None else alarm_data, predictions,
+                             groups=(CODES, ('alarm',)))
+
+def test_snapshot_unchanged_by_later_set_latest(store):
+    publisher = make_publisher(store)
+    store.begin_row(1.0)
+    store.set_latest('a', 10.0)
+    snapshot = publisher.publish()
+
+    store.set_latest('a', 20.0)
+    store.set_latest('b', 5.0)
+
+    assert snapshot.latest('a') == 10.0
+    assert snapshot.window('a', 4).tolist() == [10.0]
+    assert math.isnan(snapshot.window('b', 4)[-1])
+
+def test_snapshot_window_frozen_across_rows(store):
+    publisher = make_publisher(store)
+    for epoch, value in enumerate([1.0, 2.0, 3.0]):
+        store.begin_row(float(epoch))
+        store.set_latest('a', value)
+    snapshot = publisher.publish()
+
+    store.set_latest('a', 30.0)
+    store.begin_row(3.0)
+    store.set_latest('a', 40.0)
+
+    assert snapshot.window('a', 8).tolist() == [1.0, 2.0, 3.0]
+    assert snapshot.epochs(8).tolist() == [0.0, 1.0, 2.0]
+    assert not snapshot.window('a', 8).flags.writeable
+
+def test_publishes_once_when_every_group_completes(store):
+    alarm_data = {}
+    published = []
+    publisher = make_publisher(store, alarm_data)
+    publisher.on_publish = published.append
+
+    publisher.begin_cycle()
+    store.begin_row(1.0)
+    alarm_data['alarm'] = 1
+    publisher.received('alarm')
+    assert published == []  # alarms alone do not complete the cycle
+
+    for code, value in zip(CODES, (10.0, 20.0)):
+        store.set_latest(code, value)
+        publisher.received(code)
+    assert len(published) == 1
+    assert published[0].window('a', 4).tolist() == [10.0]
+    assert published[0].latest('a') == 10.0
+
+def test_incomplete_cycle_flushed_by_next_cycle(store):
+    published = []
+    publisher = make_publisher(store)
+    publisher.on_publish = published.append
+
+    publisher.begin_cycle()
+    store.begin_row(1.0)
+    store.set_latest('a', 10.0)
+    publisher.received('a')
+    assert published == []
+
+    publisher.begin_cycle()
+    assert len(published) == 1
+    assert published[0].latest('a') == 10.0
+
+@pytest.mark.parametrize('make_store', [SensorStore, ChunkedSensorStore])
+def test_full_ring_snapshot_survives_next_row(make_store):
+    store = make_store(CODES, 4)
+    publisher = make_publisher(store)
+    for epoch in range(6):
+        store.begin_row(float(epoch))
+        store.set_latest('a', epoch * 10.0)
+    snapshot = publisher.publish()
+    before = snapshot.epochs(4).tolist()
+
+    store.begin_row(100.0)
+    store.set_latest('a', 1000.0)
+    assert snapshot.epochs(4).tolist() == before
+    assert snapshot.window('a', 4).tolist() == [e * 10.0 for e in before]
+    assert 100.0 not in before
+
+def test_old_snapshot_drops_overwritten_rows():
+    store = SensorStore(CODES, 4)
+    publisher = make_publisher(store)
+    for epoch in range(6):
+        store.begin_row(float(epoch))
+    snapshot = publisher.publish()
+    assert snapshot.epochs(4).tolist() == [3.0, 4.0, 5.0]
+
+    for epoch in (100.0, 101.0):
+        store.begin_row(epoch)
+    # The ring reused the slot of row 3: it is dropped, never replaced
+    assert snapshot.epochs(4).tolist() == [4.0, 5.0]
+    assert len(snapshot.window('a', 4)) == 2
+
+def test_clear_keeps_pinned_windows(store):
+    publisher = make_publisher(store)
+    for epoch in range(3):
+        store.begin_row(float(epoch))
+    snapshot = publisher.publish()
+
+    store.clear()
+    store.begin_row(50.0)
+    assert snapshot.epochs(8).tolist() == [0.0, 1.0, 2.0]
+    assert store.epochs(8).tolist() == [50.0]
@@ -0,0 +1,63 @@
+import json
+import plotly.graph_objects as go
+import plotly.io as pio
+import pytest
+from plotly.utils import PlotlyJSONEncoder
+from sensor_store import SensorStore, PredictionStore
+from snapshot import SnapshotPublisher
+from trend_graph import TREND_POINTS, trend_figure, trend_patch, blank_trend_patch
+
+# Raised by plotly's own default template when a figure is validated
+pytestmark = pytest.mark.filterwarnings("ignore:.*scattermapbox.*:DeprecationWarning")
+
+def apply_patch(figure, patch):
+    """What the browser does with a dash.Patch: assign each value at its location in the figure JSON"""
+    figure = json.loads(pio.to_json(figure))
+    update = json.loads(json.dumps(patch.to_plotly_json(), cls=PlotlyJSONEncoder))
+    for op in update['operations']:
+        assert op['operation'] == 'Assign'
+        *path, key = op['location']
+        target = figure
+        for part in path:
+            target = target.setdefault(part, {}) if isinstance(target, dict) else target[part]
+        target[key] = op['params']['value']
+    # Still a valid figure once patched
+    return go.Figure(figure)
+
+def snapshot_with(values, start=1760000000.0, step=60.0):
+    store = SensorStore(('kodeData0211', 'kodeData0212'), 64)
+    for i, value in enumerate(values):
+        store.begin_row(start + i * step)
+        store.set_latest('kodeData0211', value)
+    return SnapshotPublisher(store, {}, PredictionStore(('p',), 1)).publish()
+
+def test_patch_fills_trend_figure():
+    snap = snapshot_with([20.0 + i for i in range(10)])
+    figure = apply_patch(trend_figure('temp-graph'), trend_patch('temp-graph', snap, 10))
+
+    # TREND_POINTS samples spread over the window, oldest to newest
+    assert TREND_POINTS == 4
+    assert list(figure.data[0].y) == [20.0, 23.0, 26.0, 29.0]
+    # 1760000000 is 15:53:20 in Asia/Jakarta, one row per minute
+    assert list(figure.layout.xaxis.ticktext) == ['15:53:20', '15:56:20', '15:59:20', '16:02:20']
+    assert figure.layout.title.text == "Temperature Trend"
+    # Everything else comes from the layout sent once with the page
+    assert list(figure.data[0].x) == list(range(TREND_POINTS))
+    assert figure.layout.yaxis.range == (0, 40)
+    assert figure.data[0].line.color == '#FF4B4B'
+
+def test_patch_with_too_few_rows_clears_the_trace():
+    snap = snapshot_with([20.0, 21.0])
+    figure = apply_patch(trend_figure('temp-graph'), trend_patch('temp-graph', snap, 10))
+    assert list(figure.data[0].y) == []
+    assert list(figure.layout.xaxis.ticktext) == []
+    assert figure.layout.title.text == "Temperature Trend - Insufficient Data"
+
+def test_blank_patch_after_data():
+    snap = snapshot_with([20.0 + i for i in range(10)])
+    figure = apply_patch(trend_figure('humidity-graph'), trend_patch('humidity-graph', snap, 10))
+    figure = apply_patch(figure, blank_trend_patch('humidity-graph', "Data Unavailable"))
+    assert list(figure.data[0].y) == []
+    assert list(figure.layout.xaxis.ticktext) == []
+    assert figure.layout.title.text == "Data Unavailable"
+    assert apply_patch(figure, blank_trend_patch('humidity-graph')).layout.title.text == "Humidity Trend"
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from compressed_store import ChunkedSensorStore
+from ingest import IngestStores
+from sensor_store import SensorStore, PredictionStore
+from sites import SiteShard
+from snapshot import SnapshotPublisher
+from warm_start import save_site, read_state, load_site, state_path
+
+CODES = ('a', 'b')
+
+def make_shard(make_store, depth=4):
+    sensors = make_store(CODES, depth)
+    predictions = PredictionStore(('p',), 4)
+    alarm_data = {}
+    snapshots = SnapshotPublisher(sensors, alarm_data, predictions, groups=(CODES,))
+    shard = SiteShard('gh 1/x', IngestStores(sensors, alarm_data, predictions, snapshots))
+    shard.last_message = 1000.0
+    return shard
+
+@pytest.mark.parametrize('make_store', [SensorStore, ChunkedSensorStore])
+def test_round_trip_full_ring_mid_cycle(tmp_path, make_store):
+    shard = make_shard(make_store)
+    stores = shard.stores
+    for epoch in range(1, 7):
+        stores.sensors.begin_row(float(epoch))
+        stores.sensors.set_latest('a', epoch * 10.0)
+        stores.sensors.set_latest('b', -epoch)
+    stores.predictions.update('p', 5.0, 6.0)
+    stores.predictions.seal()
+    stores.alarm_data['kodeAlarm0211'] = 1
+    stores.snapshots.publish()
+
+    # A new cycle starts after publishing: it reuses the oldest slot of the ring
+    stores.sensors.begin_row(100.0)
+    stores.sensors.set_latest('a', 999.0)
+    save_site(str(tmp_path), shard)
+
+    restored = make_shard(make_store)
+    load_site(read_state(state_path(str(tmp_path), shard.name)), restored)
+    snap = restored.snapshots.current()
+    epochs = snap.epochs(4).tolist()
+    assert epochs == sorted(epochs)
+    assert 100.0 not in epochs and epochs[-1] == 6.0
+    assert snap.window('a', 4).tolist() == [e * 10.0 for e in epochs]
+    assert snap.window('b', 4).tolist() == [-e for e in epochs]
+    assert snap.prediction('p') == 5.0
+    assert snap.alarms['kodeAlarm0211'] == 1
+    assert restored.last_message == 1000.0
+    assert np.isclose(restored.stores.predictions.state()[0], [5.0]).all()
@@ -0,0 +1,187 @@
+'''
+ Nama File      : bench_on_message.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Micro-benchmark jalur on_message: rantai if/elif lama vs registry topik
+       vs satu pesan batch per siklus
+    2. Mensimulasikan satu siklus pengukuran penuh (cycle start, data,
+       alarm, berita, prediksi) lalu menghitung siklus per detik
+    3. Jalankan dari folder dashboard: python -m tools.bench_on_message
+'''
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+from datetime import datetime
+import pytz
+from ingest import IngestStores, dispatch_message
+from ingest_pipeline import IngestPipeline
+from sensor_store import SensorStore, PredictionStore
+from snapshot import SnapshotPublisher
+from sensor_registry import (
+    TOPIC_PREFIX, CYCLE_START_CODE, CYCLE_BATCH_CODE, TABLE_DATA_CODES, STORE_CODES,
+    ALARM_CODES, BERITA_CODES, PREDICTION_CODES, CYCLE_GROUPS,
+)
+
+class FakeMessage:
+    """Minimal stand-in for paho's MQTTMessage"""
+    __slots__ = ('topic', 'payload')
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+def build_cycle_messages():
+    """One full measurement cycle, in the order the MCS publishes it"""
+    messages = [FakeMessage(TOPIC_PREFIX + CYCLE_START_CODE, b"1")]
+    for code in TABLE_DATA_CODES:
+        messages.append(FakeMessage(TOPIC_PREFIX + code, f"{random.uniform(0, 100):.4f}".encode()))
+    for code in ALARM_CODES:
+        messages.append(FakeMessage(TOPIC_PREFIX + code, str(random.randint(0, 4)).encode()))
+    for code in BERITA_CODES:
+        messages.append(FakeMessage(TOPIC_PREFIX + code, b"Normal"))
+    for code in PREDICTION_CODES:
+        messages.append(FakeMessage(TOPIC_PREFIX + code, f"{random.uniform(0, 100):.4f}".encode()))
+    return messages
+
+def build_cycle_batch(messages):
+    """The same cycle as one JSON batch on mcs/cycle"""
+    batch = {'ts': time.time()}
+    for msg in messages:
+        code = msg.topic.rpartition('/')[2]
+        text = msg.payload.decode()
+        try:
+            batch[code] = float(text)
+        except ValueError:
+            batch[code] = text
+    return [FakeMessage(TOPIC_PREFIX + CYCLE_BATCH_CODE, json.dumps(batch).encode())]
+
+def new_alarm_data():
+    alarm_data = {code: 5 for code in ALARM_CODES}
+    alarm_data.update({code: 'N/A' for code in BERITA_CODES})
+    return alarm_data
+
+def new_legacy_stores():
+    data = {'waktu': [], CYCLE_START_CODE: []}
+    data.update({code: [] for code in TABLE_DATA_CODES})
+    prediction_data = {code: [] for code in PREDICTION_CODES}
+    return data, new_alarm_data(), prediction_data
+
+def new_stores(site=None):
+    """Fresh stores without a history database (`site` as passed by SiteShards)"""
+    sensors = SensorStore(STORE_CODES, depth=3600)
+    alarm_data = new_alarm_data()
+    predictions = PredictionStore(PREDICTION_CODES, history=1440)
+    snapshots = SnapshotPublisher(sensors, alarm_data, predictions, CYCLE_GROUPS)
+    return IngestStores(sensors, alarm_data, predictions, snapshots)
+
+# Baseline: the if/elif on_message body as it was before the topic registry
+def legacy_on_message(stores, msg):
+    data, alarm_data, prediction_data = stores
+    topic = msg.topic.split('/')[-1]
+    MAX_HISTORY = 10
+    table_data_topics = [
+        'kodeData0211', 'kodeData0212', 'kodeData0711', 'kodeData0712',
+        'kodeData0311', 'kodeData0411', 'kodeData0511', 'kodeData0611',
+        'kodeData1011', 'kodeData1012', 'kodeData0911', 'kodeData0912',
+        'kodeData0913'
+    ]
+    topics_to_round = [
+        'kodeData0211', 'kodeData0212', 'kodeData0711', 'kodeData0712',
+        'kodeData0311', 'kodeData0411', 'kodeData0511', 'kodeData0611',
+        'kodeData0911', 'kodeData0912', 'kodeData0913'
+    ]
+    if topic == 'kodeData0000':
+        raw_payload = float(msg.payload.decode())
+        payload = round(raw_payload, 2) if topic in topics_to_round else raw_payload
+        current_time = datetime.now(tz=pytz.timezone('Asia/Jakarta')).strftime('%H:%M:%S')
+        data['waktu'].append(current_time)
+        data[topic].append(payload)
+        for key in table_data_topics:
+            last_value = data[key][-1] if data[key] else None
+            data[key].append(last_value)
+    elif topic in table_data_topics:
+        raw_payload = float(msg.payload.decode())
+        payload = round(raw_payload, 2) if topic in topics_to_round else raw_payload
+        if data[topic]:
+            data[topic][-1] = payload
+    elif topic.startswith('kodeAlarm'):
+        try:
+            alarm_value = int(msg.payload.decode())
+            alarm_data[topic] = alarm_value
+            print(f"Updated alarm {topic}: {alarm_value}")
+        except ValueError:
+            print(f"Error parsing alarm value for {topic}: {msg.payload.decode()}")
+    elif topic.startswith('berita'):
+        berita_value = msg.payload.decode()
+        alarm_data[topic] = berita_value
+        print(f"Updated berita {topic}: {berita_value}")
+    elif topic in list(PREDICTION_CODES):
+        try:
+            predict_value = float(msg.payload.decode())
+            prediction_data[topic].append(predict_value)
+            print(f"Updated prediction {topic}: {predict_value}")
+        except ValueError:
+            print(f"Error parsing prediction value for {topic}: {msg.payload.decode()}")
+    for key in data.keys():
+        if len(data[key]) > MAX_HISTORY:
+            data[key] = data[key][-MAX_HISTORY:]
+
+def registry_on_message(stores, msg):
+    dispatch_message(stores, msg.topic, msg.payload)
+
+# Queue mode: cost seen by paho's network loop (the enqueue only)
+def queued_on_message(pipeline, msg):
+    pipeline.submit(msg)
+
+def run(handler, new_state, messages, cycles):
+    """Feed `cycles` full cycles through handler, return cycles/second"""
+    stores = new_state()
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        start = time.perf_counter()
+        for _ in range(cycles):
+            for msg in messages:
+                handler(stores, msg)
+            # Keep the print sink from growing for the whole run
+            sink.seek(0)
+            sink.truncate()
+        elapsed = time.perf_counter() - start
+    return cycles / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MQTT on_message path")
+    parser.add_argument('--cycles', type=int, default=2000, help="number of full measurement cycles")
+    parser.add_argument('--repeat', type=int, default=5, help="best-of-N runs per implementation")
+    args = parser.parse_args()
+
+    messages = build_cycle_messages()
+    batch = build_cycle_batch(messages)
+    print(f"{len(messages)} messages per cycle, {args.cycles} cycles, best of {args.repeat}")
+
+    results = dict.fromkeys(("legacy if/elif", "topic registry", "queue submit", "cycle batch"), 0.0)
+    implementations = (
+        ("legacy if/elif", legacy_on_message, new_legacy_stores, messages),
+        ("topic registry", registry_on_message, new_stores, messages),
+        # Queue large enough that nothing is dropped while nobody drains it
+        ("queue submit", queued_on_message,
+         lambda: IngestPipeline(new_stores(), maxsize=args.cycles * len(messages)), messages),
+        ("cycle batch", registry_on_message, new_stores, batch),
+    )
+    # Interleaved, so a slow spell of the machine hits every implementation alike
+    for _ in range(args.repeat):
+        for name, handler, new_state, cycle in implementations:
+            results[name] = max(results[name], run(handler, new_state, cycle, args.cycles))
+    for name, rate in results.items():
+        print(f"{name:>15}: {rate:>10,.0f} cycles/s ({rate * len(messages):>12,.0f} values/s)")
+
+    for name in ("topic registry", "cycle batch"):
+        speedup = results[name] / results["legacy if/elif"]
+        print(f"{'speedup':>15}: {speedup:>10.2f}x ({name})")
+
+if __name__ == '__main__':
+    main()
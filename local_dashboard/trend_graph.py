@@ -0,0 +1,92 @@
+'''
+ Nama File      : trend_graph.py
+ Tanggal Update : 17 Oktober 2026
+ Dibuat oleh    : Ammar Aryan Nuha
+ Penjelasan     :
+    1. Definisi grafik REAL-TIME TREND (judul, sumbu, warna) di satu tempat
+    2. Layout halaman memuat figure lengkap sekali saat halaman dibuka
+    3. Callback hanya mengirim dash.Patch berisi nilai y, label waktu dan
+       judul, bukan go.Figure baru (layout dan template) setiap siklus
+'''
+
+import numpy as np
+import plotly.graph_objects as go
+from dash import Patch
+from sensor_store import format_time_labels
+
+# Samples shown per trend graph (evenly spaced over the trend window)
+TREND_POINTS = 4
+
+# graph id -> sensor code, title, y axis title, y range, height, line color, fill color
+TREND_GRAPHS = {
+    'temp-graph': ('kodeData0211', "Temperature Trend", "Temperature (°C)", [0, 40], 150,
+                   '#FF4B4B', 'rgba(75, 134, 255, 0.2)'),
+    'humidity-graph': ('kodeData0212', "Humidity Trend", "Humidity (%)", [0, 100], 150,
+                       '#4B86FF', 'rgba(75, 134, 255, 0.2)'),
+    'temp-graph-out': ('kodeData0711', "Temperature Trend", "Temperature (°C)", [0, 40], 150,
+                       '#FF4B4B', 'rgba(75, 134, 255, 0.2)'),
+    'humidity-graph-out': ('kodeData0712', "Humidity Trend", "Humidity (%)", [0, 100], 150,
+                           '#4B86FF', 'rgba(75, 134, 255, 0.2)'),
+    'windspeed-graph': ('kodeData0411', "Windspeed Trend", "Windspeed (m/s)", [0, 70], 300,
+                        '#4B86FF', 'rgba(75, 134, 255, 0.2)'),
+    'rainfall-graph': ('kodeData0511', "Rainfall Trend", "Rainfall (mm)", [0, 70], 300,
+                       '#4B86FF', 'rgba(75, 134, 255, 0.2)'),
+    'co2-graph': ('kodeData0311', "CO2 Trend", "CO2 (PPM)", [0, 2000], 300,
+                  '#4B86FF', 'rgba(75, 134, 255, 0.2)'),
+    'par-graph': ('kodeData0611', "PAR Trend", "PAR (μmol/m²/s)", [0, 2500], 300,
+                  '#4B86FF', 'rgba(75, 134, 255, 0.2)'),
+    'voltage-ac-graph': ('kodeData0911', "Voltage AC Trend", "Voltage AC (V)", [0, 250], 190,
+                         '#FF6B35', 'rgba(255, 107, 53, 0.2)'),
+    'current-ac-graph': ('kodeData0912', "Current AC Trend", "Current AC (A)", [0, 2], 190,
+                         '#0011FF', 'rgba(78, 205, 196, 0.2)'),
+    'power-ac-graph': ('kodeData0913', "Power AC Trend", "Power AC (W)", [0, 10], 190,
+                       '#FF0000', 'rgba(168, 230, 207, 0.2)'),
+}
+
+def trend_figure(graph_id):
+    """
+    Full figure of a trend graph without data, for the page layout. The
+    callbacks only patch its trace, tick labels and title afterwards.
+    """
+    _, title, y_title, y_range, height, color, fill = TREND_GRAPHS[graph_id]
+    x_plot = list(range(TREND_POINTS))
+    return go.Figure(
+        data=[go.Scatter(
+            x=x_plot,
+            y=[],
+            mode='lines',
+            line=dict(color=color, width=3, shape='spline', smoothing=1.3),
+            fill='tozeroy',
+            fillcolor=fill,
+            showlegend=False
+        )],
+        layout=dict(
+            title=title,
+            xaxis=dict(title="Time", tickmode='array', tickvals=x_plot, ticktext=[], tickangle=0),
+            yaxis=dict(title=y_title, range=y_range),
+            margin=dict(l=40, r=20, t=40, b=30),
+            height=height,
+            plot_bgcolor='rgba(250, 250, 250, 0.9)',
+            showlegend=False
+        )
+    )
+
+def _patch(y, ticktext, title):
+    patch = Patch()
+    patch['data'][0]['y'] = y
+    patch['layout']['xaxis']['ticktext'] = ticktext
+    patch['layout']['title']['text'] = title
+    return patch
+
+def trend_patch(graph_id, snap, window):
+    """Patch showing TREND_POINTS samples of the newest `window` cycles in `snap`"""
+    code, title = TREND_GRAPHS[graph_id][:2]
+    trend_values = snap.window(code, window)
+    if len(trend_values) < TREND_POINTS:
+        return _patch([], [], f"{title} - Insufficient Data")
+    indices = np.linspace(0, len(trend_values) - 1, TREND_POINTS, dtype=int)
+    return _patch(trend_values[indices], format_time_labels(snap.epochs(window)[indices]), title)
+
+def blank_trend_patch(graph_id, title=None):
+    """Patch clearing the graph, titled `title` (default: the graph's own title)"""
+    return _patch([], [], title or TREND_GRAPHS[graph_id][1])